@@ -2,11 +2,9 @@
 /api/v1/health — Health check and system status.
 """
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from fastapi import APIRouter
 
-from backend.db.session import get_db
+from backend.db.session import db_health
 from backend.schemas.risk import HealthResponse
 from backend.services.ml_service import prediction_service
 from backend.core.config import get_settings
@@ -16,18 +14,23 @@ settings = get_settings()
 
 
 @router.get("/health", response_model=HealthResponse)
-async def health_check(db: AsyncSession = Depends(get_db)):
-    """System health check — verifies DB connection and model status."""
-    db_ok = False
-    try:
-        await db.execute(text("SELECT 1"))
-        db_ok = True
-    except Exception:
-        pass
+async def health_check():
+    """
+    System health check — DB connection and model status.
+
+    The DB status comes from the background check (db_health), so probes
+    never check out a connection. A status older than three check intervals
+    means the checker itself stalled and counts as disconnected.
+    """
+    age = db_health.age
+    db_ok = db_health.connected and age is not None and age <= 3 * db_health.interval
 
     return HealthResponse(
         status="healthy" if db_ok else "degraded",
         version=settings.app_version,
         model_loaded=prediction_service.is_loaded,
+        model_loading=prediction_service.is_loading,
         database_connected=db_ok,
+        database_checked_seconds_ago=None if age is None else round(age, 1),
+        prediction_cache=prediction_service.cache_stats,
     )
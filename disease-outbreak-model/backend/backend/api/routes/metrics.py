@@ -0,0 +1,16 @@
+"""
+/metrics — Prometheus scrape endpoint (mounted at the root, not under /api/v1).
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from backend.core.metrics import METRICS_PATH, render_metrics
+
+router = APIRouter(tags=["System"])
+
+
+@router.get(METRICS_PATH, response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Request and stage latency histograms in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -16,9 +16,11 @@ from backend.schemas.risk import (
     MapDataResponse, StateRiskSummary,
 )
 from backend.services.ml_service import prediction_service
-from backend.services.data_service import build_features_for_location
+from backend.services.data_service import build_features_for_location, fetch_case_history
+from backend.core.config import get_settings
 
 router = APIRouter(prefix="/risk", tags=["Risk Assessment"])
+settings = get_settings()
 
 
 # ── Single location risk ─────────────────────────────────────────────
@@ -29,6 +31,16 @@ async def predict_risk(req: RiskRequest, db: AsyncSession = Depends(get_db)):
     Get a risk prediction for a single county by FIPS code.
     This is what fires when a user clicks a county on the map.
     """
+    if prediction_service.is_loading:
+        # Don't persist mock scores while the real model is still loading
+        raise HTTPException(
+            status_code=503,
+            detail="Model is still loading. Please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
+
+    disease = _served_disease(req.disease_type)
+
     # Look up location
     result = await db.execute(select(Location).where(Location.fips == req.fips))
     location = result.scalar_one_or_none()
@@ -36,22 +48,33 @@ async def predict_risk(req: RiskRequest, db: AsyncSession = Depends(get_db)):
     if not location:
         raise HTTPException(status_code=404, detail=f"Location not found: {req.fips}")
 
-    # Assemble features from external APIs
-    features = await build_features_for_location(req.fips)
-
-    # Run ML prediction
-    prediction = prediction_service.predict(features)
-
-    # Persist prediction
-    db_pred = Prediction(
-        location_id=location.id,
-        risk_score=prediction["risk_score"],
-        confidence=prediction["confidence"],
-        factors=prediction["factors"],
-        model_version=prediction["model_version"],
-    )
-    db.add(db_pred)
-    await db.commit()
+    # Counted while features are fetched too, so a burst of clicks shows up
+    # as load before any of them reaches the model
+    with prediction_service.in_flight():
+        # Assemble features from external APIs, plus the recent case counts
+        # of the requested disease
+        features = await build_features_for_location(req.fips)
+        features.update(await fetch_case_history(
+            db, location.id, disease, lags=prediction_service.history_lags
+        ))
+
+        # Run ML prediction (with MC-dropout uncertainty unless disabled)
+        mc_samples = req.mc_samples if req.mc_samples is not None else settings.mc_samples_predict
+        prediction = prediction_service.predict(features, mc_samples=mc_samples)
+
+    # Persist prediction — unless a loaded model fell back to a mock score
+    # for lack of case history, which would only pollute the map
+    fell_back = prediction_service.is_loaded and prediction["model_version"] == "mock"
+    if not fell_back:
+        db_pred = Prediction(
+            location_id=location.id,
+            risk_score=prediction["risk_score"],
+            confidence=prediction["confidence"],
+            factors=prediction["factors"],
+            model_version=prediction["model_version"],
+        )
+        db.add(db_pred)
+        await db.commit()
 
     return RiskResponse(
         fips=location.fips,
@@ -59,6 +82,7 @@ async def predict_risk(req: RiskRequest, db: AsyncSession = Depends(get_db)):
         state=location.state,
         risk_score=prediction["risk_score"],
         confidence=prediction["confidence"],
+        uncertainty=prediction["uncertainty"],
         risk_level=prediction["risk_level"],
         factors=ContributingFactors(**prediction["factors"]),
         model_version=prediction["model_version"],
@@ -170,6 +194,28 @@ async def get_map_data(db: AsyncSession = Depends(get_db)):
 
 # ── Helpers ──────────────────────────────────────────────────────────
 
+def _served_disease(disease_type: str) -> str:
+    """
+    Resolve the requested disease against the served model. "total" means
+    whatever the model predicts; any other disease must be the one it was
+    trained on, since its case history means nothing to the model.
+    """
+    if not prediction_service.is_loaded:
+        # Mock scores don't read case history
+        return disease_type
+    if disease_type.lower() == "total":
+        return prediction_service.disease
+    if disease_type.lower() != prediction_service.disease.lower():
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"The served model predicts {prediction_service.disease}, "
+                f"not {disease_type}."
+            ),
+        )
+    return prediction_service.disease
+
+
 def _risk_level(score: float) -> str:
     if score < 33:
         return "low"
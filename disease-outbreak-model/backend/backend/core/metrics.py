@@ -0,0 +1,245 @@
+"""
+Request and stage latency metrics.
+
+MetricsMiddleware times every HTTP request and opens a per-request timing
+context. Code on the request path wraps its expensive stages in
+`timed("stage")` — DB queries and pool checkouts (via instrument_engine and
+the session's pool class), upstream API calls, feature scaling and the
+model forward pass, JSON rendering — and their durations are summed into
+that context. When the request finishes the totals feed two histogram
+families:
+
+    http_request_duration_seconds{method, route, status}
+    request_stage_duration_seconds{route, stage}
+
+plus admission_rejected_total{class, reason}, counting requests shed by the
+admission controller.
+
+`route` is the matched route template (e.g. /api/v1/locations/{fips}), so
+label cardinality stays bounded. The breakdown is also returned in a
+Server-Timing header, and render_metrics() produces the Prometheus text
+format served at /metrics.
+
+Histograms are per process: with several workers each scrape sees the
+worker that answered it.
+"""
+
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_PATH = "/metrics"
+
+# Seconds. Finer than Prometheus' defaults at the low end, where most
+# stages (scaling, a forward pass, an indexed query) land
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ── Histograms ───────────────────────────────────────────────────────
+
+class Histogram:
+    """Fixed-bucket latency histogram (per-bucket counts, cumulated on export)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class HistogramFamily:
+    """A named histogram with one series per label combination."""
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.series: dict[tuple[str, ...], Histogram] = {}
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        histogram = self.series.get(labels)
+        if histogram is None:
+            histogram = self.series[labels] = Histogram()
+        histogram.observe(value)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, histogram in sorted(self.series.items()):
+            label_text = ",".join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)
+            )
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {histogram.sum!r}")
+            lines.append(f"{self.name}_count{{{label_text}}} {histogram.count}")
+        return lines
+
+
+class CounterFamily:
+    """A named monotonic counter with one series per label combination."""
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.series: dict[tuple[str, ...], int] = {}
+
+    def inc(self, labels: tuple[str, ...], amount: int = 1) -> None:
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.series.items()):
+            label_text = ",".join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)
+            )
+            lines.append(f"{self.name}{{{label_text}}} {value}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_DURATION = HistogramFamily(
+    "http_request_duration_seconds",
+    "Time from receiving a request to the end of its response.",
+    ("method", "route", "status"),
+)
+STAGE_DURATION = HistogramFamily(
+    "request_stage_duration_seconds",
+    "Time spent per request in each instrumented stage (summed when a stage runs more than once).",
+    ("route", "stage"),
+)
+ADMISSION_REJECTED = CounterFamily(
+    "admission_rejected_total",
+    "Requests shed by admission control, by class and reason (queue_full, expected_wait, deadline).",
+    ("class", "reason"),
+)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = REQUEST_DURATION.render() + STAGE_DURATION.render() + ADMISSION_REJECTED.render()
+    return "\n".join(lines) + "\n"
+
+
+# ── Stage timing ─────────────────────────────────────────────────────
+
+# stage -> seconds for the request being handled; None outside a request
+_stage_timings: ContextVar[Optional[dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add `seconds` to `stage` for the current request."""
+    timings = _stage_timings.get()
+    if timings is None:
+        # Startup and background work have no request to attribute it to
+        STAGE_DURATION.observe(("none", stage), seconds)
+    else:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the enclosed block as `stage` of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record every cursor execution on `engine` as the db_query stage."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_stage("db_query", time.perf_counter() - context._query_started)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records its rendering as the serialize stage."""
+
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+# ── Middleware ───────────────────────────────────────────────────────
+
+class MetricsMiddleware:
+    """Pure ASGI middleware feeding the latency histograms and Server-Timing."""
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == METRICS_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        timings: dict[str, float] = {}
+        token = _stage_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    total = time.perf_counter() - started
+                    MutableHeaders(scope=message).append("Server-Timing", _server_timing(timings, total))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            _stage_timings.reset(token)
+            route = _route_label(scope)
+            REQUEST_DURATION.observe((scope["method"], route, str(status)), elapsed)
+            for stage, seconds in timings.items():
+                STAGE_DURATION.observe((route, stage), seconds)
+
+
+def _route_label(scope: Scope) -> str:
+    # The router stores the matched route in the scope; anything it never
+    # matched (404s, requests rejected by outer middleware) shares one label
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    # A route of an included router may carry only its own part of the
+    # path; the prefix it is mounted under comes from the request path
+    segments = scope["path"].split("/")
+    return "/".join(segments[:len(segments) - template.count("/")]) + template
+
+
+def _server_timing(timings: dict[str, float], total: float) -> str:
+    entries = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(entries)
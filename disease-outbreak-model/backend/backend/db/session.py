@@ -1,22 +1,49 @@
 """
 Async database engine and session management.
 Uses SQLAlchemy 2.0 async API with PostgreSQL.
+
+Request handlers get a LazySession: the AsyncSession behind it is only
+created — and a pooled connection only checked out — when a route actually
+runs a statement, so responses served from memory cost the pool nothing.
+Liveness comes from db_health, refreshed in the background, rather than a
+query per probe.
 """
 
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import Optional
+
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from backend.core.config import get_settings
+from backend.core.metrics import instrument_engine, timed
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool that records each checkout wait as the db_pool_wait stage."""
+
+    def connect(self):
+        with timed("db_pool_wait"):
+            return super().connect()
+
+
 engine = create_async_engine(
     settings.database_url,
     echo=settings.database_echo,
     pool_size=10,
     max_overflow=20,
     pool_pre_ping=True,
+    poolclass=TimedQueuePool,
 )
+instrument_engine(engine.sync_engine)
 
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -26,13 +53,121 @@ class Base(DeclarativeBase):
     pass
 
 
+class LazySession:
+    """
+    Stands in for an AsyncSession until it is first used.
+
+    Any attribute access (execute, add, commit, ...) opens the real session
+    and forwards to it; a request that never touches it never creates one.
+    """
+
+    __slots__ = ("_session",)
+
+    def __init__(self):
+        self._session: Optional[AsyncSession] = None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = AsyncSessionLocal()
+        return getattr(self._session, name)
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
 async def get_db() -> AsyncSession:
-    """Dependency that yields a database session."""
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+    """Dependency that yields a session, opened on first use (see LazySession)."""
+    session = LazySession()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+# ── Background health check ──────────────────────────────────────────
+
+class DatabaseHealth:
+    """
+    Database reachability, refreshed in the background.
+
+    Every `interval` seconds a SELECT 1 runs — unless a real statement
+    succeeded since the last refresh, which already proves the connection
+    works — so probes read a cached answer and add no pool pressure.
+    """
+
+    def __init__(self, interval: float = 10.0, timeout: float = 2.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.connected = False
+        self.checked_at: Optional[float] = None  # time.monotonic() of the last answer
+        self._last_success = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def record_success(self) -> None:
+        self._last_success = time.monotonic()
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the status was last confirmed."""
+        return None if self.checked_at is None else time.monotonic() - self.checked_at
+
+    async def refresh(self) -> bool:
+        if self.checked_at is not None and self._last_success > self.checked_at:
+            # Real traffic reached the database since the last check
+            connected = True
+        else:
+            try:
+                await asyncio.wait_for(self._ping(), self.timeout)
+                connected = True
+            except Exception as e:
+                if self.connected or self.checked_at is None:
+                    logger.warning(f"Database health check failed: {e!r}")
+                connected = False
+
+        if connected and not self.connected and self.checked_at is not None:
+            logger.info("Database reachable again")
+        self.connected = connected
+        # Stamped after the probe, so its own SELECT 1 doesn't count as traffic
+        self.checked_at = time.monotonic()
+        return connected
+
+    @staticmethod
+    async def _ping() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self._refresh_loop())
+        return self._task
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.refresh()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+db_health = DatabaseHealth(
+    interval=settings.db_health_interval_seconds,
+    timeout=settings.db_health_timeout_seconds,
+)
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _record_db_success(conn, cursor, statement, parameters, context, executemany):
+    db_health.record_success()
 
 
 async def init_db():
@@ -5,16 +5,19 @@ Entry point: uvicorn backend.main:app --reload
 Docs:        http://localhost:8000/docs
 """
 
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.core.config import get_settings
-from backend.db.session import init_db
+from backend.core.metrics import MetricsMiddleware, TimedJSONResponse
+from backend.db.session import db_health, init_db
 from backend.services.ml_service import prediction_service
-from backend.middleware.rate_limit import RateLimitMiddleware
-from backend.api.routes import risk, locations, data, health
+from backend.middleware.admission import AdmissionMiddleware
+from backend.middleware.rate_limit import RateLimitMiddleware, create_rate_limiter
+from backend.api.routes import risk, locations, data, health, metrics
 
 settings = get_settings()
 
@@ -24,28 +27,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+rate_limiter = create_rate_limiter()
+
 
 # ── Lifespan (startup / shutdown) ────────────────────────────────────
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Run on startup: initialize DB tables and load ML model."""
+    """Run on startup: initialize DB tables and start loading the ML model."""
     logger.info("Starting Disease Detective API...")
 
     # Initialize database tables (dev convenience)
     await init_db()
     logger.info("Database initialized")
 
-    # Load ML model into memory
-    prediction_service.load_model(settings.model_path, settings.model_device)
-    if prediction_service.is_loaded:
-        logger.info(f"ML model loaded: {prediction_service.model_version}")
-    else:
-        logger.warning("ML model not found — running with mock predictions")
+    # /health reads this status instead of querying the database per probe
+    await db_health.refresh()
+    db_health.start()
+
+    # Load ML model in the background — non-ML routes serve immediately and
+    # /health reports model_loading until the checkpoint is in memory.
+    # Under gunicorn preload (gunicorn.conf.py) the master already loaded it
+    # before forking, and workers share those pages copy-on-write.
+    model_task = None
+    if not prediction_service.is_loaded:
+        model_task = prediction_service.start_background_load(
+            settings.model_path, settings.model_device
+        )
 
     yield
 
     logger.info("Shutting down Disease Detective API")
+    if model_task and not model_task.done():
+        model_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await model_task
+    await db_health.stop()
+    await rate_limiter.close()
 
 
 # ── App ──────────────────────────────────────────────────────────────
@@ -59,6 +77,8 @@ app = FastAPI(
         "NOAA, and WHO data fed through a trained neural network."
     ),
     lifespan=lifespan,
+    # Renders JSON under the serialize stage of the request metrics
+    default_response_class=TimedJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
 )
@@ -66,6 +86,9 @@ app = FastAPI(
 
 # ── Middleware ────────────────────────────────────────────────────────
 
+# Innermost, so CORS preflights never queue and shed 503s carry CORS headers
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
@@ -73,7 +96,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.add_middleware(RateLimitMiddleware)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+# Added last so it is outermost: rate-limited requests are timed too
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, server_timing=settings.server_timing)
 
 
 # ── Routes ───────────────────────────────────────────────────────────
@@ -84,6 +110,8 @@ app.include_router(health.router, prefix=API_V1)
 app.include_router(risk.router, prefix=API_V1)
 app.include_router(locations.router, prefix=API_V1)
 app.include_router(data.router, prefix=API_V1)
+if settings.metrics_enabled:
+    app.include_router(metrics.router)
 
 
 @app.get("/")
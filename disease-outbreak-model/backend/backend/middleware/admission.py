@@ -0,0 +1,174 @@
+"""
+Admission control: per-class concurrency limits with bounded, deadline-aware queues.
+
+Requests are sorted into classes by path (settings.admission_routes):
+
+    predict   POST /risk/predict — upstream fetches, inference and a commit
+    proxy     the /data/* passthroughs to CDC/Census/NOAA/WHO
+    read      everything else: map, location and history reads
+
+Each class admits at most `max_concurrent` requests at a time and queues up
+to `max_queued` more, FIFO. A queued request that isn't admitted within
+`deadline` seconds is shed, and so is one that arrives to a full queue or
+whose expected wait (queue position × the class's recent service time)
+already exceeds the deadline — shedding early, before it has held a
+connection or a queue slot for nothing. Shed requests get a 503 with
+Retry-After.
+
+Because expensive classes have their own small limits, a spike of predict
+calls queues and sheds inside its class instead of taking the whole DB
+pool and event loop, and the cheap reads keep their latency.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import suppress
+from typing import Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from backend.core.config import get_settings
+from backend.core.metrics import ADMISSION_REJECTED, record_stage
+
+settings = get_settings()
+
+# Never queued or shed: liveness probes, metrics scrapes and the docs
+EXEMPT_PATHS = frozenset({"/api/v1/health", "/metrics", "/docs", "/openapi.json"})
+
+
+class AdmissionClass:
+    """Concurrency limit plus a bounded FIFO queue for one class of requests."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queued: int, deadline: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.deadline = deadline
+        self.active = 0
+        # EWMA of how long an admitted request holds its slot; None until
+        # the first one finishes
+        self.service_time: Optional[float] = None
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        """Seconds a request arriving now would queue, from recent service times."""
+        if self.service_time is None:
+            return 0.0
+        return (self.queued + 1) / self.max_concurrent * self.service_time
+
+    async def acquire(self) -> Optional[str]:
+        """Wait for a slot; returns None once admitted, or why the request was shed."""
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            return None
+        if self.queued >= self.max_queued:
+            return "queue_full"
+        if self.expected_wait() > self.deadline:
+            return "expected_wait"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.deadline)
+        except asyncio.TimeoutError:
+            return "deadline"
+        except asyncio.CancelledError:
+            # The client went away; if the slot was handed over at the same
+            # moment, pass it on instead of leaking it
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            with suppress(ValueError):
+                self._waiters.remove(waiter)
+        return None
+
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        if service_seconds is not None:
+            self.service_time = (
+                service_seconds if self.service_time is None
+                else 0.8 * self.service_time + 0.2 * service_seconds
+            )
+        # Hand the slot straight to the next live waiter; `active` only drops
+        # when nobody is queued
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionMiddleware:
+    """Pure ASGI admission controller; shed requests never reach the app."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        classes: Optional[dict[str, tuple[int, int, float]]] = None,
+        routes: Optional[dict[str, str]] = None,
+        default_class: str = "read",
+    ):
+        self.app = app
+        classes = settings.admission_classes if classes is None else classes
+        self.classes = {
+            name: AdmissionClass(name, int(limit), int(queued), float(deadline))
+            for name, (limit, queued, deadline) in classes.items()
+        }
+        self.default_class = default_class
+
+        routes = settings.admission_routes if routes is None else routes
+        # "/prefix/*" entries match any path below the prefix
+        self.exact_routes = {path: name for path, name in routes.items() if not path.endswith("*")}
+        self.prefix_routes = [(path[:-1], name) for path, name in routes.items() if path.endswith("*")]
+
+    def route_class(self, path: str) -> Optional[AdmissionClass]:
+        name = self.exact_routes.get(path)
+        if name is None:
+            name = next((n for prefix, n in self.prefix_routes if path.startswith(prefix)), self.default_class)
+        return self.classes.get(name)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        admission = self.route_class(scope["path"])
+        if admission is None:
+            await self.app(scope, receive, send)
+            return
+
+        queued_at = time.perf_counter()
+        reason = await admission.acquire()
+        if reason is not None:
+            ADMISSION_REJECTED.inc((admission.name, reason))
+            await self._shed(admission, scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        # Admission on the fast path takes microseconds; only report real queueing
+        if started - queued_at > 1e-4:
+            record_stage("admission_wait", started - queued_at)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(time.perf_counter() - started)
+
+    @staticmethod
+    async def _shed(admission: AdmissionClass, scope: Scope, receive: Receive, send: Send) -> None:
+        retry_seconds = max(1, math.ceil(admission.expected_wait()))
+        response = JSONResponse(
+            status_code=503,
+            content={
+                "detail": "Server is busy. Please retry shortly.",
+                "retry_after_seconds": retry_seconds,
+            },
+            headers={"Retry-After": str(retry_seconds)},
+        )
+        await response(scope, receive, send)
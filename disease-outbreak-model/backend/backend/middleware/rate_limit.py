@@ -1,48 +1,187 @@
 """
-Simple in-memory rate limiter middleware.
-Limits requests per IP address per minute.
+Sliding-window rate limiter as pure ASGI middleware.
+
+Each client key (the peer IP) holds a fixed-size sliding-window counter —
+the cost spent in the current and the previous window — instead of a list
+of timestamps, so a check is O(1) in time and memory whatever the limit.
+The previous window's count is weighted by how much of it still overlaps
+the trailing window:
+
+    estimate = previous * (1 - elapsed / window) + current
+
+Routes can cost more than one request (settings.rate_limit_route_costs), so
+a model-backed /risk/predict call uses up the budget faster than a cached
+/risk/map read. Keys idle for two full windows carry no state worth keeping
+and are evicted in a periodic sweep, so scanners cycling through addresses
+can't grow the table without bound.
+
+Each worker process keeps its own counters; set RATE_LIMIT_BACKEND=redis
+to share them across workers (shared_rate_limit.py).
 """
 
+import logging
+import math
 import time
-from collections import defaultdict
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Callable, Optional
+
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from backend.core.config import get_settings
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Never rate limited: liveness probes, metrics scrapes and the docs
+EXEMPT_PATHS = frozenset({"/api/v1/health", "/metrics", "/docs", "/openapi.json"})
+
+
+class SlidingWindowLimiter:
+    """Per-key sliding-window counters with idle-key eviction."""
+
+    def __init__(
+        self,
+        limit: float,
+        window_seconds: float = 60.0,
+        sweep_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limit = float(limit)
+        self.window = float(window_seconds)
+        self.sweep_interval = sweep_interval or self.window
+        self.clock = clock
+        # key -> [window index, previous window cost, current window cost]
+        self._counters: dict[str, list] = {}
+        self._next_sweep = clock() + self.sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def hit(self, key: str, cost: float = 1.0) -> tuple[bool, float]:
+        """
+        Spend `cost` for `key` if the estimate allows it.
+
+        Returns (allowed, retry_after_seconds); retry_after is 0 when allowed.
+        """
+        now = self.clock()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        position = now / self.window
+        index = int(position)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = [index, 0.0, 0.0]
+        elif counter[0] != index:
+            # Roll forward: the current window becomes the previous one, or
+            # both reset when more than a whole window went by
+            counter[1] = counter[2] if counter[0] == index - 1 else 0.0
+            counter[2] = 0.0
+            counter[0] = index
+
+        # A cost above the limit could never be admitted; cap it so such a
+        # route is limited to one call per window instead of none
+        cost = min(cost, self.limit)
+        elapsed = position - index
+        estimate = counter[1] * (1.0 - elapsed) + counter[2]
+        if estimate + cost > self.limit:
+            return False, self._retry_after(counter[1], counter[2], elapsed, cost)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, requests_per_minute: int = None):
-        super().__init__(app)
-        self.rpm = requests_per_minute or settings.rate_limit_per_minute
-        self.requests: dict[str, list[float]] = defaultdict(list)
-
-    async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for health checks and docs
-        if request.url.path in ("/api/v1/health", "/docs", "/openapi.json"):
-            return await call_next(request)
-
-        client_ip = request.client.host if request.client else "unknown"
-        now = time.time()
-        window_start = now - 60
-
-        # Clean old entries
-        self.requests[client_ip] = [
-            t for t in self.requests[client_ip] if t > window_start
-        ]
-
-        if len(self.requests[client_ip]) >= self.rpm:
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "detail": "Rate limit exceeded. Please try again shortly.",
-                    "retry_after_seconds": 60,
-                },
+        counter[2] += cost
+        return True, 0.0
+
+    def _retry_after(self, previous: float, current: float, elapsed: float, cost: float) -> float:
+        """Seconds until `cost` would fit, assuming no further traffic."""
+        excess = previous * (1.0 - elapsed) + current + cost - self.limit
+        # Within this window only the previous window's share decays
+        if previous > 0 and current + cost <= self.limit:
+            return excess / previous * self.window
+        # Otherwise wait for the next window, where `current` becomes the
+        # decaying previous count
+        wait = 1.0 - elapsed
+        if current + cost > self.limit and current > 0:
+            wait += (current + cost - self.limit) / current
+        return wait * self.window
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop keys whose counters have fully expired; returns how many."""
+        now = self.clock() if now is None else now
+        oldest_live = int(now / self.window) - 1
+        stale = [key for key, counter in self._counters.items() if counter[0] < oldest_live]
+        for key in stale:
+            del self._counters[key]
+        self._next_sweep = now + self.sweep_interval
+        return len(stale)
+
+    async def close(self) -> None:
+        """Release background resources (none for the in-process limiter)."""
+
+
+def create_rate_limiter(requests_per_minute: Optional[int] = None) -> SlidingWindowLimiter:
+    """The limiter selected by settings.rate_limit_backend."""
+    limit = requests_per_minute or settings.rate_limit_per_minute
+    if settings.rate_limit_backend == "redis":
+        try:
+            from backend.middleware.shared_rate_limit import SharedWindowLimiter
+        except ImportError:
+            logger.error("RATE_LIMIT_BACKEND=redis needs the redis package; limiting per worker instead")
+        else:
+            return SharedWindowLimiter(
+                limit,
+                settings.rate_limit_redis_url or settings.redis_url,
+                window_seconds=60.0,
+                sync_interval=settings.rate_limit_sync_seconds,
+                sweep_interval=settings.rate_limit_sweep_seconds,
             )
+    return SlidingWindowLimiter(limit, window_seconds=60.0, sweep_interval=settings.rate_limit_sweep_seconds)
+
+
+class RateLimitMiddleware:
+    """Pure ASGI rate limiter; a rejected request never reaches the app."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        requests_per_minute: Optional[int] = None,
+        route_costs: Optional[dict[str, float]] = None,
+        limiter: Optional[SlidingWindowLimiter] = None,
+    ):
+        self.app = app
+        self.limiter = create_rate_limiter(requests_per_minute) if limiter is None else limiter
+
+        costs = settings.rate_limit_route_costs if route_costs is None else route_costs
+        # "/prefix/*" entries match any path below the prefix
+        self.exact_costs = {path: cost for path, cost in costs.items() if not path.endswith("*")}
+        self.prefix_costs = [(path[:-1], cost) for path, cost in costs.items() if path.endswith("*")]
+
+    def route_cost(self, path: str) -> float:
+        cost = self.exact_costs.get(path)
+        if cost is not None:
+            return cost
+        for prefix, prefix_cost in self.prefix_costs:
+            if path.startswith(prefix):
+                return prefix_cost
+        return 1.0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        key = client[0] if client else "unknown"
+        allowed, retry_after = self.limiter.hit(key, self.route_cost(scope["path"]))
+        if allowed:
+            await self.app(scope, receive, send)
+            return
 
-        self.requests[client_ip].append(now)
-        response = await call_next(request)
-        return response
+        retry_seconds = max(1, math.ceil(retry_after))
+        response = JSONResponse(
+            status_code=429,
+            content={
+                "detail": "Rate limit exceeded. Please try again shortly.",
+                "retry_after_seconds": retry_seconds,
+            },
+            headers={"Retry-After": str(retry_seconds)},
+        )
+        await response(scope, receive, send)
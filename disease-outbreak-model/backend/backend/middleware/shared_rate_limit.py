@@ -0,0 +1,192 @@
+"""
+Rate-limit counters shared across workers through a Redis-compatible store.
+
+Every uvicorn/gunicorn worker runs its own RateLimitMiddleware, so with the
+in-process limiter a client gets N× the limit across N workers. This
+limiter keeps the same sliding-window counters locally — a request is
+still admitted or rejected without touching the network — and a
+background task reconciles them with the store every `sync_interval`:
+
+  * the cost spent here since the last sync is added to the shared total
+    of the window it was spent in, for every client in one atomic script
+    call — a sync just after a window boundary still credits the cost
+    spent before it to the previous window
+  * the script returns the global totals, which replace the local view
+
+So the store sees one round trip per interval however busy the worker is.
+Between syncs a worker only knows its own recent spend, which bounds the
+overshoot to roughly (workers - 1) × one interval of a client's traffic.
+
+If the store is unreachable — or a sync fails for any other reason, such
+as a malformed URL — the limiter fails open: the error is logged once,
+counts keep being enforced per worker, and the store is retried after
+`retry_interval`. The sync task never exits on an error, and one that has
+finished anyway is restarted by the next request.
+
+The redis package is only needed when RATE_LIMIT_BACKEND=redis; this
+module is imported lazily by create_rate_limiter.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from contextlib import suppress
+from typing import Callable, Optional
+
+import redis.asyncio as redis
+
+from backend.middleware.rate_limit import SlidingWindowLimiter
+
+logger = logging.getLogger(__name__)
+
+# Adds each client's pending cost to the window totals it was spent in and
+# returns the current and previous window totals, for many clients in one call.
+# KEYS: current and previous window key per client, interleaved
+# ARGV: key TTL in seconds, then the cost pending for each of those keys
+SYNC_SCRIPT = """
+local ttl = tonumber(ARGV[1])
+local totals = {}
+for i = 1, #KEYS do
+    local cost = tonumber(ARGV[i + 1])
+    if cost > 0 then
+        totals[i] = redis.call('INCRBYFLOAT', KEYS[i], cost)
+        redis.call('EXPIRE', KEYS[i], ttl)
+    else
+        totals[i] = redis.call('GET', KEYS[i]) or '0'
+    end
+end
+return totals
+"""
+
+# Clients per script call, so one sync never blocks the store for long
+SYNC_CHUNK = 1000
+
+
+class SharedWindowLimiter(SlidingWindowLimiter):
+    """SlidingWindowLimiter whose counters are periodically merged through Redis."""
+
+    def __init__(
+        self,
+        limit: float,
+        url: str,
+        window_seconds: float = 60.0,
+        sync_interval: float = 0.1,
+        sweep_interval: Optional[float] = None,
+        key_prefix: str = "ratelimit:",
+        timeout: float = 0.25,
+        retry_interval: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        # Window indexes must agree between workers, so the default clock is
+        # wall time rather than the per-process monotonic clock
+        super().__init__(limit, window_seconds, sweep_interval, clock)
+        self.url = url
+        self.sync_interval = sync_interval
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.ttl = math.ceil(2 * self.window) + 1
+        self.store_available = True
+
+        # client key -> {window index: cost spent here since the last sync}
+        # (0 for keys that were only rejected: their global totals still
+        # need refreshing)
+        self._pending: dict[str, dict[int, float]] = {}
+        self._retry_at = 0.0
+        self._client: Optional[redis.Redis] = None
+        self._script = None
+        self._task: Optional[asyncio.Task] = None
+
+    def hit(self, key: str, cost: float = 1.0) -> tuple[bool, float]:
+        if self._task is None or self._task.done():
+            self._start()
+        allowed, retry_after = super().hit(key, cost)
+        windows = self._pending.setdefault(key, {})
+        index = self._counters[key][0]
+        windows[index] = windows.get(index, 0.0) + (min(cost, self.limit) if allowed else 0.0)
+        return allowed, retry_after
+
+    def _start(self) -> None:
+        # Started from the first request rather than at import, so under
+        # gunicorn preload each worker opens its own connection after fork
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._task = loop.create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+
+    async def sync(self) -> bool:
+        """Merge pending counts with the store; returns False if it was unreachable."""
+        if not self._pending:
+            return True
+        now = self.clock()
+        if now < self._retry_at:
+            # Still backing off: drop the counts rather than let them pile up
+            self._pending.clear()
+            return False
+
+        pending, self._pending = self._pending, {}
+        index = int(now / self.window)
+        try:
+            if self._client is None:
+                self._client = redis.from_url(
+                    self.url, socket_timeout=self.timeout, socket_connect_timeout=self.timeout
+                )
+                self._script = self._client.register_script(SYNC_SCRIPT)
+            # Cost from windows before the previous one no longer counts
+            items = list(pending)
+            for start in range(0, len(items), SYNC_CHUNK):
+                chunk = items[start:start + SYNC_CHUNK]
+                keys, args = [], [self.ttl]
+                for key in chunk:
+                    keys += [f"{self.key_prefix}{key}:{index}", f"{self.key_prefix}{key}:{index - 1}"]
+                    args += [pending[key].get(index, 0.0), pending[key].get(index - 1, 0.0)]
+                totals = await self._script(keys=keys, args=args)
+                self._merge(chunk, totals, index)
+        except Exception as e:
+            # Anything escaping here would end the sync task for good
+            self._retry_at = now + self.retry_interval
+            if self.store_available:
+                message = (
+                    f"Rate-limit store {self.url} unreachable ({e!r}); "
+                    f"limiting per worker, retrying every {self.retry_interval:g}s"
+                )
+                if isinstance(e, (redis.RedisError, OSError, asyncio.TimeoutError)):
+                    logger.warning(message)
+                else:
+                    logger.exception(message)
+            self.store_available = False
+            return False
+
+        if not self.store_available:
+            logger.info(f"Rate-limit store {self.url} reachable again; limits are shared")
+            self.store_available = True
+        return True
+
+    def _merge(self, chunk: list[str], totals: list, index: int) -> None:
+        for key, current, previous in zip(chunk, totals[0::2], totals[1::2]):
+            counter = self._counters.get(key)
+            if counter is None or counter[0] != index:
+                continue
+            # The store's totals already include what this worker flushed;
+            # add back what was spent here while the call was in flight
+            in_flight = self._pending.get(key, {})
+            counter[1] = float(previous) + in_flight.get(index - 1, 0.0)
+            counter[2] = float(current) + in_flight.get(index, 0.0)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.sync()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -6,6 +6,10 @@ from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
+from backend.core.config import get_settings
+
+settings = get_settings()
+
 
 # ── Locations ────────────────────────────────────────────────────────
 
@@ -28,6 +32,10 @@ class RiskRequest(BaseModel):
     """Request body for on-demand risk prediction."""
     fips: str = Field(..., min_length=5, max_length=5, description="5-digit FIPS code")
     disease_type: str = Field(default="total", description="Disease to predict for")
+    mc_samples: Optional[int] = Field(
+        default=None, ge=0, le=settings.mc_samples_max,
+        description="Monte-Carlo dropout passes for uncertainty (0 = off, default from server config)",
+    )
 
 
 class ContributingFactors(BaseModel):
@@ -44,6 +52,7 @@ class RiskResponse(BaseModel):
     state: str
     risk_score: float = Field(..., ge=0, le=100)
     confidence: float = Field(..., ge=0, le=1)
+    uncertainty: Optional[float] = None    # std of risk_score across MC dropout passes
     risk_level: str                        # "low", "moderate", "high"
     factors: ContributingFactors
     model_version: str
@@ -89,8 +98,19 @@ class HistoryRequest(BaseModel):
 
 # ── Health check ─────────────────────────────────────────────────────
 
+class PredictionCacheStats(BaseModel):
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    hit_rate: float
+
+
 class HealthResponse(BaseModel):
     status: str
     version: str
     model_loaded: bool
+    model_loading: bool = False
     database_connected: bool
+    database_checked_seconds_ago: Optional[float] = None   # age of the background DB check
+    prediction_cache: Optional[PredictionCacheStats] = None
@@ -10,7 +10,12 @@ from datetime import datetime, timedelta
 from typing import Optional
 from functools import lru_cache
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from backend.core.config import get_settings
+from backend.core.metrics import timed
+from backend.db.models import OutbreakHistory
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -60,7 +65,8 @@ async def fetch_cdc_disease_data(
 
     try:
         async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(url, params=params, headers=headers)
+            with timed("upstream_cdc"):
+                resp = await client.get(url, params=params, headers=headers)
             resp.raise_for_status()
             data = resp.json()
             _set_cached(cache_key, data)
@@ -99,7 +105,8 @@ async def fetch_census_population(
 
     try:
         async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(url, params=params)
+            with timed("upstream_census"):
+                resp = await client.get(url, params=params)
             resp.raise_for_status()
             rows = resp.json()
             # First row is headers, rest is data
@@ -149,7 +156,8 @@ async def fetch_noaa_climate(
 
     try:
         async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(url, params=params, headers=headers)
+            with timed("upstream_noaa"):
+                resp = await client.get(url, params=params, headers=headers)
             resp.raise_for_status()
             data = resp.json().get("results", [])
             _set_cached(cache_key, data)
@@ -180,7 +188,8 @@ async def fetch_who_indicator(
 
     try:
         async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(url, params=params)
+            with timed("upstream_who"):
+                resp = await client.get(url, params=params)
             resp.raise_for_status()
             data = resp.json().get("value", [])
             _set_cached(cache_key, data)
@@ -191,13 +200,58 @@ async def fetch_who_indicator(
         return []
 
 
+# ── Case history (outbreak_history table) ───────────────────────────
+
+# The case-count features the model is trained on
+# (src/preprocessing/process_atlasplus_for_lstm.py): the latest period's
+# cases and the CASE_LAGS periods before it
+CASE_LAGS = 3
+CASE_HISTORY_FEATURES = ("Cases",) + tuple(f"Cases_lag_{lag}" for lag in range(1, CASE_LAGS + 1))
+
+
+async def fetch_case_history(
+    db: AsyncSession, location_id: int, disease_type: str, lags: int = CASE_LAGS
+) -> dict:
+    """
+    Case counts from a location's most recent outbreak_history rows: Cases
+    for the latest period and Cases_lag_1..`lags` for the ones before it.
+
+    A model fed windows of several periods needs more lags than it has
+    features (each earlier step's lags reach further back), so callers ask
+    for as many as the served model needs. Periods with no record are left
+    out rather than zero-filled, so the prediction service can tell that
+    the history is incomplete.
+    """
+    result = await db.execute(
+        select(OutbreakHistory.case_count)
+        .where(
+            OutbreakHistory.location_id == location_id,
+            OutbreakHistory.disease_type == disease_type,
+        )
+        .order_by(OutbreakHistory.date.desc())
+        .limit(lags + 1)
+    )
+    counts = result.scalars().all()
+    names = ["Cases"] + [f"Cases_lag_{lag}" for lag in range(1, lags + 1)]
+    return {name: float(count) for name, count in zip(names, counts) if count is not None}
+
+
 # ── Feature Assembly ─────────────────────────────────────────────────
 
+LOCATION_FEATURES = (
+    "population", "population_density", "unemployment_rate", "vaccination_rate",
+    "avg_temp", "avg_humidity", "otc_search_index",
+)
+
+# Every feature the API can supply; a model needing anything else is not served
+SERVED_FEATURES = frozenset(LOCATION_FEATURES + CASE_HISTORY_FEATURES)
+
+
 async def build_features_for_location(fips: str) -> dict:
     """
-    Assemble the full feature dict needed by the ML model for a given FIPS code.
-    Pulls from Census + NOAA + synthetic fallbacks.
-    Returns a dict matching the model's expected feature_cols.
+    Assemble the location features (LOCATION_FEATURES) for a FIPS code.
+    Pulls from Census + NOAA + synthetic fallbacks; the case-count features
+    come from fetch_case_history.
     """
     state_fips = fips[:2]
     county_fips = fips[2:]
@@ -232,7 +286,4 @@ async def build_features_for_location(fips: str) -> dict:
         "avg_temp": avg_temp,
         "avg_humidity": avg_humidity,
         "otc_search_index": 35.0,        # TODO: Google Trends integration
-        "flu_cases_lag_1": 0,            # TODO: pull from outbreak_history table
-        "flu_cases_lag_2": 0,
-        "flu_cases_lag_3": 0,
     }
@@ -0,0 +1,39 @@
+"""
+Gunicorn configuration for multi-worker deployments.
+
+Run from backend/:  gunicorn -c gunicorn.conf.py backend.main:app
+
+With preload_app the app is imported — and the model artifact loaded —
+once in the master before any worker is forked, so every worker shares the
+same read-only weight pages copy-on-write instead of holding its own copy.
+Set PRELOAD_MODEL=false to fall back to each worker loading on startup.
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_MODEL", "true").lower() == "true"
+
+
+def when_ready(server):
+    """Runs in the master after the app is preloaded, before workers fork."""
+    if not preload_app:
+        return
+
+    from backend.core.config import get_settings
+    from backend.services.ml_service import prediction_service
+
+    settings = get_settings()
+    # Load only — no inference in the master, so torch's thread pool is never
+    # started before fork.
+    prediction_service.load_model(settings.model_path, settings.model_device)
+    if prediction_service.is_loaded:
+        server.log.info(f"Preloaded model {prediction_service.model_version} for COW sharing")
+
+    # Move everything allocated so far into the permanent generation so the
+    # workers' garbage collector doesn't touch (and un-share) those pages.
+    gc.freeze()
@@ -0,0 +1,18 @@
+"""
+Shared test setup: the backend package on the path and a throwaway SQLite
+database.
+
+Run from backend/:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Settings are read when backend modules are imported, so this has to happen
+# before any test module imports them
+_db_dir = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,156 @@
+"""Admission control: shedding, deadlines and slot hand-over."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from backend.core.metrics import ADMISSION_REJECTED
+from backend.middleware.admission import AdmissionClass, AdmissionMiddleware
+
+
+async def _queue(admission: AdmissionClass) -> asyncio.Task:
+    """Start an acquire() that has to wait, and let it reach the queue."""
+    task = asyncio.create_task(admission.acquire())
+    await asyncio.sleep(0)
+    return task
+
+
+@pytest.mark.asyncio
+async def test_admits_up_to_the_limit_without_queueing():
+    admission = AdmissionClass("predict", max_concurrent=2, max_queued=1, deadline=1.0)
+    assert await admission.acquire() is None
+    assert await admission.acquire() is None
+    assert admission.active == 2
+    assert admission.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_sheds_when_the_queue_is_full():
+    admission = AdmissionClass("predict", max_concurrent=1, max_queued=1, deadline=1.0)
+    assert await admission.acquire() is None
+    waiting = await _queue(admission)
+
+    assert await admission.acquire() == "queue_full"
+    assert admission.queued == 1
+
+    admission.release()
+    assert await waiting is None
+
+
+@pytest.mark.asyncio
+async def test_sheds_when_the_expected_wait_exceeds_the_deadline():
+    admission = AdmissionClass("predict", max_concurrent=1, max_queued=10, deadline=1.0)
+    assert await admission.acquire() is None
+    admission.service_time = 5.0
+
+    # One slot, 5 s per request: even first in line would wait past 1 s
+    assert admission.expected_wait() == 5.0
+    assert await admission.acquire() == "expected_wait"
+    assert admission.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_request_is_shed_at_its_deadline():
+    admission = AdmissionClass("predict", max_concurrent=1, max_queued=10, deadline=0.05)
+    assert await admission.acquire() is None
+
+    assert await admission.acquire() == "deadline"
+    assert admission.queued == 0
+    assert admission.active == 1
+
+
+@pytest.mark.asyncio
+async def test_release_hands_the_slot_to_the_oldest_waiter():
+    admission = AdmissionClass("predict", max_concurrent=1, max_queued=10, deadline=1.0)
+    assert await admission.acquire() is None
+    first = await _queue(admission)
+    second = await _queue(admission)
+
+    admission.release(service_seconds=0.2)
+    assert await first is None
+    assert not second.done()
+    assert admission.active == 1
+    assert admission.service_time == 0.2
+
+    admission.release()
+    assert await second is None
+    admission.release()
+    assert admission.active == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_is_skipped():
+    admission = AdmissionClass("predict", max_concurrent=1, max_queued=10, deadline=1.0)
+    assert await admission.acquire() is None
+    gone = await _queue(admission)
+    waiting = await _queue(admission)
+
+    gone.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await gone
+    assert admission.queued == 1
+
+    admission.release()
+    assert await waiting is None
+    assert admission.active == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_after_being_handed_the_slot_passes_it_on():
+    admission = AdmissionClass("predict", max_concurrent=1, max_queued=10, deadline=1.0)
+    assert await admission.acquire() is None
+    handed = await _queue(admission)
+    waiting = await _queue(admission)
+
+    # The slot goes to `handed`, whose client disconnects before it resumes
+    admission.release()
+    handed.cancel()
+    try:
+        await handed
+    except asyncio.CancelledError:
+        pass
+    else:
+        # Before 3.12, wait_for returns the result instead of raising when
+        # its future completed as it was cancelled; the caller then holds
+        # the slot and releases it like any admitted request
+        admission.release()
+
+    assert await waiting is None
+    assert admission.active == 1
+    assert admission.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_with_503_and_retry_after():
+    started, finish = asyncio.Event(), asyncio.Event()
+
+    async def app(scope, receive, send):
+        started.set()
+        await finish.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = AdmissionMiddleware(
+        app,
+        classes={"predict": (1, 0, 1.0)},
+        routes={"/api/v1/risk/predict": "predict"},
+        default_class="read",
+    )
+    rejected_before = ADMISSION_REJECTED.series.get(("predict", "queue_full"), 0)
+
+    transport = httpx.ASGITransport(app=middleware)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.create_task(client.post("/api/v1/risk/predict"))
+        await started.wait()
+
+        shed = await client.post("/api/v1/risk/predict")
+        assert shed.status_code == 503
+        assert int(shed.headers["Retry-After"]) >= 1
+        assert shed.json()["retry_after_seconds"] >= 1
+
+        # No "read" class is configured, so other routes pass straight through
+        finish.set()
+        assert (await first).status_code == 200
+
+    assert ADMISSION_REJECTED.series[("predict", "queue_full")] == rejected_before + 1
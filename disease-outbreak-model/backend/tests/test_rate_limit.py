@@ -0,0 +1,133 @@
+"""Sliding-window rate limiter, driven by a fake clock."""
+
+import httpx
+import pytest
+
+from backend.middleware.rate_limit import RateLimitMiddleware, SlidingWindowLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(limit: float = 5, **kwargs) -> tuple[SlidingWindowLimiter, FakeClock]:
+    clock = FakeClock()
+    return SlidingWindowLimiter(limit, window_seconds=60, clock=clock, **kwargs), clock
+
+
+def spend(limiter: SlidingWindowLimiter, key: str, n: int) -> None:
+    for _ in range(n):
+        assert limiter.hit(key) == (True, 0.0)
+
+
+def test_allows_up_to_the_limit_within_a_window():
+    limiter, _ = make_limiter()
+    spend(limiter, "a", 5)
+    allowed, retry_after = limiter.hit("a")
+    assert not allowed
+    # Next window starts at 60 s with previous = 5; one more request fits
+    # once 5 * (1 - x/60) + 1 <= 5, i.e. 12 s into it
+    assert retry_after == pytest.approx(72.0)
+
+
+def test_keys_are_limited_independently():
+    limiter, _ = make_limiter()
+    spend(limiter, "a", 5)
+    assert limiter.hit("b") == (True, 0.0)
+
+
+def test_previous_window_decays_after_roll_over():
+    limiter, clock = make_limiter()
+    spend(limiter, "a", 5)
+
+    # Start of the next window: the previous window still counts in full
+    clock.now = 60.0
+    assert not limiter.hit("a")[0]
+
+    # Halfway through it only half of the previous window counts: 2.5
+    clock.now = 90.0
+    spend(limiter, "a", 2)
+    allowed, retry_after = limiter.hit("a")
+    assert not allowed
+    # 5 * (1 - x) + 2 + 1 <= 5 once x = 0.6, i.e. 6 s later
+    assert retry_after == pytest.approx(6.0)
+
+    clock.now = 90.0 + retry_after - 0.01
+    assert not limiter.hit("a")[0]
+    clock.now = 90.0 + retry_after
+    assert limiter.hit("a")[0]
+
+
+def test_counts_reset_after_a_whole_idle_window():
+    limiter, clock = make_limiter()
+    spend(limiter, "a", 5)
+    clock.now = 120.0
+    spend(limiter, "a", 5)
+
+
+def test_retry_after_within_the_window_when_only_the_previous_share_blocks():
+    limiter, clock = make_limiter(limit=10)
+    spend(limiter, "a", 10)
+    clock.now = 75.0                     # a quarter in: previous counts 7.5
+    spend(limiter, "a", 2)
+    allowed, retry_after = limiter.hit("a")
+    assert not allowed
+    # 10 * (1 - x) + 2 + 1 <= 10 once x = 0.3: 0.05 windows = 3 s from now
+    assert retry_after == pytest.approx(3.0)
+
+
+def test_cost_above_the_limit_is_capped_to_one_call_per_window():
+    limiter, clock = make_limiter()
+    assert limiter.hit("a", cost=100) == (True, 0.0)
+    assert not limiter.hit("a", cost=100)[0]
+    clock.now = 120.0
+    assert limiter.hit("a", cost=100)[0]
+
+
+def test_sweep_evicts_keys_idle_for_two_windows():
+    limiter, clock = make_limiter()
+    limiter.hit("old")
+    clock.now = 70.0
+    limiter.hit("recent")
+
+    # At 130 s (window 2), window 1 can still weigh on the estimate
+    assert limiter.sweep(130.0) == 1
+    assert len(limiter) == 1
+    assert limiter.hit("recent")[0]
+
+
+def test_hit_sweeps_every_sweep_interval():
+    limiter, clock = make_limiter(sweep_interval=30)
+    for i in range(10):
+        limiter.hit(f"scanner-{i}")
+    assert len(limiter) == 10
+
+    clock.now = 125.0
+    limiter.hit("a")
+    assert len(limiter) == 1
+
+
+@pytest.mark.asyncio
+async def test_middleware_rejects_with_429_and_retry_after():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    limiter, _ = make_limiter(limit=3)
+    middleware = RateLimitMiddleware(app, route_costs={"/api/v1/risk/predict": 2}, limiter=limiter)
+
+    transport = httpx.ASGITransport(app=middleware)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.post("/api/v1/risk/predict")).status_code == 200
+        assert (await client.get("/api/v1/risk/map")).status_code == 200
+
+        limited = await client.get("/api/v1/risk/map")
+        assert limited.status_code == 429
+        assert limited.headers["Retry-After"] == str(limited.json()["retry_after_seconds"])
+
+        # Health checks are never limited
+        assert (await client.get("/api/v1/health")).status_code == 200
@@ -0,0 +1,150 @@
+"""Lazy DB sessions and the background health check."""
+
+import asyncio
+import time
+from typing import Optional
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from backend.db.session import DatabaseHealth, db_health, engine
+from backend.main import app
+from backend.services.ml_service import prediction_service
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as c:
+        deadline = time.monotonic() + 60
+        while prediction_service.is_loading and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # Stop the periodic check so only the requests' checkouts are counted;
+        # the status it already recorded stays in place
+        c.portal.call(db_health.stop)
+        yield c
+
+
+@pytest.fixture
+def checkouts():
+    """Number of connections checked out of the pool while the test runs."""
+    count = [0]
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        count[0] += 1
+
+    pool = engine.sync_engine.pool
+    event.listen(pool, "checkout", on_checkout)
+    yield count
+    event.remove(pool, "checkout", on_checkout)
+
+
+# ── No pool checkout ─────────────────────────────────────────────────
+
+def test_health_does_not_check_out_a_connection(client, checkouts):
+    response = client.get("/api/v1/health")
+    assert response.status_code == 200
+    assert response.json()["database_connected"] is True
+    assert checkouts[0] == 0
+
+
+def test_predict_rejected_while_loading_does_not_check_out_a_connection(client, checkouts, monkeypatch):
+    monkeypatch.setattr(prediction_service, "_loading", True)
+    response = client.post("/api/v1/risk/predict", json={"fips": "06037"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert checkouts[0] == 0
+
+
+def test_database_route_checks_out_a_connection(client, checkouts):
+    # Control for the two tests above: the listener does see real queries
+    assert client.get("/api/v1/locations/").status_code == 200
+    assert checkouts[0] >= 1
+
+
+# ── Health states ────────────────────────────────────────────────────
+
+def test_stale_status_is_reported_disconnected(client, monkeypatch):
+    monkeypatch.setattr(db_health, "connected", True)
+    monkeypatch.setattr(db_health, "checked_at", time.monotonic() - 2 * db_health.interval)
+    assert client.get("/api/v1/health").json()["database_connected"] is True
+
+    # Older than three intervals: the checker stalled, so don't trust it
+    monkeypatch.setattr(db_health, "checked_at", time.monotonic() - 3.5 * db_health.interval)
+    body = client.get("/api/v1/health").json()
+    assert body["database_connected"] is False
+    assert body["status"] == "degraded"
+    assert body["database_checked_seconds_ago"] >= 3 * db_health.interval
+
+
+def test_unchecked_status_is_reported_disconnected(client, monkeypatch):
+    monkeypatch.setattr(db_health, "connected", False)
+    monkeypatch.setattr(db_health, "checked_at", None)
+    body = client.get("/api/v1/health").json()
+    assert body["database_connected"] is False
+    assert body["database_checked_seconds_ago"] is None
+
+
+# ── DatabaseHealth.refresh ───────────────────────────────────────────
+
+def make_health(ping, timeout: float = 1.0) -> DatabaseHealth:
+    health = DatabaseHealth(interval=10.0, timeout=timeout)
+    health._ping = ping
+    return health
+
+
+class CountingPing:
+    def __init__(self, error: Optional[Exception] = None, delay: float = 0.0):
+        self.calls = 0
+        self.error = error
+        self.delay = delay
+
+    async def __call__(self) -> None:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.mark.asyncio
+async def test_ping_runs_when_there_was_no_traffic():
+    ping = CountingPing()
+    health = make_health(ping)
+    assert await health.refresh() is True
+    assert await health.refresh() is True
+    assert ping.calls == 2
+    assert health.age is not None and health.age < 1
+
+
+@pytest.mark.asyncio
+async def test_ping_skipped_after_real_traffic():
+    ping = CountingPing()
+    health = make_health(ping)
+    await health.refresh()
+
+    await asyncio.sleep(0.001)
+    health.record_success()
+    assert await health.refresh() is True
+    assert ping.calls == 1
+
+    # The probe's own query never counts as traffic for the next round
+    assert await health.refresh() is True
+    assert ping.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_ping_reports_disconnected_until_it_recovers():
+    ping = CountingPing(error=OSError("connection refused"))
+    health = make_health(ping)
+    assert await health.refresh() is False
+    assert health.connected is False
+
+    ping.error = None
+    assert await health.refresh() is True
+    assert health.connected is True
+
+
+@pytest.mark.asyncio
+async def test_ping_that_hangs_times_out_as_disconnected():
+    health = make_health(CountingPing(delay=1.0), timeout=0.01)
+    assert await health.refresh() is False
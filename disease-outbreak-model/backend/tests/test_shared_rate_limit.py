@@ -0,0 +1,147 @@
+"""Redis-backed shared limiter, driven by a fake clock and an in-memory store."""
+
+import pytest
+import redis.asyncio as redis
+
+from backend.middleware import shared_rate_limit
+from backend.middleware.shared_rate_limit import SharedWindowLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeStore:
+    """Runs SYNC_SCRIPT's logic against a dict, or fails while `down` is set."""
+
+    def __init__(self):
+        self.values: dict[str, float] = {}
+        self.down = False
+        self.calls = 0
+
+    def register_script(self, script: str) -> "FakeStore":
+        assert script == shared_rate_limit.SYNC_SCRIPT
+        return self
+
+    async def __call__(self, keys: list[str], args: list) -> list[str]:
+        self.calls += 1
+        if self.down:
+            raise redis.ConnectionError("connection refused")
+        totals = []
+        for key, cost in zip(keys, args[1:]):
+            if cost > 0:
+                self.values[key] = self.values.get(key, 0.0) + cost
+            totals.append(str(self.values.get(key, 0.0)))
+        return totals
+
+    async def aclose(self) -> None:
+        pass
+
+
+@pytest.fixture
+def store(monkeypatch) -> FakeStore:
+    store = FakeStore()
+    monkeypatch.setattr(shared_rate_limit.redis, "from_url", lambda url, **kwargs: store)
+    return store
+
+
+def make_limiter(clock: FakeClock, limit: float = 10, **kwargs) -> SharedWindowLimiter:
+    # A sync interval far beyond the test, so only the explicit sync() calls run
+    return SharedWindowLimiter(
+        limit, "redis://test", window_seconds=60, sync_interval=3600, clock=clock, **kwargs
+    )
+
+
+def spend(limiter: SharedWindowLimiter, key: str, n: int) -> None:
+    for _ in range(n):
+        assert limiter.hit(key) == (True, 0.0)
+
+
+@pytest.mark.asyncio
+async def test_cost_is_credited_to_the_window_it_was_spent_in(store):
+    clock = FakeClock(59.0)
+    limiter = make_limiter(clock)
+    spend(limiter, "a", 3)
+    clock.now = 61.0
+    spend(limiter, "a", 2)
+
+    # Synced after the boundary: the 3 spent in window 0 stay there
+    assert await limiter.sync()
+    assert store.values == {"ratelimit:a:0": 3.0, "ratelimit:a:1": 2.0}
+    assert limiter._counters["a"] == [1, 3.0, 2.0]
+    await limiter.close()
+
+
+@pytest.mark.asyncio
+async def test_workers_share_one_budget(store):
+    clock = FakeClock(10.0)
+    first, second = make_limiter(clock), make_limiter(clock)
+    spend(first, "a", 4)
+    assert await first.sync()
+    spend(second, "a", 3)
+    assert await second.sync()
+
+    # The second worker now sees all 7 and admits only the 3 left
+    spend(second, "a", 3)
+    assert not second.hit("a")[0]
+    assert await second.sync()
+    assert store.values == {"ratelimit:a:0": 10.0}
+
+    # A rejected hit still refreshes the first worker's view
+    assert first.hit("a") == (True, 0.0)
+    assert await first.sync()
+    assert first._counters["a"][2] == 11.0
+    assert not first.hit("a")[0]
+    await first.close()
+    await second.close()
+
+
+@pytest.mark.asyncio
+async def test_fails_open_while_the_store_is_down_and_recovers(store):
+    clock = FakeClock(10.0)
+    limiter = make_limiter(clock, limit=5, retry_interval=5.0)
+    store.down = True
+
+    spend(limiter, "a", 2)
+    assert not await limiter.sync()
+    assert not limiter.store_available
+
+    # Still limited per worker
+    spend(limiter, "a", 3)
+    assert not limiter.hit("a")[0]
+
+    # While backing off the store isn't contacted and the counts are dropped
+    calls = store.calls
+    assert not await limiter.sync()
+    assert store.calls == calls
+    assert limiter._pending == {}
+
+    store.down = False
+    clock.now = 15.0
+    limiter.hit("b")
+    assert await limiter.sync()
+    assert limiter.store_available
+    assert store.values == {"ratelimit:b:0": 1.0}
+    await limiter.close()
+
+
+@pytest.mark.asyncio
+async def test_unexpected_sync_errors_also_fail_open(monkeypatch):
+    def malformed(url, **kwargs):
+        raise ValueError("Redis URL must specify one of the following schemes")
+
+    monkeypatch.setattr(shared_rate_limit.redis, "from_url", malformed)
+    clock = FakeClock(10.0)
+    limiter = make_limiter(clock, limit=2)
+    spend(limiter, "a", 2)
+
+    assert not await limiter.sync()
+    assert not limiter.store_available
+    assert not limiter.hit("a")[0]
+    # The background task is still alive to retry
+    assert not limiter._task.done()
+    await limiter.close()
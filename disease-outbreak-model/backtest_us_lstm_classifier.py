@@ -0,0 +1,284 @@
+
+import pandas as pd
+import numpy as np
+import torch
+from sklearn.metrics import (
+    accuracy_score, brier_score_loss, f1_score, log_loss, precision_score, recall_score, roc_auc_score,
+)
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(str(Path(__file__).parent / 'src'))
+from models.Disease_Predictor import OutbreakLSTMClassifier
+from preprocessing.sequences import create_sequences, get_feature_cols
+from preprocessing.dataset_cache import DatasetCache, DEFAULT_CACHE_DIR
+from preprocessing.process_atlasplus_for_lstm import (
+    LAG_STEPS, OUTBREAK_THRESHOLD, LEGACY_INDICATOR, TRAIN_FILE, TEST_FILE, indicator_slug, partition_paths,
+)
+from train_us_lstm_classifier import OutbreakDataset, TensorBatchLoader, train_model
+
+# Rolling-origin backtest: for every origin year Y a fresh model is trained
+# on windows ending before Y, early-stopped on windows ending in Y, and
+# scored on windows ending in Y + 1. Folds run in parallel worker processes.
+#
+# The train and test files are stacked once into raw (unscaled) windows and
+# cached; each fold selects its rows with index masks on the memory-mapped
+# arrays and normalizes with a scaler fit on records up to its origin year,
+# so no fold sees statistics from the years it is tested on.
+
+SEQ_LENGTH = 3
+
+RESULT_COLUMNS = [
+    'run_id', 'run_at', 'indicator', 'origin_year', 'test_year',
+    'hidden_dim', 'num_layers', 'dropout', 'learning_rate', 'batch_size', 'epochs',
+    'n_train', 'n_val', 'n_test', 'test_outbreak_rate',
+    'auc', 'accuracy', 'precision', 'recall', 'f1', 'brier', 'log_loss',
+    'best_epoch', 'seconds',
+]
+
+def build_backtest_arrays(sources, seq_length):
+    # All years of every source in one frame; windows keep raw features so
+    # each fold can apply its own scaler
+    df = pd.concat([pd.read_csv(path) for path in sources], ignore_index=True)
+    feature_cols = get_feature_cols(df)
+    
+    sequences, labels, counties, years = create_sequences(df, seq_length, feature_cols)
+    
+    arrays = {
+        'sequences': sequences, 'labels': labels.astype(np.float32),
+        'counties': counties.astype(str), 'years': years.astype(np.int64),
+        'record_features': df[feature_cols].to_numpy(dtype=np.float64),
+        'record_years': df['Year'].to_numpy(dtype=np.int64),
+    }
+    meta = {
+        'feature_cols': feature_cols,
+        'records': len(df),
+        'counties': int(df['FIPS'].nunique()),
+        'years': [int(df['Year'].min()), int(df['Year'].max())],
+    }
+    return arrays, meta
+
+def load_backtest_arrays(sources, seq_length, cache):
+    params = {
+        'stage': 'backtest',
+        'seq_length': seq_length,
+        'lags': LAG_STEPS,
+        'outbreak_threshold': OUTBREAK_THRESHOLD,
+    }
+    return cache.get_or_build(
+        list(sources), params,
+        lambda: build_backtest_arrays(sources, seq_length),
+    )
+
+def fold_indices(years, origin_year):
+    # Window positions by the year of their label
+    return (np.flatnonzero(years < origin_year),
+            np.flatnonzero(years == origin_year),
+            np.flatnonzero(years == origin_year + 1))
+
+def fold_scaler(record_features, record_years, origin_year):
+    # StandardScaler statistics over the records the fold may see
+    seen = record_features[record_years <= origin_year]
+    mean = seen.mean(axis=0)
+    scale = seen.std(axis=0)
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+def fold_metrics(labels, probs):
+    preds = (probs > 0.5).astype(int)
+    single_class = len(np.unique(labels)) < 2
+    return {
+        'auc': float('nan') if single_class else roc_auc_score(labels, probs),
+        'accuracy': accuracy_score(labels, preds),
+        'precision': precision_score(labels, preds, zero_division=0),
+        'recall': recall_score(labels, preds, zero_division=0),
+        'f1': f1_score(labels, preds, zero_division=0),
+        'brier': brier_score_loss(labels, probs),
+        'log_loss': float('nan') if single_class else log_loss(labels, probs, labels=[0, 1]),
+    }
+
+# Per-process state, set by the pool initializer
+_DATA = None
+
+def _init_worker(threads, sources, cache_dir):
+    
+    # Every worker maps the same cache entry the parent built, so the
+    # windows exist once in the page cache however many folds run
+    global _DATA
+    torch.set_num_threads(threads)
+    _DATA, _, _ = load_backtest_arrays(sources, SEQ_LENGTH, DatasetCache(cache_dir))
+
+def run_fold(origin_year, params, settings):
+    
+    started = time.perf_counter()
+    data = _DATA
+    torch.manual_seed(settings['seed'] + origin_year)
+    
+    train_idx, val_idx, test_idx = fold_indices(data['years'], origin_year)
+    mean, scale = fold_scaler(data['record_features'], data['record_years'], origin_year)
+    
+    def fold_dataset(idx):
+        # Fancy indexing copies only this fold's windows out of the mapping
+        sequences = ((data['sequences'][idx] - mean) / scale).astype(np.float32)
+        return OutbreakDataset(sequences, data['labels'][idx])
+    
+    train_dataset, val_dataset, test_dataset = (fold_dataset(idx) for idx in (train_idx, val_idx, test_idx))
+    train_loader = TensorBatchLoader(train_dataset, params['batch_size'], shuffle=True)
+    val_loader = TensorBatchLoader(val_dataset, params['batch_size'])
+    
+    model = OutbreakLSTMClassifier(
+        input_dim=data['sequences'].shape[2],
+        hidden_dim=params['hidden_dim'],
+        num_layers=params['num_layers'],
+        dropout=params['dropout']
+    )
+    train_labels = data['labels'][train_idx]
+    positives = (train_labels == 1).sum()
+    # An early fold can have no outbreak windows at all; leave it unweighted
+    pos_weight = (train_labels == 0).sum() / positives if positives else 1.0
+    
+    checkpoint_path = Path(settings['checkpoint_dir']) / f'fold_{origin_year}.pth'
+    metric = settings['checkpoint_metric']
+    epoch_stats = []
+    train_model(
+        model, train_loader, val_loader, params['epochs'], params['learning_rate'],
+        torch.device('cpu'), pos_weight, str(checkpoint_path), log_every=params['epochs'] + 1,
+        epoch_stats=epoch_stats, checkpoint_metric=metric
+    )
+    # The epoch train_model checkpointed (first one at the best value)
+    scores = [e[metric] for e in epoch_stats]
+    best = int(np.argmax(scores) if metric == 'val_auc' else np.argmin(scores))
+    
+    model.load_state_dict(torch.load(checkpoint_path))
+    model.eval()
+    with torch.no_grad():
+        probs = torch.sigmoid(model(test_dataset.sequences).squeeze(-1)).numpy()
+    test_labels = test_dataset.labels.numpy()
+    
+    return {
+        'origin_year': origin_year,
+        'test_year': origin_year + 1,
+        'n_train': len(train_idx),
+        'n_val': len(val_idx),
+        'n_test': len(test_idx),
+        'test_outbreak_rate': float(test_labels.mean()),
+        **fold_metrics(test_labels, probs),
+        'best_epoch': epoch_stats[best]['epoch'],
+        'seconds': round(time.perf_counter() - started, 1),
+    }
+
+def append_results(records, path):
+    # One row per fold; runs are appended so quality can be tracked over time
+    results = pd.DataFrame(records, columns=RESULT_COLUMNS).sort_values('origin_year')
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(path, mode='a', header=not path.exists(), index=False, float_format='%.6g')
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of the US outbreak LSTM classifier')
+    parser.add_argument('--indicator', help='backtest one indicator partition instead of the Chlamydia files')
+    parser.add_argument('--train-file', help='override the training CSV')
+    parser.add_argument('--test-file', help='override the test CSV')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument('--first-origin', type=int, default=2010,
+                        help='first origin year (trains on windows ending before it)')
+    parser.add_argument('--last-origin', type=int, help='default: the second-to-last year in the data')
+    parser.add_argument('--hidden-dim', type=int, default=64)
+    parser.add_argument('--num-layers', type=int, default=2)
+    parser.add_argument('--dropout', type=float, default=0.3)
+    parser.add_argument('--lr', type=float, default=0.001)
+    parser.add_argument('--batch-size', type=int, default=512)
+    parser.add_argument('--epochs', type=int, default=20, help='max epochs per fold')
+    parser.add_argument('--checkpoint-metric', choices=['val_auc', 'val_loss'], default='val_auc',
+                        help='validation metric that picks each fold\'s tested epoch')
+    parser.add_argument('--jobs', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help='folds run in parallel')
+    parser.add_argument('--threads-per-job', type=int,
+                        help='torch threads per fold (default: cores / jobs)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', default='backtests')
+    return parser.parse_args()
+
+def main(args):
+    if args.indicator:
+        default_train, default_test = partition_paths(args.indicator)
+        suffix = f'_{indicator_slug(args.indicator)}'
+    else:
+        default_train, default_test = TRAIN_FILE, TEST_FILE
+        suffix = ''
+    sources = [str(args.train_file or default_train), str(args.test_file or default_test)]
+    
+    print("=" * 80)
+    print(f"Rolling-Origin Backtest: US {args.indicator or LEGACY_INDICATOR} LSTM Classifier")
+    print("=" * 80)
+    
+    print("\nPreparing shared sequence windows...")
+    start = time.perf_counter()
+    data, meta, cache_hit = load_backtest_arrays(sources, SEQ_LENGTH, DatasetCache(args.cache_dir))
+    source = "memory-mapped from cache" if cache_hit else "built and cached"
+    print(f"Prepared {len(data['labels']):,} windows from {meta['records']:,} records "
+          f"({meta['years'][0]}-{meta['years'][1]}) in {time.perf_counter() - start:.2f}s ({source})")
+    
+    last_origin = args.last_origin or meta['years'][1] - 1
+    window_years = set(np.unique(data['years']).tolist())
+    origins = [
+        year for year in range(args.first_origin, last_origin + 1)
+        if {year - 1, year, year + 1} <= window_years
+    ]
+    if not origins:
+        raise SystemExit(f"No folds between {args.first_origin} and {last_origin} have train, val and test windows")
+    
+    threads = args.threads_per_job or max(1, (os.cpu_count() or 1) // args.jobs)
+    output_dir = Path(args.output_dir)
+    checkpoint_dir = output_dir / f'checkpoints{suffix}'
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    results_path = output_dir / f'backtest_results{suffix}.csv'
+    
+    params = {
+        'hidden_dim': args.hidden_dim, 'num_layers': args.num_layers, 'dropout': args.dropout,
+        'learning_rate': args.lr, 'batch_size': args.batch_size, 'epochs': args.epochs,
+    }
+    settings = {'seed': args.seed, 'checkpoint_dir': str(checkpoint_dir),
+                'checkpoint_metric': args.checkpoint_metric}
+    run_at = datetime.now(timezone.utc)
+    run_info = {
+        'run_id': run_at.strftime('%Y%m%dT%H%M%SZ'), 'run_at': run_at.isoformat(timespec='seconds'),
+        'indicator': args.indicator or LEGACY_INDICATOR, **params,
+    }
+    
+    print(f"\nFolds: {len(origins)} (origins {origins[0]}-{origins[-1]}), max epochs: {args.epochs}, "
+          f"checkpoint: best {args.checkpoint_metric}, jobs: {args.jobs} x {threads} threads")
+    
+    ctx = mp.get_context('spawn')
+    records = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=args.jobs, mp_context=ctx, initializer=_init_worker,
+        initargs=(threads, sources, str(args.cache_dir)),
+    ) as pool:
+        futures = [pool.submit(run_fold, origin, params, settings) for origin in origins]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append({**run_info, **record})
+            print(f"  Train <{record['origin_year']}, test {record['test_year']}: AUC={record['auc']:.4f} "
+                  f"F1={record['f1']:.4f} ({record['n_test']:,} windows, {record['seconds']:.0f}s)")
+    
+    results = append_results(records, results_path)
+    
+    print("\n" + "=" * 80)
+    print(f"Backtest complete in {time.perf_counter() - started:.0f}s")
+    print("=" * 80)
+    print(results[['test_year', 'n_train', 'n_test', 'test_outbreak_rate', 'auc', 'f1', 'brier', 'best_epoch']]
+          .to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+    print(f"\nMean AUC: {results['auc'].mean():.4f} (std {results['auc'].std():.4f})")
+    print(f"Results appended to: {results_path} (run {run_info['run_id']})")
+
+if __name__ == '__main__':
+    main(parse_args())
@@ -0,0 +1,165 @@
+"""
+AtlasPlus ingestion benchmark: legacy script vs. vectorized loader.
+
+Generates a synthetic multi-million-row AtlasPlusTableData.csv and loads it
+with (a) the original readlines() + full read_csv + row-wise .apply()
+cleaning, and (b) load_atlasplus() with each available engine / chunked
+mode. Every variant runs in a fresh process so peak RSS is measured in
+isolation.
+
+Usage (from disease-outbreak-model/):
+    python benchmarks/bench_atlasplus_ingest.py --rows 5000000
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from synthetic import make_atlasplus_csv
+
+
+def legacy_load(path):
+    """The original process_atlasplus_for_lstm.main loading/cleaning steps."""
+    import numpy as np
+    import pandas as pd
+
+    def clean_year(year_str):
+        return int(str(year_str).split()[0])
+
+    def extract_numeric_cases(val):
+        if pd.isna(val):
+            return np.nan
+        val_str = str(val).strip()
+        if val_str in ['Data not available', 'Suppressed', '']:
+            return np.nan
+        val_str = val_str.replace(',', '')
+        try:
+            return float(val_str)
+        except:
+            return np.nan
+
+    def extract_fips_code(fips_str):
+        if pd.isna(fips_str):
+            return None
+        fips_str = str(fips_str).strip()
+        if len(fips_str) >= 5:
+            return fips_str[:5]
+        return fips_str
+
+    with open(path, 'r') as f:
+        lines = f.readlines()
+        header_row = 0
+        for i, line in enumerate(lines):
+            if 'Indicator,Year,State' in line:
+                header_row = i
+                break
+
+    df_full = pd.read_csv(path, skiprows=header_row)
+    df = df_full[
+        (df_full['Age Group'] == 'All age groups') &
+        (df_full['Sex'] == 'Both sexes') &
+        (df_full['Race/Ethnicity'] == 'All races/ethnicities')
+    ].copy()
+    df['Year'] = df['Year'].apply(clean_year)
+    df['Cases'] = df['Cases'].apply(extract_numeric_cases)
+    df['FIPS'] = df['FIPS'].apply(extract_fips_code)
+    return df.dropna(subset=['FIPS', 'Cases'])
+
+
+def peak_rss_mib():
+    # VmHWM is reset by exec, unlike ru_maxrss which a spawned child
+    # inherits from the (much larger) parent that generated the file
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_variant(name, path, queue):
+    from preprocessing.process_atlasplus_for_lstm import load_atlasplus
+
+    started = time.perf_counter()
+    if name == "legacy":
+        df = legacy_load(path)
+    elif name == "chunked":
+        df = load_atlasplus(path, chunksize=500_000)
+    else:
+        df = load_atlasplus(path, engine=name)
+    elapsed = time.perf_counter() - started
+
+    peak_mib = peak_rss_mib()
+    queue.put({"variant": name, "seconds": round(elapsed, 3), "peak_rss_mib": round(peak_mib, 1), "rows": len(df)})
+
+
+def run_variant(name, path):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_variant, args=(name, path, queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f"Variant {name!r} failed (exit code {proc.exitcode})")
+    return queue.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variants", nargs="+", default=["legacy", "c", "pyarrow", "chunked"])
+    parser.add_argument("--output", default=str(RESULTS_DIR / "atlasplus_ingest.json"))
+    args = parser.parse_args()
+
+    variants = list(args.variants)
+    if "pyarrow" in variants:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("pyarrow not installed — skipping the pyarrow variant")
+            variants.remove("pyarrow")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "AtlasPlusTableData.csv"
+        print(f"Generating synthetic export with {args.rows:,} rows...")
+        make_atlasplus_csv(path, args.rows, seed=args.seed)
+        size_mib = path.stat().st_size / 2**20
+        print(f"  {size_mib:.0f} MiB on disk\n")
+
+        results = []
+        for name in variants:
+            result = run_variant(name, str(path))
+            results.append(result)
+            print(f"  {name:<10} {result['seconds']:>8.2f} s   peak RSS {result['peak_rss_mib']:>8.1f} MiB   rows kept {result['rows']:,}")
+
+    baseline = next((r for r in results if r["variant"] == "legacy"), None)
+    if baseline:
+        print()
+        for r in results:
+            if r is baseline:
+                continue
+            print(f"  {r['variant']:<10} {baseline['seconds'] / r['seconds']:.1f}x faster, "
+                  f"{baseline['peak_rss_mib'] / r['peak_rss_mib']:.1f}x less peak memory than legacy")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"rows": args.rows, "file_mib": round(size_mib, 1), "results": results}, indent=2) + "\n")
+    print(f"\nSaved results to: {output}")
+
+
+if __name__ == "__main__":
+    main()
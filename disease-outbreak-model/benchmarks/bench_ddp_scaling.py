@@ -0,0 +1,87 @@
+"""
+Data-parallel training throughput at 1/2/4/8 processes.
+
+Launches train_us_lstm_distributed.py under torchrun (--standalone) once
+per process count with the same global batch size, and reports steady-state
+training samples/s (first epoch excluded), speedup and parallel efficiency.
+By default each process gets cores / processes threads, so every run uses
+the whole machine; pass --threads 1 to measure pure process scaling.
+
+Usage (from disease-outbreak-model/):
+    python benchmarks/bench_ddp_scaling.py --procs 1 2 4 8 --epochs 3
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+
+
+def run(n_procs, args, tmp):
+    metrics = Path(tmp) / f"ddp_{n_procs}.json"
+    cmd = [
+        sys.executable, "-m", "torch.distributed.run", "--standalone", f"--nproc_per_node={n_procs}",
+        str(ROOT_DIR / "train_us_lstm_distributed.py"),
+        "--epochs", str(args.epochs), "--batch-size", str(args.batch_size),
+        "--checkpoint", str(Path(tmp) / f"ddp_{n_procs}.pth"),
+        "--metrics-out", str(metrics), "--log-every", str(args.epochs + 1),
+    ]
+    if args.threads:
+        cmd += ["--threads", str(args.threads)]
+    env = dict(os.environ, OMP_NUM_THREADS=str(args.threads or max(1, (os.cpu_count() or 1) // n_procs)))
+    subprocess.run(cmd, cwd=ROOT_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+
+    result = json.loads(metrics.read_text())
+    steady = [h["samples_per_second"] for h in result["history"][1:]] or [result["history"][0]["samples_per_second"]]
+    return {
+        "processes": n_procs,
+        "threads_per_process": result["threads_per_process"],
+        "global_batch": result["global_batch"],
+        "samples_per_second": round(sum(steady) / len(steady)),
+        "final_val_auc": round(result["history"][-1]["val_auc"], 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=512, help="global batch size")
+    parser.add_argument("--threads", type=int, help="threads per process (default: cores / processes)")
+    parser.add_argument("--output", default=str(RESULTS_DIR / "ddp_scaling.json"))
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    if max(args.procs) > cores:
+        # Oversubscribed processes only time-slice one another; the numbers
+        # say nothing about scaling
+        print(f"warning: {cores} cores for up to {max(args.procs)} processes; "
+              f"run on a host with at least that many cores\n")
+    print(f"{cores} cores; global batch {args.batch_size}; {args.epochs} epochs per run\n")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_procs in args.procs:
+            result = run(n_procs, args, tmp)
+            results.append(result)
+            base = results[0]["samples_per_second"] * n_procs / results[0]["processes"]
+            result["speedup"] = round(result["samples_per_second"] / results[0]["samples_per_second"], 2)
+            result["efficiency"] = round(result["samples_per_second"] / base, 2)
+            print(f"  {n_procs:>2} processes x {result['threads_per_process']} threads: "
+                  f"{result['samples_per_second']:>8,} samples/s  speedup {result['speedup']:.2f}x  "
+                  f"efficiency {result['efficiency']:.0%}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"cores": os.cpu_count(), "epochs": args.epochs, "results": results}, indent=2) + "\n")
+    print(f"\nSaved results to: {output}")
+
+
+if __name__ == "__main__":
+    main()
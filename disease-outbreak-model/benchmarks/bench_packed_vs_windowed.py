@@ -0,0 +1,189 @@
+"""
+Packed full-history sequences vs. overlapping 3-year windows.
+
+Trains OutbreakLSTMClassifier both ways on the same training CSV with the
+same seed, epochs, learning rate and (approximately) the same number of
+supervised labels per optimizer step, and reports sequence-tensor memory,
+mean epoch time and validation AUC. AUC is compared on the labels both
+setups score (the windowed validation windows' county/year pairs); the
+packed model's AUC over all of its validation years is reported as well.
+
+Both setups go through train_us_lstm_classifier unchanged: the same
+training-years scaler, and the checkpoint of the epoch with the best
+validation AUC (train_model's default), which is the model each one would
+ship. Selecting on the validation labels flatters both AUCs alike, so the
+numbers are for comparing the two setups rather than as a test score.
+Both models sit on a loss plateau for their first ~10 epochs, so runs much
+shorter than the default score near (or below) chance.
+
+Usage (from disease-outbreak-model/):
+    python benchmarks/bench_packed_vs_windowed.py --epochs 40
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+import numpy as np
+import pandas as pd
+import torch
+from sklearn.metrics import roc_auc_score
+
+from models.Disease_Predictor import OutbreakLSTMClassifier
+from preprocessing.sequences import create_sequences
+from train_us_lstm_classifier import (
+    OutbreakDataset, TensorBatchLoader, build_packed_training_arrays, build_training_arrays,
+    packed_datasets, packed_outputs, scaled_learning_rate, train_model, window_outputs,
+)
+
+SEQ_LENGTH = 3
+VAL_SPLIT_YEAR = 2016
+
+
+def make_model(input_dim, seed):
+    torch.manual_seed(seed)
+    return OutbreakLSTMClassifier(input_dim=input_dim, hidden_dim=64, num_layers=2, dropout=0.3)
+
+
+def run(name, model, train_dataset, val_dataset, batch_size, train_labels, batch_outputs, args, tmp):
+    train_loader = TensorBatchLoader(train_dataset, batch_size, shuffle=True,
+                                     generator=torch.Generator().manual_seed(args.seed))
+    val_loader = TensorBatchLoader(val_dataset, batch_size)
+    pos_weight = (train_labels == 0).sum() / (train_labels == 1).sum()
+
+    # Same LR for both: they take about as many labels per step as a
+    # windowed batch of args.batch_size, scaled as the training script does
+    learning_rate = scaled_learning_rate(0.001, args.batch_size)
+
+    checkpoint = Path(tmp) / f"{name}.pth"
+    epoch_stats = []
+    started = time.perf_counter()
+    _, _, throughput = train_model(
+        model, train_loader, val_loader, args.epochs, learning_rate, torch.device("cpu"), pos_weight,
+        checkpoint_path=str(checkpoint), log_every=args.epochs + 1, batch_outputs=batch_outputs,
+        epoch_stats=epoch_stats,
+    )
+    elapsed = time.perf_counter() - started
+    model.load_state_dict(torch.load(checkpoint))
+    model.eval()
+    best_epoch = epoch_stats[int(np.argmax([e["val_auc"] for e in epoch_stats]))]["epoch"]
+    return elapsed / args.epochs, float(np.mean(throughput)), best_epoch
+
+
+def check_labels(scored, raw):
+    # Every scored (FIPS, Year) must carry that row's Outbreak flag from the
+    # CSV, or outputs and labels have drifted out of line
+    truth = raw.assign(FIPS=raw["FIPS"].astype(str))[["FIPS", "Year", "Outbreak"]]
+    merged = (scored[["FIPS", "Year", "label"]].astype({"FIPS": str})
+              .merge(truth, on=["FIPS", "Year"], how="left"))
+    if merged["Outbreak"].isna().any() or (merged["label"] != merged["Outbreak"]).any():
+        raise AssertionError("validation labels do not match the CSV's county/year rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--train-file", default=str(ROOT_DIR / "data" / "atlasplus_all_us_train.csv"))
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=512, help="windowed batch size (labels per step)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=str(RESULTS_DIR / "packed_vs_windowed.json"))
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # ── Windowed ───────────────────────────────────────────────────
+        started = time.perf_counter()
+        data, meta = build_training_arrays(args.train_file, SEQ_LENGTH, VAL_SPLIT_YEAR)
+        prep = time.perf_counter() - started
+        train_dataset = OutbreakDataset(data["train_seq"], data["train_labels"])
+        val_dataset = OutbreakDataset(data["val_seq"], data["val_labels"])
+
+        model = make_model(data["train_seq"].shape[2], args.seed)
+        epoch_s, labels_per_s, best_epoch = run("windowed", model, train_dataset, val_dataset, args.batch_size,
+                                    data["train_labels"], window_outputs, args, tmp)
+        with torch.no_grad():
+            window_probs = torch.sigmoid(model(val_dataset.sequences).squeeze(-1)).numpy()
+
+        # County/year of every validation window (years do not depend on scaling)
+        raw = pd.read_csv(args.train_file)
+        _, _, val_fips, val_years = create_sequences(raw[raw["Year"] > VAL_SPLIT_YEAR], SEQ_LENGTH, meta["feature_cols"])
+        common = pd.DataFrame({
+            "FIPS": val_fips.astype(str), "Year": val_years,
+            "label": data["val_labels"], "windowed": window_probs,
+        })
+        check_labels(common, raw)
+        results["windowed"] = {
+            "prep_seconds": round(prep, 3),
+            "sequence_mib": round((data["train_seq"].nbytes + data["val_seq"].nbytes) / 2**20, 2),
+            "train_labels": int(len(data["train_labels"])),
+            "epoch_seconds": round(epoch_s, 3),
+            "labels_per_second": round(labels_per_s),
+            "best_epoch": best_epoch,
+            "val_auc": round(roc_auc_score(common["label"], common["windowed"]), 4),
+        }
+
+        # ── Packed ─────────────────────────────────────────────────────
+        started = time.perf_counter()
+        packed, _ = build_packed_training_arrays(args.train_file, VAL_SPLIT_YEAR)
+        prep = time.perf_counter() - started
+        train_dataset, val_dataset = packed_datasets(packed, SEQ_LENGTH, VAL_SPLIT_YEAR)
+        train_labels = train_dataset.labels[train_dataset.mask].numpy()
+        # Counties per batch giving about as many supervised labels per step
+        per_county = len(train_labels) / len(train_dataset)
+        batch_size = max(1, round(args.batch_size / per_county))
+
+        model = make_model(packed["county_seq"].shape[2], args.seed)
+        epoch_s, labels_per_s, best_epoch = run("packed", model, train_dataset, val_dataset, batch_size,
+                                    train_labels, packed_outputs, args, tmp)
+        with torch.no_grad():
+            probs = torch.sigmoid(model.forward_sequence(val_dataset.sequences, val_dataset.lengths)).numpy()
+
+        # Same row selection as packed_datasets
+        years = packed["county_years"]
+        supervised = np.arange(years.shape[1])[None, :] >= SEQ_LENGTH - 1
+        val_rows = np.flatnonzero((supervised & (years > VAL_SPLIT_YEAR)).any(axis=1))
+        mask = val_dataset.mask.numpy()
+        fips = np.repeat(packed["counties"][val_rows], mask.shape[1]).reshape(mask.shape)
+        scored = pd.DataFrame({
+            "FIPS": fips[mask], "Year": packed["county_years"][val_rows][mask],
+            "packed": probs[mask], "label": val_dataset.labels.numpy()[mask],
+        })
+        check_labels(scored, raw)
+        common = common.merge(scored[["FIPS", "Year", "packed"]], on=["FIPS", "Year"], how="inner")
+        results["packed"] = {
+            "prep_seconds": round(prep, 3),
+            "sequence_mib": round(packed["county_seq"].nbytes / 2**20, 2),
+            "train_labels": int(len(train_labels)),
+            "batch_counties": batch_size,
+            "epoch_seconds": round(epoch_s, 3),
+            "labels_per_second": round(labels_per_s),
+            "best_epoch": best_epoch,
+            "val_auc": round(roc_auc_score(common["label"], common["packed"]), 4),
+            "val_auc_all_years": round(roc_auc_score(scored["label"], scored["packed"]), 4),
+        }
+
+    print(f"\n{'':<10}{'seq MiB':>10}{'epoch s':>10}{'labels/s':>12}{'best ep':>9}{'val AUC':>10}")
+    for name, r in results.items():
+        print(f"{name:<10}{r['sequence_mib']:>10.2f}{r['epoch_seconds']:>10.2f}{r['labels_per_second']:>12,}"
+              f"{r['best_epoch']:>9}{r['val_auc']:>10.4f}")
+    print(f"\nAUC on {len(common):,} shared validation labels; packed over all "
+          f"{len(scored):,} validation years: {results['packed']['val_auc_all_years']:.4f}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"epochs": args.epochs, "seed": args.seed, "shared_val_labels": len(common),
+                                  "results": results}, indent=2) + "\n")
+    print(f"\nSaved results to: {output}")
+
+
+if __name__ == "__main__":
+    main()
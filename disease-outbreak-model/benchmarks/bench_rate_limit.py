@@ -0,0 +1,167 @@
+"""
+Per-request overhead and memory of the rate-limit middleware.
+
+Drives the middleware directly through ASGI (no sockets or HTTP parsing)
+in front of a trivial app, and compares against the bare app and against
+the original BaseHTTPMiddleware limiter that kept a timestamp list per IP.
+Two traffic shapes:
+
+    steady    n / 50 clients, each well under the limit
+    scanner   every request from a new address (the case that grew the
+              old limiter's table without bound)
+
+After the scanner run the clock is advanced past two windows and the
+sweep is timed, showing the idle clients being evicted.
+
+Usage (from disease-outbreak-model/):
+    python benchmarks/bench_rate_limit.py --requests 200000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent / "backend"
+RESULTS_DIR = BENCH_DIR / "results"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+
+from backend.middleware.rate_limit import RateLimitMiddleware, SlidingWindowLimiter
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """The original limiter: a list of request timestamps per IP."""
+
+    def __init__(self, app, requests_per_minute: int = 60):
+        super().__init__(app)
+        self.rpm = requests_per_minute
+        self.requests: dict[str, list[float]] = defaultdict(list)
+
+    async def dispatch(self, request, call_next):
+        if request.url.path in ("/api/v1/health", "/docs", "/openapi.json"):
+            return await call_next(request)
+
+        client_ip = request.client.host if request.client else "unknown"
+        now = time.time()
+        window_start = now - 60
+        self.requests[client_ip] = [t for t in self.requests[client_ip] if t > window_start]
+
+        if len(self.requests[client_ip]) >= self.rpm:
+            return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded."})
+
+        self.requests[client_ip].append(now)
+        return await call_next(request)
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"2")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def make_scope(ip: str, path: str) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": (ip, 50000), "server": ("bench", 80),
+    }
+
+
+async def drive(app, scopes) -> tuple[float, int]:
+    """Send every scope through app; returns (seconds, rejected)."""
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    started = time.perf_counter()
+    for scope in scopes:
+        await app(scope, receive, send)
+    return time.perf_counter() - started, sum(status == 429 for status in statuses)
+
+
+def traffic(shape: str, n: int) -> list[dict]:
+    paths = ["/api/v1/risk/map", "/api/v1/locations/", "/api/v1/risk/location/06037", "/api/v1/risk/predict"]
+    if shape == "steady":
+        clients = max(1, n // 50)
+        return [make_scope(f"10.0.{(i % clients) // 256}.{(i % clients) % 256}", paths[i % 4]) for i in range(n)]
+    return [make_scope(f"{(i >> 24) & 255}.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}", paths[i % 4])
+            for i in range(n)]
+
+
+def measure(name, app, scopes, baseline_seconds=None):
+    tracemalloc.start()
+    seconds, rejected = asyncio.run(drive(app, scopes))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "middleware": name,
+        "requests": len(scopes),
+        "us_per_request": round(seconds / len(scopes) * 1e6, 3),
+        "rejected": rejected,
+        "traced_peak_mib": round(peak / 2**20, 2),
+    }
+    if baseline_seconds is not None:
+        result["overhead_us_per_request"] = round((seconds - baseline_seconds) / len(scopes) * 1e6, 3)
+    return result, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--rpm", type=int, default=600)
+    parser.add_argument("--output", default=str(RESULTS_DIR / "rate_limit.json"))
+    args = parser.parse_args()
+
+    results = {}
+    for shape in ("steady", "scanner"):
+        scopes = traffic(shape, args.requests)
+        clock = [1_000_000.0]
+        limiter = SlidingWindowLimiter(args.rpm, clock=lambda: clock[0])
+        sliding = RateLimitMiddleware(ok_app, limiter=limiter)
+        legacy = LegacyRateLimitMiddleware(ok_app, requests_per_minute=args.rpm)
+
+        bare, bare_seconds = measure("none", ok_app, scopes)
+        rows = [bare]
+        row, _ = measure("sliding_window_asgi", sliding, scopes, bare_seconds)
+        row["tracked_clients"] = len(limiter)
+        rows.append(row)
+        row, _ = measure("legacy_base_http", legacy, scopes, bare_seconds)
+        row["tracked_clients"] = len(legacy.requests)
+        rows.append(row)
+
+        # Two windows later every client is idle; the sweep evicts them all
+        clock[0] += 121
+        started = time.perf_counter()
+        evicted = limiter.sweep()
+        sweep_ms = (time.perf_counter() - started) * 1000
+
+        print(f"\n{shape} traffic ({args.requests:,} requests):")
+        for r in rows:
+            overhead = f"{r['overhead_us_per_request']:>7.2f} us overhead" if "overhead_us_per_request" in r else ""
+            print(f"  {r['middleware']:<22} {r['us_per_request']:>7.2f} us/request {overhead:<20} "
+                  f"rejected {r['rejected']:>7,}  clients {r.get('tracked_clients', 0):>7,}  "
+                  f"traced peak {r['traced_peak_mib']:>7.2f} MiB")
+        print(f"  sweep after 2 idle windows: evicted {evicted:,} clients in {sweep_ms:.1f} ms, {len(limiter)} left")
+        results[shape] = {"rows": rows, "sweep": {"evicted": evicted, "ms": round(sweep_ms, 2), "remaining": len(limiter)}}
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"requests": args.requests, "rpm": args.rpm, "results": results}, indent=2) + "\n")
+    print(f"\nSaved results to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Import-time profile of the API entry point.
+
+Runs ``python -X importtime -c "import backend.main"`` in a fresh interpreter
+(from the backend/ directory, exactly as uvicorn would import it), then
+summarizes the slowest top-level imports and flags whether heavy ML
+packages were pulled in before the app could bind.
+
+Usage (from disease-outbreak-model/):
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --module backend.main --top 25
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent / "backend"
+RESULTS_DIR = BENCH_DIR / "results"
+
+HEAVY_PACKAGES = ("torch", "sklearn", "scipy", "pandas")
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_imports(module: str) -> list[dict]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"Importing {module} failed")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        entries.append({
+            "module": name,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": (len(indent) - 1) // 2,
+        })
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--output", default=str(RESULTS_DIR / "import_time.json"))
+    args = parser.parse_args()
+
+    entries = profile_imports(args.module)
+    total_us = next(e["cumulative_us"] for e in reversed(entries) if e["module"] == args.module)
+    loaded = {e["module"].split(".")[0] for e in entries}
+    heavy = sorted(p for p in HEAVY_PACKAGES if p in loaded)
+
+    # One row per top-level package: the cumulative time of its own import
+    # line, which already includes every submodule it pulled in
+    packages = [e for e in entries if "." not in e["module"] and e["module"] != args.module]
+    slowest = sorted(packages, key=lambda e: e["cumulative_us"], reverse=True)[: args.top]
+
+    print(f"Import profile for `{args.module}`")
+    print(f"  Total import time: {total_us / 1000:.1f} ms ({len(entries)} modules)")
+    print(f"  Heavy packages imported: {', '.join(heavy) if heavy else 'none'}")
+    print(f"\n  {'cumulative ms':>14}  {'self ms':>8}  package")
+    for e in slowest:
+        print(f"  {e['cumulative_us'] / 1000:>14.1f}  {e['self_us'] / 1000:>8.1f}  {e['module']}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "module": args.module,
+        "python": sys.version.split()[0],
+        "total_ms": round(total_us / 1000, 1),
+        "module_count": len(entries),
+        "heavy_packages": heavy,
+        "slowest_packages": slowest,
+    }, indent=2) + "\n")
+    print(f"\nSaved profile to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+ML pipeline benchmark suite with regression tracking.
+
+For each scale, generates a synthetic AtlasPlus export (benchmarks/synthetic.py)
+and times the pipeline stages in order, each in a fresh process so its peak
+RSS is measured in isolation:
+
+    process      load_atlasplus + prepare_records + outbreak labels + lags
+    sequences    StandardScaler + create_sequences (Chlamydia rows)
+    train_epoch  one train_model epoch (training samples only)
+    evaluate     predict_proba + point_metrics over every window
+
+Only the stage itself is timed; reading the previous stage's output and
+writing this stage's output are not. Each stage runs --repeat times and the
+median time is kept. Results are written as JSON and compared against a
+stored baseline: a stage whose time (or peak memory) grew by more than the
+threshold is a regression, and the run exits 1. Stages that take under
+--min-seconds both now and in the baseline (every 10k stage, for one) are
+only checked for memory: at that length run-to-run jitter alone exceeds
+the time threshold.
+
+Usage (from disease-outbreak-model/):
+    python benchmarks/run_benchmarks.py                     # 10k and 1m
+    python benchmarks/run_benchmarks.py --scales 10k 1m 10m --repeat 5
+    python benchmarks/run_benchmarks.py --update-baseline   # accept current numbers
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from bench_atlasplus_ingest import peak_rss_mib
+from synthetic import make_atlasplus_csv
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+STAGES = ["process", "sequences", "train_epoch", "evaluate"]
+
+SEQ_LENGTH = 3
+BATCH_SIZE = 512
+
+
+# ── Stages ───────────────────────────────────────────────────────────
+# Each takes the scale's work directory and returns (seconds, items).
+
+def stage_process(workdir):
+    from preprocessing.process_atlasplus_for_lstm import (
+        LEGACY_INDICATOR, OUTBREAK_THRESHOLD, add_lag_features, define_outbreak_labels,
+        load_atlasplus, prepare_records,
+    )
+
+    started = time.perf_counter()
+    df = prepare_records(load_atlasplus(workdir / "AtlasPlusTableData.csv"))
+    df = define_outbreak_labels(df, method="statistical", threshold=OUTBREAK_THRESHOLD)
+    df = add_lag_features(df)
+    elapsed = time.perf_counter() - started
+
+    df[df["Disease"] == LEGACY_INDICATOR].to_csv(workdir / "features.csv", index=False)
+    return elapsed, len(df)
+
+
+def stage_sequences(workdir):
+    import numpy as np
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+    from preprocessing.sequences import create_sequences, get_feature_cols
+
+    df = pd.read_csv(workdir / "features.csv")
+
+    started = time.perf_counter()
+    feature_cols = get_feature_cols(df)
+    df[feature_cols] = StandardScaler().fit_transform(df[feature_cols])
+    sequences, labels, _, _ = create_sequences(df, SEQ_LENGTH, feature_cols)
+    elapsed = time.perf_counter() - started
+
+    np.savez(workdir / "sequences.npz", sequences=sequences, labels=labels.astype(np.float32))
+    return elapsed, len(df)
+
+
+def _windows(workdir):
+    import numpy as np
+
+    with np.load(workdir / "sequences.npz") as arrays:
+        return arrays["sequences"], arrays["labels"]
+
+
+def stage_train_epoch(workdir):
+    import torch
+    from models.Disease_Predictor import OutbreakLSTMClassifier
+    from train_us_lstm_classifier import OutbreakDataset, TensorBatchLoader, train_model
+
+    sequences, labels = _windows(workdir)
+    torch.manual_seed(0)
+    model = OutbreakLSTMClassifier(input_dim=sequences.shape[2])
+    train_loader = TensorBatchLoader(OutbreakDataset(sequences, labels), BATCH_SIZE, shuffle=True)
+    # A token validation set: train_model validates every epoch, but only
+    # the training part is timed (via its own throughput)
+    val_loader = TensorBatchLoader(OutbreakDataset(sequences[:BATCH_SIZE], labels[:BATCH_SIZE]), BATCH_SIZE)
+    pos_weight = max(1.0, float((labels == 0).sum() / max(1, (labels == 1).sum())))
+
+    _, _, throughput = train_model(
+        model, train_loader, val_loader, 1, 0.001, torch.device("cpu"), pos_weight,
+        checkpoint_path=str(workdir / "model.pth"), log_every=2,
+    )
+    return len(labels) / throughput[0], len(labels)
+
+
+def stage_evaluate(workdir):
+    import torch
+    from models.Disease_Predictor import OutbreakLSTMClassifier
+    from evaluation.metrics import point_metrics, predict_proba
+
+    sequences, labels = _windows(workdir)
+    model = OutbreakLSTMClassifier(input_dim=sequences.shape[2])
+    model.load_state_dict(torch.load(workdir / "model.pth"))
+
+    started = time.perf_counter()
+    probs = predict_proba(model, sequences, torch.device("cpu"))
+    point_metrics(labels, probs)
+    return time.perf_counter() - started, len(labels)
+
+
+STAGE_FUNCTIONS = {
+    "process": stage_process,
+    "sequences": stage_sequences,
+    "train_epoch": stage_train_epoch,
+    "evaluate": stage_evaluate,
+}
+
+
+def _run_stage(stage, workdir, threads, queue):
+    # Set before torch is imported; stages that never import it pay no
+    # torch memory in their peak RSS
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    seconds, items = STAGE_FUNCTIONS[stage](Path(workdir))
+    queue.put({"seconds": seconds, "items": items, "peak_rss_mib": peak_rss_mib()})
+
+
+def run_stage(stage, workdir, threads):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_stage, args=(stage, str(workdir), threads, queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f"Stage {stage!r} failed (exit code {proc.exitcode})")
+    return queue.get()
+
+
+# ── Baseline comparison ──────────────────────────────────────────────
+
+def compare(results, baseline, threshold, memory_threshold, min_seconds):
+    # Ratio of current to baseline per (scale, stage); a stage regresses
+    # when either ratio exceeds 1 + its threshold. The time ratio is only
+    # checked once either run takes at least min_seconds.
+    reference = {(r["scale"], r["stage"]): r for r in baseline["results"]}
+    comparisons = []
+    for r in results:
+        base = reference.get((r["scale"], r["stage"]))
+        if base is None:
+            continue
+        time_ratio = r["seconds"] / base["seconds"] if base["seconds"] else float("inf")
+        memory_ratio = r["peak_rss_mib"] / base["peak_rss_mib"] if base["peak_rss_mib"] else float("inf")
+        time_checked = max(r["seconds"], base["seconds"]) >= min_seconds
+        comparisons.append({
+            "scale": r["scale"], "stage": r["stage"],
+            "seconds": r["seconds"], "baseline_seconds": base["seconds"], "time_ratio": round(time_ratio, 3),
+            "peak_rss_mib": r["peak_rss_mib"], "baseline_peak_rss_mib": base["peak_rss_mib"],
+            "memory_ratio": round(memory_ratio, 3), "time_checked": time_checked,
+            "regression": (time_checked and time_ratio > 1 + threshold) or memory_ratio > 1 + memory_threshold,
+        })
+    return comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["10k", "1m"])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES,
+                        help="stages to run (each needs the ones before it in the same run)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the median time is kept")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="torch threads per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=str(RESULTS_DIR / "pipeline.json"))
+    parser.add_argument("--baseline", default=str(RESULTS_DIR / "pipeline_baseline.json"))
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="allowed slowdown vs. the baseline before a stage counts as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.25,
+                        help="stages faster than this now and in the baseline are not checked for time")
+    parser.add_argument("--memory-threshold", type=float, default=0.20,
+                        help="allowed peak-memory growth vs. the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        rows = SCALES[scale]
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            print(f"\n── {scale} ({rows:,} raw rows) " + "─" * 40)
+            started = time.perf_counter()
+            make_atlasplus_csv(workdir / "AtlasPlusTableData.csv", rows, seed=args.seed)
+            print(f"  generated in {time.perf_counter() - started:.1f}s")
+
+            for stage in args.stages:
+                runs = [run_stage(stage, workdir, args.threads) for _ in range(args.repeat)]
+                seconds = statistics.median(r["seconds"] for r in runs)
+                items = runs[0]["items"]
+                result = {
+                    "scale": scale, "rows": rows, "stage": stage,
+                    "seconds": round(seconds, 4),
+                    "items": items,
+                    "items_per_second": round(items / seconds) if seconds else None,
+                    "peak_rss_mib": round(max(r["peak_rss_mib"] for r in runs), 1),
+                }
+                results.append(result)
+                print(f"  {stage:<12} {result['seconds']:>9.3f} s  {result['items']:>11,} items  "
+                      f"{result['items_per_second'] or 0:>12,}/s  peak RSS {result['peak_rss_mib']:>8.1f} MiB")
+
+    report = {
+        "machine": {
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "threads": args.threads,
+        },
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+
+    regressions = []
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists() and not args.update_baseline:
+        comparisons = compare(results, json.loads(baseline_path.read_text()), args.threshold,
+                              args.memory_threshold, args.min_seconds)
+        # Relative to disease-outbreak-model/, so reports don't carry this host's paths
+        recorded_path = Path(os.path.relpath(baseline_path.resolve(), ROOT_DIR)).as_posix()
+        report["baseline"] = {"path": recorded_path, "threshold": args.threshold,
+                              "memory_threshold": args.memory_threshold, "min_seconds": args.min_seconds,
+                              "comparisons": comparisons}
+        regressions = [c for c in comparisons if c["regression"]]
+
+        print(f"\nVs. baseline {baseline_path.name} (threshold +{args.threshold:.0%} time "
+              f"from {args.min_seconds:g}s, +{args.memory_threshold:.0%} memory):")
+        for c in comparisons:
+            status = "REGRESSION" if c["regression"] else "ok"
+            time_ratio = f"x{c['time_ratio']:<6.2f}" if c["time_checked"] else f"({c['time_ratio']:.2f})"
+            print(f"  {c['scale']:<4} {c['stage']:<12} time {time_ratio:<7} memory x{c['memory_ratio']:<6.2f} {status}")
+    elif not args.update_baseline:
+        print(f"\nNo baseline at {baseline_path}; run with --update-baseline to store one")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nSaved results to: {output}")
+
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Saved baseline to: {baseline_path}")
+
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
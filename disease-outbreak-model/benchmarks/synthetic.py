@@ -0,0 +1,95 @@
+"""
+Synthetic AtlasPlus-shaped data for benchmarks.
+
+make_atlasplus_csv() writes a raw export in the same layout as CDC's
+AtlasPlusTableData.csv: a short preamble, then one row per
+(indicator, year, county, age group, sex, race) with string-typed Year,
+comma-formatted Cases and the usual "Data not available" / "Suppressed"
+markers. Only a fraction of rows are the aggregated demographics the
+pipeline keeps, as in the real file.
+"""
+
+import numpy as np
+import pandas as pd
+
+INDICATORS = ["Chlamydia", "Gonorrhea", "Primary and Secondary Syphilis", "HIV diagnoses"]
+STATES = ["AL", "AZ", "CA", "CO", "DE", "FL", "GA", "IL", "MI", "NY", "OH", "PA", "TX", "WA"]
+AGE_GROUPS = ["All age groups", "13-24", "25-34", "35-44", "45-54", "55+"]
+SEXES = ["Both sexes", "Male", "Female"]
+RACES = ["All races/ethnicities", "Black/African American", "Hispanic/Latino", "White", "Asian"]
+
+PREAMBLE = [
+    "Atlas Plus Table Data (synthetic benchmark fixture)",
+    "Generated for pipeline performance tests",
+    "",
+]
+HEADER = [
+    "Indicator", "Year", "State", "County", "FIPS", "Age Group",
+    "Race/Ethnicity", "Sex", "Cases", "Rate per 100000", "Population",
+]
+
+
+def make_atlasplus_frame(n_rows: int, seed: int = 0, start_year: int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    # Pick a county count that gives ~20 years of history per county for
+    # the aggregated rows, which is what the pipeline actually keeps
+    n_years = 24
+    n_counties = max(1, n_rows // (n_years * len(INDICATORS) * 8))
+
+    county_fips = rng.choice(np.arange(1001, 56045), size=n_counties, replace=False)
+    county_state = rng.integers(0, len(STATES), size=n_counties)
+    county_scale = rng.lognormal(mean=5.5, sigma=1.3, size=n_counties)
+
+    # Aggregated rows form a complete (county, year, indicator) grid — one
+    # row each, ~1/8 of the file; the rest are demographic breakdowns
+    grid_county, grid_year, grid_indicator = (
+        a.ravel() for a in np.meshgrid(
+            np.arange(n_counties), np.arange(n_years), np.arange(len(INDICATORS)), indexing="ij"
+        )
+    )
+    n_detail = max(0, n_rows - len(grid_county))
+    county = np.concatenate([grid_county, rng.integers(0, n_counties, size=n_detail)])
+    year = start_year + np.concatenate([grid_year, rng.integers(0, n_years, size=n_detail)])
+    indicator = np.concatenate([grid_indicator, rng.integers(0, len(INDICATORS), size=n_detail)])
+    n_rows = len(county)
+
+    aggregated = np.arange(n_rows) < len(grid_county)
+    age = np.where(aggregated, 0, rng.integers(1, len(AGE_GROUPS), size=n_rows))
+    sex = np.where(aggregated, 0, rng.integers(0, len(SEXES), size=n_rows))
+    race = np.where(aggregated, 0, rng.integers(0, len(RACES), size=n_rows))
+
+    trend = 1 + 0.02 * (year - start_year)
+    cases = rng.poisson(county_scale[county] * trend).astype(np.int64)
+    cases_str = pd.Series(cases).map("{:,}".format).to_numpy(dtype=object)
+    missing = rng.random(n_rows)
+    cases_str[missing < 0.03] = "Data not available"
+    cases_str[(missing >= 0.03) & (missing < 0.05)] = "Suppressed"
+
+    year_str = year.astype(str).astype(object)
+    covid = year >= 2020
+    year_str[covid] = year_str[covid] + " (COVID-19 Pandemic)"
+
+    population = (county_scale[county] * 400).astype(np.int64)
+    return pd.DataFrame({
+        "Indicator": np.array(INDICATORS, dtype=object)[indicator],
+        "Year": year_str,
+        "State": np.array(STATES, dtype=object)[county_state[county]],
+        "County": np.char.add("County ", county_fips[county].astype(str)),
+        "FIPS": np.char.zfill(county_fips[county].astype(str), 5),
+        "Age Group": np.array(AGE_GROUPS, dtype=object)[age],
+        "Race/Ethnicity": np.array(RACES, dtype=object)[race],
+        "Sex": np.array(SEXES, dtype=object)[sex],
+        "Cases": cases_str,
+        "Rate per 100000": np.round(cases / np.maximum(population, 1) * 1e5, 1),
+        "Population": population,
+    })
+
+
+def make_atlasplus_csv(path, n_rows: int, seed: int = 0) -> str:
+    """Write a raw AtlasPlus-style export with n_rows data rows; returns the path."""
+    df = make_atlasplus_frame(n_rows, seed=seed)
+    with open(path, "w", newline="") as f:
+        f.write("\n".join(PREAMBLE) + "\n")
+        df.to_csv(f, index=False, columns=HEADER)
+    return str(path)
@@ -0,0 +1,155 @@
+"""
+Per-worker memory of a multi-worker API deployment (Linux only).
+
+Boots ``gunicorn -c gunicorn.conf.py backend.main:app`` with N workers, waits
+for the model to finish loading, then reads /proc/<pid>/smaps_rollup for the
+master and every worker. RSS counts shared pages once per process; PSS
+splits them between the processes sharing them, so the PSS total is the real
+footprint. Run it with and without preload / mmap to compare:
+
+    python benchmarks/worker_memory.py --workers 4
+    python benchmarks/worker_memory.py --workers 4 --no-preload
+    python benchmarks/worker_memory.py --workers 4 --no-preload --no-mmap
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent / "backend"
+RESULTS_DIR = BENCH_DIR / "results"
+
+ROLLUP_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_rollup(pid: int) -> dict:
+    """Memory counters for one process, in MiB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ROLLUP_FIELDS:
+                values[key] = int(rest.split()[0]) / 1024
+    return values
+
+
+def child_pids(parent: int) -> list[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # ppid is the 2nd field after the parenthesised command name
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (FileNotFoundError, ProcessLookupError, IndexError):
+            continue
+        if ppid == parent:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def wait_until_ready(port: int, workers: int, timeout: float) -> dict:
+    """Poll /health until the model has loaded (or failed) in every worker we hit."""
+    deadline = time.monotonic() + timeout
+    url = f"http://127.0.0.1:{port}/api/v1/health"
+    ready_hits = 0
+    health = {}
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as resp:
+                health = json.load(resp)
+        except OSError:
+            time.sleep(0.25)
+            continue
+        if not health.get("model_loading"):
+            ready_hits += 1
+            # Requests are spread across workers; a few consecutive ready
+            # answers per worker is a good signal all of them settled.
+            if ready_hits >= 3 * workers:
+                return health
+        else:
+            ready_hits = 0
+        time.sleep(0.1)
+    raise TimeoutError(f"API on port {port} not ready after {timeout:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-preload", action="store_true", help="each worker loads the model itself")
+    parser.add_argument("--no-mmap", action="store_true", help="copy weights into process memory")
+    parser.add_argument("--model-path", default=None, help="checkpoint to serve (default: MODEL_PATH)")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait after ready")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PRELOAD_MODEL"] = "false" if args.no_preload else "true"
+    env["MODEL_MMAP"] = "false" if args.no_mmap else "true"
+    env["WEB_CONCURRENCY"] = str(args.workers)
+    env["BIND"] = f"127.0.0.1:{args.port}"
+    if args.model_path:
+        env["MODEL_PATH"] = str(Path(args.model_path).resolve())
+    if "DATABASE_URL" not in env:
+        db_file = Path(tempfile.mkdtemp()) / "worker_memory.db"
+        env["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_file}"
+
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "backend.main:app"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        health = wait_until_ready(args.port, args.workers, args.timeout)
+        time.sleep(args.settle)
+
+        master_mem = read_rollup(master.pid)
+        workers = {pid: read_rollup(pid) for pid in child_pids(master.pid)}
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+    mode = ("per-worker load" if args.no_preload else "preload+fork") + (", no mmap" if args.no_mmap else ", mmap")
+    print(f"Mode: {mode} | workers={len(workers)} | model_loaded={health.get('model_loaded')}")
+    print(f"\n  {'process':<14}{'RSS MiB':>10}{'PSS MiB':>10}{'shared MiB':>12}{'private MiB':>13}")
+    rows = [("master", master.pid, master_mem)] + [("worker", pid, mem) for pid, mem in workers.items()]
+    for role, pid, mem in rows:
+        shared = mem["Shared_Clean"] + mem["Shared_Dirty"]
+        private = mem["Private_Clean"] + mem["Private_Dirty"]
+        print(f"  {role + ' ' + str(pid):<14}{mem['Rss']:>10.1f}{mem['Pss']:>10.1f}{shared:>12.1f}{private:>13.1f}")
+
+    total_rss = sum(mem["Rss"] for _, _, mem in rows)
+    total_pss = sum(mem["Pss"] for _, _, mem in rows)
+    print(f"\n  Total RSS: {total_rss:.1f} MiB   Total PSS (real footprint): {total_pss:.1f} MiB")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"worker_memory_{args.workers}w.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "mode": mode,
+        "preload": not args.no_preload,
+        "mmap": not args.no_mmap,
+        "workers": args.workers,
+        "model_loaded": health.get("model_loaded"),
+        "master": master_mem,
+        "per_worker": {str(pid): mem for pid, mem in workers.items()},
+        "total_rss_mib": round(total_rss, 1),
+        "total_pss_mib": round(total_pss, 1),
+    }, indent=2) + "\n")
+    print(f"\nSaved results to: {output}")
+
+
+if __name__ == "__main__":
+    main()
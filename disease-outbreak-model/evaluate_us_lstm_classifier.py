@@ -3,16 +3,32 @@ import pandas as pd
 import numpy as np
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix, roc_curve
+from sklearn.metrics import classification_report, confusion_matrix, roc_curve
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
+import argparse
+import contextlib
+import os
 import sys
+import time
 
 sys.path.append(str(Path(__file__).parent / 'src'))
 from models.Disease_Predictor import OutbreakLSTMClassifier
+from models.artifact import build_model, load_artifact
+from evaluation.metrics import (
+    bootstrap_ci, grouped_bootstrap_ci, grouped_metrics, point_metrics, predict_proba,
+)
+from preprocessing.sequences import create_sequences, get_feature_cols
+from preprocessing.dataset_cache import DatasetCache, DEFAULT_CACHE_DIR
+from preprocessing.process_atlasplus_for_lstm import (
+    LAG_STEPS, OUTBREAK_THRESHOLD, LEGACY_INDICATOR, TRAIN_FILE, TEST_FILE, indicator_slug, partition_paths,
+)
+
+SIZE_BUCKETS = ['Q1 (smallest)', 'Q2', 'Q3', 'Q4 (largest)']
 
 def create_lag_features(df, lag_steps=[1, 2, 3]):
     
@@ -26,156 +42,224 @@ def create_lag_features(df, lag_steps=[1, 2, 3]):
     
     return df
 
-def create_sequences(data, seq_length):
-    
-    sequences = []
-    labels = []
-    county_ids = []
-    years = []
-    
-    # Group by county (FIPS)
-    for fips, group in data.groupby('FIPS'):
-        group = group.sort_values('Year')
-        
-        if len(group) < seq_length:
-            continue
-        
-        feature_cols = [col for col in group.columns if col not in 
-                       ['Year', 'State', 'FIPS', 'County', 'Disease', 'Sex', 
-                        'Outbreak', 'NAME', 'state', 'county']]
-        
-        features = group[feature_cols].values
-        outbreak_labels = group['Outbreak'].values
-        year_values = group['Year'].values
-        
-        for i in range(len(group) - seq_length + 1):
-            seq = features[i:i + seq_length]
-            label = outbreak_labels[i + seq_length - 1]
-            year = year_values[i + seq_length - 1]
-            
-            sequences.append(seq)
-            labels.append(label)
-            county_ids.append(fips)
-            years.append(year)
-    
-    return np.array(sequences), np.array(labels), np.array(county_ids), np.array(years)
+def build_test_arrays(train_file, test_file, seq_length, scaler_params=None):
+    # Test data is normalized with the scaler the model was trained with
+    # (scaler_params from its artifact); a bare state_dict carries none, so
+    # that falls back to fitting one on the whole training file
+    train_df = pd.read_csv(train_file)
+    feature_cols = get_feature_cols(train_df)
+    
+    if scaler_params is None:
+        scaler = StandardScaler().fit(train_df[feature_cols])
+        scaler_params = scaler.mean_, scaler.scale_
+    scaler_mean, scaler_scale = (np.asarray(p, dtype=np.float64) for p in scaler_params)
+    
+    # County size bucket: quartile of the county's mean yearly cases over
+    # the training years
+    county_cases = train_df.groupby('FIPS')['Cases'].mean()
+    size_buckets = pd.qcut(county_cases, 4, labels=SIZE_BUCKETS).astype(str)
+    
+    test_df = pd.read_csv(test_file)
+    test_df[feature_cols] = (test_df[feature_cols].to_numpy(dtype=np.float64) - scaler_mean) / scaler_scale
+    
+    test_seq, test_labels, test_counties, test_years = create_sequences(test_df, seq_length, feature_cols)
+    county_states = test_df.drop_duplicates('FIPS').set_index('FIPS')['State']
+    window_counties = pd.Series(test_counties)
+    
+    arrays = {
+        'test_seq': test_seq, 'test_labels': test_labels,
+        'test_counties': test_counties, 'test_years': test_years,
+        'test_states': np.asarray(window_counties.map(county_states), dtype=str),
+        'test_sizes': np.asarray(window_counties.map(size_buckets).fillna('unseen'), dtype=str),
+        'scaler_mean': scaler_mean, 'scaler_scale': scaler_scale,
+    }
+    meta = {
+        'feature_cols': feature_cols,
+        'records': len(test_df),
+        'counties': int(test_df['FIPS'].nunique()),
+        'years': [int(test_df['Year'].min()), int(test_df['Year'].max())],
+        'outbreak_rate': float(test_df['Outbreak'].mean()),
+    }
+    return arrays, meta
 
-class OutbreakDataset(Dataset):
-    def __init__(self, sequences, labels):
-        self.sequences = torch.FloatTensor(sequences)
-        self.labels = torch.FloatTensor(labels)
-    
-    def __len__(self):
-        return len(self.sequences)
-    
-    def __getitem__(self, idx):
-        return self.sequences[idx], self.labels[idx]
+def load_test_arrays(train_file, test_file, seq_length, cache, scaler_params=None):
+    params = {
+        'stage': 'test',
+        'groups': ['year', 'state', 'size'],
+        'seq_length': seq_length,
+        'lags': LAG_STEPS,
+        'outbreak_threshold': OUTBREAK_THRESHOLD,
+        'scaler': None if scaler_params is None else [np.asarray(p).tolist() for p in scaler_params],
+    }
+    return cache.get_or_build(
+        [train_file, test_file], params,
+        lambda: build_test_arrays(train_file, test_file, seq_length, scaler_params),
+    )
+
+def tidy_metrics(overall, intervals, by_group, group_intervals):
+    # One row per (grouping, group, metric) with its bootstrap interval
+    rows = [
+        ('Overall', 'all', name, value, *intervals.get(name, (np.nan, np.nan)))
+        for name, value in overall.items()
+    ]
+    for grouping, table in by_group.items():
+        for record in table.to_dict('records'):
+            group_ci = group_intervals.get(grouping, {}).get(record['group'], {})
+            rows.extend(
+                (grouping, record['group'], name, record[name], *group_ci.get(name, (np.nan, np.nan)))
+                for name in overall
+            )
+    return pd.DataFrame(rows, columns=['grouping', 'group', 'metric', 'estimate', 'ci_low', 'ci_high'])
 
-def evaluate_model(model, test_loader, device):
-    
-    model.eval()
-    all_preds = []
-    all_probs = []
-    all_labels = []
-    
-    with torch.no_grad():
-        for sequences, labels in test_loader:
-            sequences = sequences.to(device)
-            
-            outputs = model(sequences).squeeze()
-            probs = torch.sigmoid(outputs).cpu().numpy()
-            preds = (probs > 0.5).astype(int)
-            
-            all_preds.extend(preds)
-            all_probs.extend(probs)
-            all_labels.extend(labels.numpy())
-    
-    return np.array(all_preds), np.array(all_probs), np.array(all_labels)
+def parse_args():
+    parser = argparse.ArgumentParser(description='Evaluate the US outbreak LSTM classifier')
+    parser.add_argument('--indicator',
+                        help='evaluate one indicator partition (e.g. Gonorrhea) with its own model; '
+                             'default is the original Chlamydia files')
+    parser.add_argument('--train-file', help='override the training CSV (used for the scaler)')
+    parser.add_argument('--test-file', help='override the test CSV')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                        help='where preprocessed arrays are cached between runs')
+    parser.add_argument('--no-cache', action='store_true', help='always rebuild sequences')
+    parser.add_argument('--batch-size', type=int, help='inference batch size (default: sized to memory)')
+    parser.add_argument('--bootstrap', type=int, default=1000,
+                        help='bootstrap resamples for confidence intervals (0 disables)')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='processes for the bootstrap resamples')
+    parser.add_argument('--metrics-out', help='also write every metric and interval here as CSV')
+    parser.add_argument('--model',
+                        help='model artifact (.pt) or bare state_dict (.pth); default: '
+                             'models/best_us_lstm_classifier[_<indicator>].pt, then .pth')
+    return parser.parse_args()
 
-def main():
+def main(args):
+    if args.indicator:
+        default_train, default_test = partition_paths(args.indicator)
+        suffix = f'_{indicator_slug(args.indicator)}'
+    else:
+        default_train, default_test = TRAIN_FILE, TEST_FILE
+        suffix = ''
+    train_file = args.train_file or default_train
+    test_file = args.test_file or default_test
+    
     print("=" * 80)
-    print("Evaluating LSTM Classifier on US Chlamydia Test Dataset (2020-2023)")
+    print(f"Evaluating LSTM Classifier on US {args.indicator or LEGACY_INDICATOR} Test Dataset (2020-2023)")
     print("=" * 80)
     
-    print("\nLoading training data for normalization...")
-    train_df = pd.read_csv('data/atlasplus_all_us_train.csv')
-    
-    feature_cols = [col for col in train_df.columns if col not in 
-                   ['Year', 'State', 'FIPS', 'County', 'Disease', 'Sex', 'Outbreak']]
-    
-    # Fit scaler on training data
-    scaler = StandardScaler()
-    scaler.fit(train_df[feature_cols])
-    
-    print("\nLoading test data...")
-    test_df = pd.read_csv('data/atlasplus_all_us_test.csv')
-    print(f"Test records: {len(test_df):,}")
-    print(f"Counties: {test_df['FIPS'].nunique()}")
-    print(f"Year range: {test_df['Year'].min()}-{test_df['Year'].max()}")
-    print(f"Outbreak rate: {test_df['Outbreak'].mean()*100:.1f}%")
-    
-    # Lag features already included
-    print("\nLag features already included in dataset")
-    
-    # Normalize features using training scaler
-    print("\nNormalizing features...")
-    test_df[feature_cols] = scaler.transform(test_df[feature_cols])
-    
-    seq_length = 3
-    print(f"\nCreating sequences (sequence length = {seq_length})...")
-    
-    test_seq, test_labels, test_counties, test_years = create_sequences(test_df, seq_length)
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    if args.model is not None:
+        model_path = Path(args.model)
+    else:
+        model_path = Path(f'models/best_us_lstm_classifier{suffix}.pt')
+        if not model_path.exists():
+            model_path = model_path.with_suffix('.pth')
+    
+    if model_path.suffix == '.pt':
+        # Window length and scaler come from the artifact, so the test data
+        # is prepared exactly as the model saw its training data
+        artifact, _ = load_artifact(model_path, map_location=device, mmap=False)
+        seq_length = int(artifact['config']['seq_length'])
+        scaler_params = artifact['scaler_mean'].numpy(), artifact['scaler_scale'].numpy()
+    else:
+        # Bare state_dict from a run that predates model artifacts
+        artifact = None
+        seq_length = 3
+        scaler_params = None
+    
+    print("\nLoading test data (normalized with the training scaler)...")
+    cache = DatasetCache(args.cache_dir, enabled=not args.no_cache)
+    start = time.perf_counter()
+    data, meta, cache_hit = load_test_arrays(train_file, test_file, seq_length, cache, scaler_params)
+    source = "memory-mapped from cache" if cache_hit else "built and cached"
+    print(f"Prepared sequences in {time.perf_counter() - start:.2f}s ({source})")
+    
+    print(f"Test records: {meta['records']:,}")
+    print(f"Counties: {meta['counties']}")
+    print(f"Year range: {meta['years'][0]}-{meta['years'][1]}")
+    print(f"Outbreak rate: {meta['outbreak_rate']*100:.1f}%")
+    
+    print(f"\nSequences (sequence length = {seq_length}):")
+    test_seq, test_labels = data['test_seq'], data['test_labels']
+    test_counties, test_years = data['test_counties'], data['test_years']
     
     print(f"Test sequences: {len(test_seq):,}")
     print(f"  Unique counties: {len(np.unique(test_counties))}")
     print(f"  Outbreak sequences: {test_labels.sum():.0f} ({test_labels.mean()*100:.1f}%)")
     
-    test_dataset = OutbreakDataset(test_seq, test_labels)
-    batch_size = 64
-    test_loader = DataLoader(test_dataset, batch_size=batch_size, shuffle=False)
-    
     print("\nLoading trained model...")
     input_dim = test_seq.shape[2]
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    
-    model = OutbreakLSTMClassifier(
-        input_dim=input_dim,
-        hidden_dim=64,
-        num_layers=2,
-        dropout=0.3
-    ).to(device)
     
-    model.load_state_dict(torch.load('models/best_us_lstm_classifier.pth', map_location=device))
-    print("Model loaded successfully!")
+    if artifact is not None:
+        if artifact['feature_cols'] != meta['feature_cols']:
+            raise ValueError(f"{model_path} expects features {artifact['feature_cols']}, "
+                             f"test data has {meta['feature_cols']}")
+        model = build_model(artifact).to(device)
+        print(f"Model loaded from artifact: {model_path} ({artifact['disease']}, epoch {artifact['epoch']})")
+    else:
+        model = OutbreakLSTMClassifier(
+            input_dim=input_dim,
+            hidden_dim=64,
+            num_layers=2,
+            dropout=0.3
+        ).to(device)
+        
+        model.load_state_dict(torch.load(model_path, map_location=device))
+        print(f"Model loaded from state_dict: {model_path}")
     
     print("\nEvaluating model on test set...")
-    test_preds, test_probs, test_labels_np = evaluate_model(model, test_loader, device)
-    
-    auc = roc_auc_score(test_labels_np, test_probs)
+    start = time.perf_counter()
+    test_probs = predict_proba(model, test_seq, device, args.batch_size)
+    test_labels_np = np.asarray(test_labels).astype(int)
+    test_preds = (test_probs > 0.5).astype(int)
+    print(f"Scored {len(test_probs):,} sequences in {time.perf_counter() - start:.2f}s")
+    
+    groupings = {'Year': test_years, 'State': data['test_states'], 'County size': data['test_sizes']}
+    overall = point_metrics(test_labels_np, test_probs)
+    by_group = {name: grouped_metrics(keys, test_labels_np, test_probs) for name, keys in groupings.items()}
+    
+    intervals, group_intervals = {}, {}
+    if args.bootstrap > 0:
+        print(f"Bootstrapping {args.confidence:.0%} confidence intervals "
+              f"({args.bootstrap:,} resamples, {args.jobs} processes)...")
+        start = time.perf_counter()
+        pool = (ProcessPoolExecutor(max_workers=args.jobs, mp_context=mp.get_context('spawn'))
+                if args.jobs > 1 else contextlib.nullcontext())
+        with pool as executor:
+            intervals = bootstrap_ci(test_labels_np, test_probs, args.bootstrap, args.confidence, executor=executor)
+            group_intervals = {
+                name: grouped_bootstrap_ci(keys, test_labels_np, test_probs, args.bootstrap, args.confidence,
+                                           executor=executor)
+                for name, keys in groupings.items()
+            }
+        print(f"Bootstrap done in {time.perf_counter() - start:.2f}s")
+    
+    def ci(name):
+        if name not in intervals:
+            return ""
+        low, high = intervals[name]
+        return f" ({args.confidence:.0%} CI {low:.4f}-{high:.4f})"
+    
+    auc = overall['auc']
     cm = confusion_matrix(test_labels_np, test_preds)
     report = classification_report(test_labels_np, test_preds, target_names=['No Outbreak', 'Outbreak'])
     
     print("\n" + "=" * 80)
     print("TEST SET RESULTS")
     print("=" * 80)
-    print(f"\nTest AUC-ROC: {auc:.4f}")
+    print(f"\nTest AUC-ROC: {auc:.4f}{ci('auc')}")
     print("\nClassification Report:")
     print(report)
     print("\nConfusion Matrix:")
     print(cm)
     
-    tn, fp, fn, tp = cm.ravel()
-    specificity = tn / (tn + fp)
-    sensitivity = tp / (tp + fn)
-    ppv = tp / (tp + fp) if (tp + fp) > 0 else 0
-    npv = tn / (tn + fn) if (tn + fn) > 0 else 0
-    
     print(f"\nAdditional Metrics:")
-    print(f"  Sensitivity (Recall): {sensitivity:.4f}")
-    print(f"  Specificity: {specificity:.4f}")
-    print(f"  PPV (Precision): {ppv:.4f}")
-    print(f"  NPV: {npv:.4f}")
-    print(f"  Accuracy: {(tp + tn) / (tp + tn + fp + fn):.4f}")
+    print(f"  Sensitivity (Recall): {overall['sensitivity']:.4f}{ci('sensitivity')}")
+    print(f"  Specificity: {overall['specificity']:.4f}{ci('specificity')}")
+    print(f"  PPV (Precision): {overall['ppv']:.4f}{ci('ppv')}")
+    print(f"  NPV: {overall['npv']:.4f}{ci('npv')}")
+    print(f"  Accuracy: {overall['accuracy']:.4f}{ci('accuracy')}")
+    print(f"  Brier score: {overall['brier']:.4f}{ci('brier')}")
     
     plt.figure(figsize=(8, 6))
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
@@ -184,7 +268,7 @@ def main():
     plt.title(f'Confusion Matrix - Test Set (AUC={auc:.4f})')
     plt.ylabel('True Label')
     plt.xlabel('Predicted Label')
-    plt.savefig('figures/us_lstm_confusion_matrix.png', dpi=300, bbox_inches='tight')
+    plt.savefig(f'figures/us_lstm_confusion_matrix{suffix}.png', dpi=300, bbox_inches='tight')
     plt.close()
     
     fpr, tpr, thresholds = roc_curve(test_labels_np, test_probs)
@@ -196,7 +280,7 @@ def main():
     plt.title('ROC Curve - Test Set')
     plt.legend()
     plt.grid(True, alpha=0.3)
-    plt.savefig('figures/us_lstm_roc_curve.png', dpi=300, bbox_inches='tight')
+    plt.savefig(f'figures/us_lstm_roc_curve{suffix}.png', dpi=300, bbox_inches='tight')
     plt.close()
     
     plt.figure(figsize=(10, 6))
@@ -206,35 +290,34 @@ def main():
     plt.ylabel('Frequency')
     plt.title('Distribution of Predicted Probabilities')
     plt.legend()
-    plt.savefig('figures/us_lstm_probability_dist.png', dpi=300, bbox_inches='tight')
+    plt.savefig(f'figures/us_lstm_probability_dist{suffix}.png', dpi=300, bbox_inches='tight')
     plt.close()
     
-    # Analyze predictions by year
-    results_df = pd.DataFrame({
-        'Year': test_years,
-        'True_Label': test_labels_np,
-        'Predicted_Prob': test_probs,
-        'Predicted_Label': test_preds,
-        'County': test_counties
-    })
-    
-    print("\n" + "=" * 80)
-    print("Performance by Year:")
-    print("=" * 80)
-    for year in sorted(results_df['Year'].unique()):
-        year_data = results_df[results_df['Year'] == year]
-        year_auc = roc_auc_score(year_data['True_Label'], year_data['Predicted_Prob'])
-        year_acc = (year_data['True_Label'] == year_data['Predicted_Label']).mean()
-        outbreak_rate = year_data['True_Label'].mean()
+    for name, table in by_group.items():
+        table = table.set_index('group')
+        if name in group_intervals:
+            table['auc_low'] = [group_intervals[name][group]['auc'][0] for group in table.index]
+            table['auc_high'] = [group_intervals[name][group]['auc'][1] for group in table.index]
+        columns = [c for c in ['n', 'outbreak_rate', 'auc', 'auc_low', 'auc_high', 'accuracy',
+                               'sensitivity', 'specificity'] if c in table]
         
-        print(f"Year {year}: AUC={year_auc:.4f}, Accuracy={year_acc:.4f}, Outbreak Rate={outbreak_rate*100:.1f}%")
+        print("\n" + "=" * 80)
+        print(f"Performance by {name}:")
+        print("=" * 80)
+        print(table[columns].to_string(float_format=lambda v: f'{v:.4f}'))
+    
+    if args.metrics_out:
+        Path(args.metrics_out).parent.mkdir(parents=True, exist_ok=True)
+        tidy_metrics(overall, intervals, by_group, group_intervals).to_csv(args.metrics_out, index=False)
     
     print("\n" + "=" * 80)
     print("Evaluation complete!")
-    print(f"Confusion matrix saved to: figures/us_lstm_confusion_matrix.png")
-    print(f"ROC curve saved to: figures/us_lstm_roc_curve.png")
-    print(f"Probability distribution saved to: figures/us_lstm_probability_dist.png")
+    print(f"Confusion matrix saved to: figures/us_lstm_confusion_matrix{suffix}.png")
+    print(f"ROC curve saved to: figures/us_lstm_roc_curve{suffix}.png")
+    print(f"Probability distribution saved to: figures/us_lstm_probability_dist{suffix}.png")
+    if args.metrics_out:
+        print(f"Metrics saved to: {args.metrics_out}")
     print("=" * 80)
 
 if __name__ == '__main__':
-    main()
+    main(parse_args())
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+import torch
+from scipy.stats import rankdata
+
+METRICS = ('auc', 'accuracy', 'sensitivity', 'specificity', 'ppv', 'npv', 'brier')
+
+# Upper bound on the elements of one (resamples, n) index matrix, so a
+# bootstrap batch stays around a hundred MiB regardless of test-set size
+BOOTSTRAP_BATCH_ELEMENTS = 1 << 24
+
+
+def auto_batch_size(model, sample_shape, budget_bytes=256 << 20, max_batch_size=65536):
+    # Rough per-window activation footprint of the LSTM (inputs, four gates
+    # and the hidden/cell states per layer and step) against a memory budget
+    seq_length, n_features = sample_shape
+    hidden_dim = getattr(model, 'hidden_dim', 64)
+    num_layers = getattr(model, 'num_layers', 1)
+    per_sample = 4 * seq_length * (n_features + 6 * hidden_dim * num_layers)
+    return int(max(1, min(max_batch_size, budget_bytes // per_sample)))
+
+
+def predict_proba(model, sequences, device, batch_size=None):
+    # Outbreak probabilities for every window, written into one
+    # preallocated array instead of growing Python lists batch by batch
+    sequences = torch.as_tensor(sequences, dtype=torch.float32)
+    batch_size = batch_size or auto_batch_size(model, sequences.shape[1:])
+    probs = np.empty(len(sequences), dtype=np.float32)
+
+    model.eval()
+    with torch.inference_mode():
+        for start in range(0, len(sequences), batch_size):
+            logits = model(sequences[start:start + batch_size].to(device)).reshape(-1)
+            probs[start:start + len(logits)] = torch.sigmoid(logits).cpu().numpy()
+    return probs
+
+
+def _rates(tp, fp, tn, fn):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'accuracy': (tp + tn) / (tp + fp + tn + fn),
+            'sensitivity': tp / (tp + fn),
+            'specificity': tn / (tn + fp),
+            'ppv': tp / (tp + fp),
+            'npv': tn / (tn + fn),
+        }
+
+
+def _auc_from_ranks(rank_sum_pos, n_pos, n_neg):
+    # Mann-Whitney U: AUC from the summed (tie-averaged) ranks of positives;
+    # NaN where a sample has only one class
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (rank_sum_pos - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+def batched_metrics(labels, probs, threshold=0.5):
+    # Every metric for a stack of samples at once: labels and probs are
+    # (samples, n) and each result is a (samples,) array
+    labels = np.asarray(labels, dtype=bool)
+    probs = np.asarray(probs, dtype=np.float64)
+    preds = probs > threshold
+
+    n_pos = labels.sum(axis=1)
+    n_neg = labels.shape[1] - n_pos
+    ranks = rankdata(probs, axis=1)
+    tp = (preds & labels).sum(axis=1)
+    fp = (preds & ~labels).sum(axis=1)
+
+    return {
+        'auc': _auc_from_ranks((ranks * labels).sum(axis=1), n_pos, n_neg),
+        **_rates(tp, fp, n_neg - fp, n_pos - tp),
+        'brier': ((probs - labels) ** 2).mean(axis=1),
+    }
+
+
+def point_metrics(labels, probs, threshold=0.5):
+    return {name: float(values[0]) for name, values in batched_metrics(labels[None], probs[None], threshold).items()}
+
+
+def grouped_metrics(keys, labels, probs, threshold=0.5):
+    # Metrics per group from a single lexsort by (group, probability):
+    # groups become contiguous runs, ranks within each run give the AUC, and
+    # every other count is one bincount over the group ids. Returns one row
+    # per group, sorted by key.
+    keys = np.asarray(keys)
+    order = np.lexsort((probs, keys))
+    keys, labels, probs = keys[order], np.asarray(labels, dtype=bool)[order], np.asarray(probs)[order]
+    n = len(keys)
+
+    new_group = np.r_[True, keys[1:] != keys[:-1]]
+    group_ids = np.cumsum(new_group) - 1
+    starts = np.flatnonzero(new_group)
+    sizes = np.diff(np.r_[starts, n])
+
+    # Tied probabilities within a group share their average rank
+    new_block = new_group | np.r_[True, probs[1:] != probs[:-1]]
+    block_ids = np.cumsum(new_block) - 1
+    block_starts = np.flatnonzero(new_block)
+    block_ends = np.r_[block_starts[1:], n]
+    block_ranks = (block_starts + block_ends - 1) / 2 - starts[group_ids[block_starts]] + 1
+    ranks = block_ranks[block_ids]
+
+    n_groups = len(starts)
+    count = lambda values: np.bincount(group_ids, weights=values, minlength=n_groups)
+    preds = probs > threshold
+    n_pos = count(labels)
+    n_neg = sizes - n_pos
+    tp = count(preds & labels)
+    fp = count(preds & ~labels)
+
+    return pd.DataFrame({
+        'group': keys[starts],
+        'n': sizes,
+        'outbreak_rate': n_pos / sizes,
+        'auc': _auc_from_ranks(count(ranks * labels), n_pos, n_neg),
+        **_rates(tp, fp, n_neg - fp, n_pos - tp),
+        'brier': count((probs - labels) ** 2) / sizes,
+    })
+
+
+def _bootstrap_batch(labels, probs, seed, size, threshold):
+    # One vectorized batch of resamples: a (size, n) index matrix, gathered
+    # and scored in a single batched_metrics call
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(labels), size=(size, len(labels)))
+    return batched_metrics(labels[idx], probs[idx], threshold)
+
+
+def _bootstrap_tasks(labels, probs, n_resamples, seed, threshold):
+    batch = max(1, min(n_resamples, BOOTSTRAP_BATCH_ELEMENTS // max(1, len(labels))))
+    sizes = [batch] * (n_resamples // batch) + ([n_resamples % batch] if n_resamples % batch else [])
+    # Independent child seeds: results do not depend on how batches are
+    # spread over workers
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return [(labels, probs, child, size, threshold) for child, size in zip(seeds, sizes)]
+
+
+def _intervals(batches, confidence):
+    alpha = (1 - confidence) / 2
+    intervals = {}
+    for name in METRICS:
+        values = np.concatenate([batch[name] for batch in batches])
+        values = values[~np.isnan(values)]
+        intervals[name] = ((float(np.quantile(values, alpha)), float(np.quantile(values, 1 - alpha)))
+                           if len(values) else (np.nan, np.nan))
+    return intervals
+
+
+def _run(tasks, executor):
+    if executor is None:
+        return [_bootstrap_batch(*task) for task in tasks]
+    futures = [executor.submit(_bootstrap_batch, *task) for task in tasks]
+    return [future.result() for future in futures]
+
+
+def bootstrap_ci(labels, probs, n_resamples=1000, confidence=0.95, threshold=0.5, seed=0, executor=None):
+    # Percentile bootstrap intervals for every metric in METRICS:
+    # {metric: (low, high)}. Pass a process pool as executor to spread the
+    # resample batches across cores.
+    labels, probs = np.asarray(labels), np.asarray(probs)
+    return _intervals(_run(_bootstrap_tasks(labels, probs, n_resamples, seed, threshold), executor), confidence)
+
+
+def grouped_bootstrap_ci(keys, labels, probs, n_resamples=1000, confidence=0.95, threshold=0.5, seed=0,
+                         executor=None):
+    # bootstrap_ci within every group ({group: {metric: (low, high)}}). The
+    # groups' batches are all submitted before any result is awaited, so the
+    # pool stays busy across groups.
+    keys = np.asarray(keys)
+    order = np.argsort(keys, kind='stable')
+    keys, labels, probs = keys[order], np.asarray(labels)[order], np.asarray(probs)[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    bounds = np.r_[starts, len(keys)]
+
+    tasks = {}
+    for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        tasks[keys[start]] = _bootstrap_tasks(labels[start:end], probs[start:end], n_resamples, [seed, i], threshold)
+
+    if executor is None:
+        return {group: _intervals(_run(group_tasks, None), confidence) for group, group_tasks in tasks.items()}
+    futures = {
+        group: [executor.submit(_bootstrap_batch, *task) for task in group_tasks]
+        for group, group_tasks in tasks.items()
+    }
+    return {
+        group: _intervals([future.result() for future in group_futures], confidence)
+        for group, group_futures in futures.items()
+    }
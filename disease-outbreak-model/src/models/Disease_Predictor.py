@@ -1,5 +1,6 @@
 import torch
 import torch.nn as nn
+from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence
 
 class DiseasePredictor(nn.Module):
     def __init__(self, input_dim, hidden_dim=64, num_layers=2, dropout=0.2):
@@ -71,4 +72,23 @@ class OutbreakLSTMClassifier(nn.Module):
         
         # Pass through fully connected layers
         output = self.fc(last_output)
-        return output
\ No newline at end of file
+        return output
+    
+    def step(self, x, state=None):
+        # Incremental inference: x is (batch_size, new_steps, input_dim) and
+        # state is the (h, c) pair left behind by the previous call (or None
+        # to start from zeros). Returns logits for the last new step and the
+        # updated state so callers only ever feed the newly observed years.
+        lstm_out, (hidden, cell) = self.lstm(x, state)
+        output = self.fc(lstm_out[:, -1, :])
+        return output, (hidden, cell)
+    
+    def forward_sequence(self, x, lengths):
+        # Full-history mode: x is (batch_size, max_len, input_dim) zero-padded
+        # per-county histories and lengths their true lengths. Returns a logit
+        # for every timestep, (batch_size, max_len); positions at or beyond a
+        # sequence's length are padding and must be masked out by the caller.
+        packed = pack_padded_sequence(x, lengths.cpu(), batch_first=True, enforce_sorted=False)
+        packed_out, _ = self.lstm(packed)
+        lstm_out, _ = pad_packed_sequence(packed_out, batch_first=True, total_length=x.size(1))
+        return self.fc(lstm_out).squeeze(-1)
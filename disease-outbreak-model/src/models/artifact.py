@@ -0,0 +1,138 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import torch
+
+sys.path.append(str(Path(__file__).parent.parent))
+from models.Disease_Predictor import OutbreakLSTMClassifier
+
+# Single-file model artifact shared by training, evaluation and serving.
+#
+# A plain dict of tensors, strings, numbers and lists -- nothing that needs
+# pickled classes -- so it loads with torch.load(weights_only=True), and it
+# is written in torch's zip format so the weights can be memory-mapped
+# (mmap=True) instead of read into every process:
+#
+#   format         ARTIFACT_FORMAT
+#   state_dict     OutbreakLSTMClassifier weights
+#   config         constructor kwargs (input_dim, hidden_dim, num_layers,
+#                  dropout) plus seq_length and the training mode; artifacts
+#                  made by `convert` also record converted_from
+#   feature_cols   feature order the scaler and model expect
+#   scaler_mean    float64 tensors replacing a pickled StandardScaler:
+#   scaler_scale   x_scaled = (x - mean) / scale
+#   target_col, disease
+#   epoch          best epoch of the training run (0 = unknown, i.e. converted)
+#   metrics        validation metrics of that epoch ({} when converted)
+
+ARTIFACT_FORMAT = 'outbreak-lstm-classifier/1'
+MODEL_KWARGS = ('input_dim', 'hidden_dim', 'num_layers', 'dropout')
+
+
+def save_artifact(path, model, *, feature_cols, scaler_mean, scaler_scale, config,
+                  disease='unknown', epoch=0, metrics=None, target_col='Outbreak'):
+    artifact = {
+        'format': ARTIFACT_FORMAT,
+        'state_dict': {k: v.detach().cpu().contiguous() for k, v in model.state_dict().items()},
+        'config': dict(config),
+        'feature_cols': [str(col) for col in feature_cols],
+        'scaler_mean': torch.as_tensor(scaler_mean, dtype=torch.float64).clone(),
+        'scaler_scale': torch.as_tensor(scaler_scale, dtype=torch.float64).clone(),
+        'target_col': target_col,
+        'disease': str(disease),
+        'epoch': int(epoch),
+        'metrics': {k: float(v) for k, v in (metrics or {}).items()},
+    }
+    if len(artifact['feature_cols']) != artifact['config']['input_dim']:
+        raise ValueError(f"{len(feature_cols)} feature columns for input_dim={config['input_dim']}")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    torch.save(artifact, tmp_path)
+    # Atomic swap so a server (re)loading the artifact never sees half a file
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_artifact(path, map_location='cpu', mmap=True):
+    # Returns (artifact, mmapped). weights_only=True never unpickles
+    # arbitrary objects; mmap falls back to a regular read for files torch
+    # cannot map.
+    mmapped = mmap
+    try:
+        artifact = torch.load(path, map_location=map_location, weights_only=True, mmap=mmap)
+    except RuntimeError:
+        if not mmap:
+            raise
+        artifact, mmapped = torch.load(path, map_location=map_location, weights_only=True), False
+
+    if not isinstance(artifact, dict) or artifact.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(
+            f'{path} is not a {ARTIFACT_FORMAT} artifact (a bare state_dict from an older '
+            f'training run? convert it with: python src/models/artifact.py convert {path})'
+        )
+    return artifact, mmapped
+
+
+def build_model(artifact, assign=False):
+    # assign=True keeps the (possibly memory-mapped) artifact tensors as the
+    # parameters instead of copying them into new storage
+    model = OutbreakLSTMClassifier(**{k: artifact['config'][k] for k in MODEL_KWARGS})
+    model.load_state_dict(artifact['state_dict'], assign=assign)
+    return model.eval()
+
+
+def convert_state_dict(checkpoint, train_file, output, disease='Chlamydia',
+                       hidden_dim=64, num_layers=2, dropout=0.3, seq_length=3):
+    # Wraps a bare state_dict from an earlier training run. The scaler is
+    # refit exactly as training fit it (StandardScaler over the whole
+    # training file), so the result serves identically to the original.
+    # The checkpoint carries no epoch or validation metrics, so those stay
+    # empty and config records which file the weights came from.
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+    from preprocessing.sequences import get_feature_cols
+
+    train_df = pd.read_csv(train_file)
+    feature_cols = get_feature_cols(train_df)
+    scaler = StandardScaler().fit(train_df[feature_cols])
+
+    config = {'input_dim': len(feature_cols), 'hidden_dim': hidden_dim, 'num_layers': num_layers,
+              'dropout': dropout, 'seq_length': seq_length, 'training': 'windowed',
+              'converted_from': Path(checkpoint).name}
+    model = OutbreakLSTMClassifier(**{k: config[k] for k in MODEL_KWARGS})
+    model.load_state_dict(torch.load(checkpoint, map_location='cpu', weights_only=True))
+    return save_artifact(output, model, feature_cols=feature_cols, scaler_mean=scaler.mean_,
+                         scaler_scale=scaler.scale_, config=config, disease=disease)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Model artifact tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    convert = sub.add_parser('convert', help='wrap a bare .pth state_dict into an artifact')
+    convert.add_argument('checkpoint')
+    convert.add_argument('--train-file', default='data/atlasplus_all_us_train.csv',
+                         help='training CSV the checkpoint was trained on (for feature order and scaler)')
+    convert.add_argument('--output', help='default: the checkpoint path with a .pt suffix')
+    convert.add_argument('--disease', default='Chlamydia')
+    convert.add_argument('--hidden-dim', type=int, default=64)
+    convert.add_argument('--num-layers', type=int, default=2)
+    convert.add_argument('--dropout', type=float, default=0.3)
+
+    show = sub.add_parser('show', help='print an artifact\'s metadata')
+    show.add_argument('artifact')
+
+    args = parser.parse_args()
+    if args.command == 'convert':
+        output = args.output or str(Path(args.checkpoint).with_suffix('.pt'))
+        path = convert_state_dict(args.checkpoint, args.train_file, output, args.disease,
+                                  args.hidden_dim, args.num_layers, args.dropout)
+        print(f'Saved artifact to: {path}')
+    else:
+        artifact, _ = load_artifact(args.artifact, mmap=False)
+        for key in ('format', 'disease', 'epoch', 'config', 'feature_cols', 'metrics'):
+            print(f'{key}: {artifact[key]}')
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch.nn.utils.rnn import pack_padded_sequence
+
+sys.path.append(str(Path(__file__).parent.parent))
+from models.artifact import build_model, load_artifact
+
+
+def artifact_version(artifact):
+    # Stable identifier of a model artifact, used to key stored states: it
+    # changes with the weights, the architecture, the feature order or the
+    # scaler, since states computed under any of them are stale for another.
+    digest = hashlib.sha256()
+    digest.update(json.dumps(
+        {k: artifact[k] for k in ('format', 'config', 'feature_cols', 'disease')},
+        sort_keys=True, default=str,
+    ).encode())
+    for name in ('scaler_mean', 'scaler_scale'):
+        digest.update(artifact[name].cpu().numpy().tobytes())
+    for name, tensor in sorted(artifact['state_dict'].items()):
+        digest.update(name.encode())
+        digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return f"{artifact['disease']}-{digest.hexdigest()[:16]}"
+
+
+class CountyStateStore:
+    # Array-backed store of each county's LSTM (h, c) after its last observed
+    # year. Rows are addressed through a FIPS -> row index so a batch of
+    # counties is gathered/scattered with a single fancy-index operation.
+
+    def __init__(self, num_layers, hidden_dim, model_version, capacity=4096):
+        self.num_layers = num_layers
+        self.hidden_dim = hidden_dim
+        self.model_version = model_version
+        self.index = {}
+        self.fips = np.empty(capacity, dtype='U5')
+        self.h = np.zeros((capacity, num_layers, hidden_dim), dtype=np.float32)
+        self.c = np.zeros((capacity, num_layers, hidden_dim), dtype=np.float32)
+        self.last_year = np.full(capacity, -1, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, fips):
+        return str(fips) in self.index
+
+    def _grow(self, needed):
+        capacity = len(self.fips)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        extra = new_capacity - capacity
+        self.fips = np.concatenate([self.fips, np.empty(extra, dtype='U5')])
+        self.h = np.concatenate([self.h, np.zeros((extra,) + self.h.shape[1:], dtype=np.float32)])
+        self.c = np.concatenate([self.c, np.zeros((extra,) + self.c.shape[1:], dtype=np.float32)])
+        self.last_year = np.concatenate([self.last_year, np.full(extra, -1, dtype=np.int32)])
+
+    def rows_for(self, fips_list, create=False):
+        # Returns the row of every county; unknown counties get -1 unless
+        # create=True, in which case fresh zero-state rows are allocated.
+        rows = np.empty(len(fips_list), dtype=np.int64)
+        for i, fips in enumerate(fips_list):
+            key = str(fips)
+            row = self.index.get(key)
+            if row is None:
+                if not create:
+                    rows[i] = -1
+                    continue
+                row = len(self.index)
+                self._grow(row + 1)
+                self.index[key] = row
+                self.fips[row] = key
+            rows[i] = row
+        return rows
+
+    def gather(self, rows):
+        # (num_layers, batch, hidden) tensors as expected by nn.LSTM
+        h = torch.from_numpy(self.h[rows]).transpose(0, 1).contiguous()
+        c = torch.from_numpy(self.c[rows]).transpose(0, 1).contiguous()
+        return h, c
+
+    def scatter(self, rows, state, years):
+        h, c = state
+        self.h[rows] = h.detach().cpu().transpose(0, 1).numpy()
+        self.c[rows] = c.detach().cpu().transpose(0, 1).numpy()
+        self.last_year[rows] = years
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        n = len(self.index)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                model_version=np.array(self.model_version),
+                fips=self.fips[:n],
+                h=self.h[:n],
+                c=self.c[:n],
+                last_year=self.last_year[:n],
+            )
+        # Atomic swap so a crash mid-write never leaves a truncated store
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, num_layers, hidden_dim, model_version):
+        # Returns an empty store when the file is missing or was written by a
+        # different model version / architecture, so stale states are never
+        # fed into new weights.
+        store = cls(num_layers, hidden_dim, model_version)
+        path = Path(path)
+        if not path.exists():
+            return store
+
+        with np.load(path) as data:
+            if str(data['model_version']) != model_version:
+                return store
+            if data['h'].shape[1:] != (num_layers, hidden_dim):
+                return store
+            n = len(data['fips'])
+            store._grow(n)
+            store.fips[:n] = data['fips']
+            store.h[:n] = data['h']
+            store.c[:n] = data['c']
+            store.last_year[:n] = data['last_year']
+        store.index = {fips: row for row, fips in enumerate(store.fips[:n])}
+        return store
+
+
+class StreamingOutbreakPredictor:
+    # Streaming inference on top of OutbreakLSTMClassifier.step: each county's
+    # history is run once (prime), after which every new year of data only
+    # costs one batched LSTM step across all counties that reported (advance).
+    # Inputs are scaled features; from_artifact also keeps the artifact's
+    # feature order and scaler for scale().
+
+    def __init__(self, model, store, device='cpu', feature_cols=None, scaler=None):
+        self.model = model.to(device).eval()
+        self.store = store
+        self.device = torch.device(device)
+        self.feature_cols = feature_cols
+        self.scaler = scaler
+
+    @classmethod
+    def from_artifact(cls, path, state_path=None, device='cpu'):
+        # States saved at state_path are reused only if they were computed
+        # with this exact artifact (see artifact_version); otherwise every
+        # county starts again from an empty store.
+        artifact, _ = load_artifact(path, mmap=False)
+        config = artifact['config']
+        version = artifact_version(artifact)
+        if state_path is None:
+            store = CountyStateStore(config['num_layers'], config['hidden_dim'], version)
+        else:
+            store = CountyStateStore.load(state_path, config['num_layers'], config['hidden_dim'], version)
+        scaler = (artifact['scaler_mean'].numpy(), artifact['scaler_scale'].numpy())
+        return cls(build_model(artifact), store, device, artifact['feature_cols'], scaler)
+
+    def scale(self, features):
+        # Raw feature rows (..., input_dim) in feature_cols order -> model inputs
+        mean, scale = self.scaler
+        return ((np.asarray(features, dtype=np.float64) - mean) / scale).astype(np.float32)
+
+    @torch.no_grad()
+    def prime(self, fips_list, sequences, lengths, last_years):
+        # sequences: (n_counties, max_len, input_dim) padded histories
+        sequences = torch.as_tensor(sequences, dtype=torch.float32, device=self.device)
+        lengths = torch.as_tensor(lengths, dtype=torch.int64)
+        packed = pack_padded_sequence(sequences, lengths, batch_first=True, enforce_sorted=False)
+        _, state = self.model.lstm(packed)
+
+        rows = self.store.rows_for(fips_list, create=True)
+        self.store.scatter(rows, state, np.asarray(last_years, dtype=np.int32))
+
+    @torch.no_grad()
+    def advance(self, fips_list, x_new, years):
+        # x_new: (batch_size, input_dim) observation for one new year per
+        # county. Counties without a stored state start from zeros.
+        # Every county in a batch is stepped from its stored state in
+        # parallel, so two years of one county must go in separate calls.
+        years = np.asarray(years, dtype=np.int32)
+        keys = [str(fips) for fips in fips_list]
+        if len(set(keys)) != len(keys):
+            duplicate = next(key for key, count in Counter(keys).items() if count > 1)
+            raise ValueError(
+                f'FIPS {duplicate} appears more than once in the batch; advance it one year per call'
+            )
+
+        # Validated before any rows are allocated, so a rejected batch leaves
+        # the store as it was
+        known = self.store.rows_for(keys)
+        stale = (known >= 0) & (years <= self.store.last_year[known])
+        if stale.any():
+            raise ValueError(
+                f'{int(stale.sum())} observation(s) are not newer than the stored state '
+                f'(e.g. FIPS {keys[int(np.argmax(stale))]})'
+            )
+
+        rows = self.store.rows_for(keys, create=True)
+        h, c = self.store.gather(rows)
+        x = torch.as_tensor(x_new, dtype=torch.float32, device=self.device).unsqueeze(1)
+        logits, state = self.model.step(x, (h.to(self.device), c.to(self.device)))
+
+        self.store.scatter(rows, state, years)
+        return torch.sigmoid(logits.squeeze(-1)).cpu().numpy()
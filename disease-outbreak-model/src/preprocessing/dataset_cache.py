@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Bump when the layout or the meaning of cached arrays changes
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent.parent / 'data' / 'cache'
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(sources, params):
+    # Content-addressed: the key changes whenever any source file's bytes or
+    # any preprocessing parameter changes, never because of a path or mtime
+    payload = {
+        'version': CACHE_VERSION,
+        'sources': [file_digest(path) for path in sources],
+        'params': params,
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()[:24]
+
+
+class DatasetCache:
+    # One directory per key holding a .npy file per array plus meta.json.
+    # Plain .npy (not .npz) so every array can be memory-mapped on load.
+    # mmap_mode='c' maps copy-on-write: arrays are writable (torch can wrap
+    # them without copying) but the cache files are never modified.
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, enabled=True):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+
+    def _entry_dir(self, key):
+        return self.cache_dir / key
+
+    def load(self, key):
+        entry = self._entry_dir(key)
+        meta_path = entry / 'meta.json'
+        if not self.enabled or not meta_path.exists():
+            return None
+
+        meta = json.loads(meta_path.read_text())
+        arrays = {
+            name: np.load(entry / f'{name}.npy', mmap_mode='c', allow_pickle=False)
+            for name in meta['arrays']
+        }
+        return arrays, meta['meta']
+
+    def save(self, key, arrays, meta):
+        if not self.enabled:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Write into a scratch dir and rename it into place, so concurrent
+        # runs never see a half-written entry
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f'.{key}-', dir=self.cache_dir))
+        try:
+            for name, array in arrays.items():
+                np.save(tmp_dir / f'{name}.npy', np.ascontiguousarray(array), allow_pickle=False)
+            (tmp_dir / 'meta.json').write_text(json.dumps(
+                {'arrays': list(arrays), 'meta': meta}, indent=2, default=str
+            ))
+            os.rename(tmp_dir, self._entry_dir(key))
+        except OSError:
+            # Another process published the same key first; theirs is identical
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not (self._entry_dir(key) / 'meta.json').exists():
+                raise
+
+    def get_or_build(self, sources, params, build_fn):
+        # build_fn() -> (arrays: dict[str, np.ndarray], meta: dict of JSON values)
+        # Returns (arrays, meta, hit).
+        key = cache_key(sources, params)
+        cached = self.load(key)
+        if cached is not None:
+            return cached[0], cached[1], True
+
+        arrays, meta = build_fn()
+        self.save(key, arrays, meta)
+        # Re-open through the cache so hits and misses hand back the same
+        # (memory-mapped) arrays
+        cached = self.load(key)
+        if cached is None:
+            return arrays, meta, False
+        return cached[0], cached[1], False
@@ -0,0 +1,192 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STATE_PATH = Path(__file__).resolve().parent.parent.parent / 'data' / 'atlasplus_state.npz'
+
+
+def group_keys(df):
+    # One key per (indicator, county) series, e.g. "Chlamydia|06037"
+    return (df['Disease'].astype(str) + '|' + df['FIPS'].astype(str)).to_numpy(dtype=str)
+
+
+def _sort_by_group(df):
+    keys = group_keys(df)
+    order = np.lexsort((df['Year'].to_numpy(), keys))
+    return df.iloc[order].reset_index(drop=True), keys[order]
+
+
+class CountyRunningStats:
+    # Per-(indicator, county) summary of everything the labelling and lag
+    # steps need from the past: Welford running count / mean / M2 of the case
+    # counts, the last max_lag case values (most recent first) and the last
+    # year seen. With it a new year of surveillance data is labelled and
+    # lagged without re-reading any history.
+
+    def __init__(self, lag_steps, threshold):
+        self.lag_steps = list(lag_steps)
+        self.threshold = float(threshold)
+        self.max_lag = max(self.lag_steps)
+        self.keys = np.empty(0, dtype=str)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0, dtype=np.float64)
+        self.m2 = np.zeros(0, dtype=np.float64)
+        self.last_cases = np.full((0, self.max_lag), np.nan)
+        self.last_year = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_history(cls, df, lag_steps, threshold):
+        # df: cleaned rows (Disease, FIPS, Year, Cases) exactly as fed to
+        # define_outbreak_labels, i.e. before lag rows are dropped
+        stats = cls(lag_steps, threshold)
+        df, keys = _sort_by_group(df)
+        grouped = df.groupby(keys, sort=True)
+        cases = grouped['Cases']
+
+        stats.keys = cases.count().index.to_numpy(dtype=str)
+        stats.count = cases.count().to_numpy(dtype=np.int64)
+        stats.mean = cases.mean().to_numpy(dtype=np.float64)
+        # Population variance * n == M2
+        stats.m2 = (cases.var(ddof=0) * cases.count()).to_numpy(dtype=np.float64)
+        stats.last_year = grouped['Year'].max().to_numpy(dtype=np.int32)
+
+        stats.last_cases = np.full((len(stats.keys), stats.max_lag), np.nan)
+        rank_from_end = cases.cumcount(ascending=False).to_numpy()
+        keep = rank_from_end < stats.max_lag
+        rows = np.searchsorted(stats.keys, keys[keep])
+        stats.last_cases[rows, rank_from_end[keep]] = df['Cases'].to_numpy(dtype=np.float64)[keep]
+        return stats
+
+    def _rows_for(self, keys):
+        # Row per key, appending empty rows for series seen for the first time
+        rows = pd.Index(self.keys).get_indexer(keys)
+        new_keys = pd.unique(keys[rows < 0])
+        if len(new_keys):
+            n = len(new_keys)
+            self.keys = np.concatenate([self.keys, new_keys.astype(str)])
+            self.count = np.concatenate([self.count, np.zeros(n, dtype=np.int64)])
+            self.mean = np.concatenate([self.mean, np.zeros(n)])
+            self.m2 = np.concatenate([self.m2, np.zeros(n)])
+            self.last_cases = np.concatenate([self.last_cases, np.full((n, self.max_lag), np.nan)])
+            self.last_year = np.concatenate([self.last_year, np.full(n, np.iinfo(np.int32).min, dtype=np.int32)])
+            rows = pd.Index(self.keys).get_indexer(keys)
+        return rows
+
+    def apply(self, new_df):
+        # Folds new rows into the running statistics and returns them with
+        # Outbreak and lag columns. Rows for years a series has already been
+        # updated with are skipped, so re-applying the same file is a no-op.
+        #
+        # Labels for the new rows use the updated per-county mean/std (as a
+        # full rebuild would); labels already written for earlier years are
+        # left as they were.
+        new_df, keys = _sort_by_group(new_df)
+        rows = self._rows_for(keys)
+
+        fresh = new_df['Year'].to_numpy() > self.last_year[rows]
+        skipped = int((~fresh).sum())
+        new_df, keys, rows = new_df[fresh].reset_index(drop=True), keys[fresh], rows[fresh]
+        if new_df.empty:
+            empty = {col: pd.Series(dtype=float) for col in [f'Cases_lag_{lag}' for lag in self.lag_steps]}
+            return new_df.assign(Outbreak=pd.Series(dtype=int), **empty), skipped
+
+        cases = new_df['Cases'].to_numpy(dtype=np.float64)
+
+        # Per-series batch statistics, merged into the running ones with
+        # Chan et al.'s parallel form of Welford's update
+        n_rows = len(self.keys)
+        n_b = np.bincount(rows, minlength=n_rows)
+        mean_b = np.bincount(rows, weights=cases, minlength=n_rows) / np.maximum(n_b, 1)
+        m2_b = np.bincount(rows, weights=(cases - mean_b[rows]) ** 2, minlength=n_rows)
+        n_a = self.count
+        n = n_a + n_b
+        touched = n_b > 0
+        delta = mean_b - self.mean
+        self.mean = np.where(touched, self.mean + delta * n_b / np.maximum(n, 1), self.mean)
+        self.m2 = np.where(touched, self.m2 + m2_b + delta ** 2 * n_a * n_b / np.maximum(n, 1), self.m2)
+        self.count = n
+
+        # Sample std (ddof=1) like pandas' groupby std; undefined for a
+        # single observation, which never counts as an outbreak
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        std[self.count < 2] = np.nan
+        county_threshold = self.mean + self.threshold * std
+        outbreak = (cases > county_threshold[rows]).astype(int)
+
+        # Lags come from earlier new rows of the same county when there are
+        # enough of them, otherwise from the stored last values
+        position = new_df.groupby(keys, sort=False).cumcount().to_numpy()
+        lag_columns = {}
+        for lag in self.lag_steps:
+            from_batch = position >= lag
+            values = np.empty(len(cases))
+            values[from_batch] = cases[np.flatnonzero(from_batch) - lag]
+            stored = ~from_batch
+            values[stored] = self.last_cases[rows[stored], lag - position[stored] - 1]
+            lag_columns[f'Cases_lag_{lag}'] = values
+
+        # Shift each touched series' last values by its number of new rows
+        ends = np.flatnonzero(np.r_[keys[1:] != keys[:-1], True])
+        end_rows = rows[ends]
+        end_counts = n_b[end_rows]
+        shifted = np.full((len(ends), self.max_lag), np.nan)
+        for j in range(self.max_lag):
+            from_batch = j < end_counts
+            shifted[from_batch, j] = cases[ends[from_batch] - j]
+            old_j = j - end_counts
+            from_old = ~from_batch & (old_j < self.max_lag)
+            shifted[from_old, j] = self.last_cases[end_rows[from_old], old_j[from_old]]
+        self.last_cases[end_rows] = shifted
+        self.last_year[end_rows] = new_df['Year'].to_numpy()[ends]
+
+        return new_df.assign(Outbreak=outbreak, **lag_columns), skipped
+
+    def save(self, path=DEFAULT_STATE_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                lag_steps=np.array(self.lag_steps),
+                threshold=np.array(self.threshold),
+                keys=self.keys,
+                count=self.count,
+                mean=self.mean,
+                m2=self.m2,
+                last_cases=self.last_cases,
+                last_year=self.last_year,
+            )
+        # Atomic swap so a crash mid-write never leaves a truncated state
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, lag_steps, threshold):
+        # Unlike a model state store, a mismatched state cannot be silently
+        # discarded (the history it summarizes is not re-read), so this raises
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f'No preprocessing state at {path}; run a full build first')
+
+        with np.load(path) as data:
+            if 'keys' not in data.files:
+                raise ValueError(f'State at {path} predates per-indicator keys; run a full build first')
+            if list(data['lag_steps']) != list(lag_steps) or float(data['threshold']) != float(threshold):
+                raise ValueError(
+                    f'State at {path} was built with lags {list(data["lag_steps"])} and threshold '
+                    f'{float(data["threshold"])}; rebuild it for lags {list(lag_steps)} / threshold {threshold}'
+                )
+            stats = cls(lag_steps, threshold)
+            stats.keys = data['keys']
+            stats.count = data['count']
+            stats.mean = data['mean']
+            stats.m2 = data['m2']
+            stats.last_cases = data['last_cases']
+            stats.last_year = data['last_year']
+        return stats
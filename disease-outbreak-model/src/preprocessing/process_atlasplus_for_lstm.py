@@ -1,103 +1,271 @@
+import argparse
+import re
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
+sys.path.append(str(Path(__file__).parent.parent))
+from preprocessing.incremental import CountyRunningStats, DEFAULT_STATE_PATH
 
-def clean_year(year_str):
+DEFAULT_INPUT = '/Users/brauliopantoja-esquina/Downloads/AtlasPlusTableData.csv'
+HEADER_MARKER = 'Indicator,Year,State'
+
+# Only these columns are ever read from the (very wide) export. Low-
+# cardinality labels are parsed straight into categoricals; the three
+# columns that need cleaning stay strings.
+READ_DTYPES = {
+    'Indicator': 'category',
+    'Year': str,
+    'State': 'category',
+    'County': 'category',
+    'FIPS': str,
+    'Age Group': 'category',
+    'Sex': 'category',
+    'Race/Ethnicity': 'category',
+    'Cases': str,
+}
+
+LAG_STEPS = [1, 2, 3]
+OUTBREAK_THRESHOLD = 1.0   # outbreak = cases > county mean + threshold * std
+TRAIN_END_YEAR = 2019     # train <= 2019, test >= 2020
+
+# Labels and lags are computed independently per indicator and county
+GROUP_COLS = ['Disease', 'FIPS']
+
+# One directory per indicator: data/atlasplus_by_indicator/indicator=<slug>/
+PARTITION_DIR = 'data/atlasplus_by_indicator'
+
+# The original single-disease outputs, still written for this indicator
+LEGACY_INDICATOR = 'Chlamydia'
+TRAIN_FILE = 'data/atlasplus_all_us_train.csv'
+TEST_FILE = 'data/atlasplus_all_us_test.csv'
+
+AGGREGATE_FILTER = {
+    'Age Group': 'All age groups',
+    'Sex': 'Both sexes',
+    'Race/Ethnicity': 'All races/ethnicities',
+}
+
+def find_header_offset(path, marker=HEADER_MARKER, max_lines=1000):
+    
+    # Stream only the preamble instead of reading the whole file; returns
+    # the byte offset of the header line so readers can start right there
+    marker = marker.encode()
+    with open(path, 'rb') as f:
+        for _ in range(max_lines):
+            offset = f.tell()
+            line = f.readline()
+            if not line:
+                break
+            if marker in line:
+                return offset
+    return 0
+
+def clean_years(years):
     
-    return int(str(year_str).split()[0])
+    # "2020 (COVID-19 Pandemic)" -> 2020
+    return years.astype(str).str.split(n=1).str[0].astype(int)
 
-def extract_numeric_cases(val):
+def extract_numeric_cases(cases):
     
-    if pd.isna(val):
-        return np.nan
+    # "1,234" -> 1234.0; "Data not available", "Suppressed", "" -> NaN
+    cases = cases.astype(str).str.strip().str.replace(',', '', regex=False)
+    return pd.to_numeric(cases, errors='coerce')
+
+def extract_fips_codes(fips):
     
-    val_str = str(val).strip()
+    # Zero-padded so "1001" (parsed as a number by some engines) and
+    # "01001" map to the same county
+    fips = fips.astype('string').str.strip()
+    return fips.str[:5].str.zfill(5)
+
+def _filter_aggregates(df):
     
-    # Skip specific non-numeric markers
-    if val_str in ['Data not available', 'Suppressed', '']:
-        return np.nan
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in AGGREGATE_FILTER.items():
+        mask &= (df[col] == value).to_numpy(dtype=bool, na_value=False)
+    return df[mask]
+
+def load_atlasplus(path, engine='auto', chunksize=None):
+    
+    # Read only the needed columns (labels as categoricals), keep the
+    # aggregated demographic rows, then clean with vectorized string ops.
+    # engine='auto' uses pyarrow when installed. With chunksize set, the
+    # file is read with the C engine in chunks that are filtered as they
+    # arrive, so peak memory is bounded by the chunk size plus the result.
+    read_kwargs = dict(usecols=list(READ_DTYPES), dtype=READ_DTYPES)
+    
+    with open(path, 'rb') as f:
+        f.seek(find_header_offset(path))
+        if chunksize:
+            chunks = pd.read_csv(f, chunksize=chunksize, **read_kwargs)
+            df = pd.concat([_filter_aggregates(chunk) for chunk in chunks], ignore_index=True)
+        else:
+            if engine == 'auto':
+                try:
+                    import pyarrow  # noqa: F401
+                    engine = 'pyarrow'
+                except ImportError:
+                    engine = 'c'
+            df = _filter_aggregates(pd.read_csv(f, engine=engine, **read_kwargs))
+    
+    df = df.assign(
+        Year=clean_years(df['Year']),
+        Cases=extract_numeric_cases(df['Cases']),
+        FIPS=extract_fips_codes(df['FIPS']),
+    )
+    return df.dropna(subset=['FIPS', 'Cases'])
+
+def indicator_slug(indicator):
     
-    # Remove commas
-    val_str = val_str.replace(',', '')
+    # "Primary and Secondary Syphilis" -> "primary_and_secondary_syphilis"
+    return re.sub(r'[^a-z0-9]+', '_', str(indicator).lower()).strip('_')
+
+def partition_paths(indicator, root=PARTITION_DIR):
     
-    try:
-        return float(val_str)
-    except:
-        return np.nan
+    # (train, test) CSVs holding only this indicator's rows
+    partition = Path(root) / f'indicator={indicator_slug(indicator)}'
+    return partition / 'train.csv', partition / 'test.csv'
 
-def extract_fips_code(fips_str):
+def prepare_records(df):
     
-    if pd.isna(fips_str):
-        return None
+    # Every indicator in the export is kept; Disease identifies it downstream
+    df['Disease'] = df['Indicator']
+    df['Sex'] = 'Total'
     
-    fips_str = str(fips_str).strip()
-    if len(fips_str) >= 5:
-        return fips_str[:5]
-    return fips_str
+    # Keep only necessary columns; repeated labels are stored as categoricals
+    return df[['Year', 'State', 'FIPS', 'County', 'Disease', 'Sex', 'Cases']].astype(
+        {'State': 'category', 'County': 'category', 'Disease': 'category', 'Sex': 'category'}
+    )
 
 def define_outbreak_labels(df, method='statistical', threshold=1.0):
     
     if method == 'statistical':
-        county_stats = df.groupby('FIPS')['Cases'].agg(['mean', 'std']).reset_index()
-        county_stats['threshold'] = county_stats['mean'] + threshold * county_stats['std']
-        
-        df = df.merge(county_stats[['FIPS', 'threshold']], on='FIPS', how='left')
+        # Mean/std per (indicator, county), broadcast back onto the rows
+        cases = df.groupby(GROUP_COLS, observed=True)['Cases']
+        county_threshold = cases.transform('mean') + threshold * cases.transform('std')
         
-        df['Outbreak'] = (df['Cases'] > df['threshold']).astype(int)
-        df = df.drop('threshold', axis=1)
+        df['Outbreak'] = (df['Cases'] > county_threshold).astype(int)
     
     return df
 
-def main():
+def add_lag_features(df, lag_steps=LAG_STEPS):
+    
+    # Previous years' cases per (indicator, county); rows without a full
+    # set of lags are dropped
+    df = df.sort_values(GROUP_COLS + ['Year'])
+    
+    grouped_cases = df.groupby(GROUP_COLS, observed=True)['Cases']
+    for lag in lag_steps:
+        df[f'Cases_lag_{lag}'] = grouped_cases.shift(lag)
+    
+    return df.dropna(subset=[f'Cases_lag_{lag}' for lag in lag_steps])
+
+def parse_args():
+    
+    parser = argparse.ArgumentParser(description='Process AtlasPlusTableData.csv for LSTM training')
+    parser.add_argument('--input', default=DEFAULT_INPUT, help='path to the AtlasPlus CSV export')
+    parser.add_argument('--chunksize', type=int, default=500_000,
+                        help='rows per chunk; bounds peak memory (0 = read the file in one go)')
+    parser.add_argument('--append', metavar='NEW_CSV',
+                        help='AtlasPlus export with new surveillance years: label, lag and append '
+                             'only these rows using the saved state instead of rebuilding')
+    parser.add_argument('--state', default=str(DEFAULT_STATE_PATH),
+                        help='per-county running statistics written by a full build')
+    parser.add_argument('--engine', choices=['auto', 'pyarrow', 'c'], default='auto',
+                        help='CSV engine when --chunksize 0 (auto = pyarrow when installed; '
+                             'fastest, but highest peak memory)')
+    return parser.parse_args()
+
+def append_rows(df, path):
+    
+    # Match the column order of the existing file
+    path = Path(path)
+    if path.exists():
+        columns = pd.read_csv(path, nrows=0).columns
+        df[columns].to_csv(path, mode='a', header=False, index=False)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(path, index=False)
+
+def write_outputs(df, append=False):
+    
+    # Splits the processed rows by indicator and by TRAIN_END_YEAR and writes
+    # (or appends to) each indicator's partition; the legacy indicator also
+    # goes to the original single-disease files. Returns one summary per
+    # indicator.
+    summaries = []
+    for indicator, part in df.groupby('Disease', observed=True, sort=True):
+        train_path, test_path = partition_paths(indicator)
+        targets = [(train_path, test_path)]
+        if indicator == LEGACY_INDICATOR:
+            targets.append((TRAIN_FILE, TEST_FILE))
+        
+        train_part = part[part['Year'] <= TRAIN_END_YEAR]
+        test_part = part[part['Year'] > TRAIN_END_YEAR]
+        for paths in targets:
+            for path, rows in zip(paths, (train_part, test_part)):
+                if append:
+                    if len(rows):
+                        append_rows(rows, path)
+                else:
+                    Path(path).parent.mkdir(parents=True, exist_ok=True)
+                    rows.to_csv(path, index=False)
+        
+        summaries.append({
+            'indicator': indicator, 'partition': train_path.parent,
+            'train': train_part, 'test': test_part,
+        })
+    return summaries
+
+def append_main(args):
     print("=" * 80)
-    print("Processing AtlasPlusTableData.csv for LSTM Training (ALL US COUNTIES)")
+    print("Appending new AtlasPlus surveillance data (incremental)")
     print("=" * 80)
     
-    print("\nLoading full AtlasPlus data for all US counties...")
+    state = CountyRunningStats.load(args.state, LAG_STEPS, OUTBREAK_THRESHOLD)
+    print(f"\nLoaded state for {len(state):,} indicator/county series from: {args.state}")
     
-    # Read the CSV with proper header
-    with open('/Users/brauliopantoja-esquina/Downloads/AtlasPlusTableData.csv', 'r') as f:
-        lines = f.readlines()
-        header_row = 0
-        for i, line in enumerate(lines):
-            if 'Indicator,Year,State' in line:
-                header_row = i
-                break
+    df = prepare_records(load_atlasplus(args.append, engine=args.engine, chunksize=args.chunksize))
+    print(f"New records after filtering: {len(df):,}")
     
-    df_full = pd.read_csv('/Users/brauliopantoja-esquina/Downloads/AtlasPlusTableData.csv', skiprows=header_row)
-    print(f"Loaded {len(df_full):,} total records (all US states)")
+    new_df, skipped = state.apply(df)
+    if skipped:
+        print(f"Skipped {skipped:,} records for years already in the state")
     
-    # Filter for aggregated data (all age groups, both sexes, all races)
-    df = df_full[
-        (df_full['Age Group'] == 'All age groups') &
-        (df_full['Sex'] == 'Both sexes') &
-        (df_full['Race/Ethnicity'] == 'All races/ethnicities')
-    ].copy()
+    new_df = new_df.dropna(subset=[f'Cases_lag_{lag}' for lag in LAG_STEPS])
+    if new_df.empty:
+        print("\nNothing new to append.")
+        return
+    print(f"Records with lag features: {len(new_df):,} ({new_df['Year'].min()}-{new_df['Year'].max()})")
+    print(f"Outbreak rate (new records): {new_df['Outbreak'].mean()*100:.1f}%")
     
-    print(f"After filtering for aggregated demographics: {len(df):,} records")
-    print(f"States: {df['State'].nunique()}")
-    print(f"Counties: {df['County'].nunique()}")
+    for summary in write_outputs(new_df, append=True):
+        print(f"Appended {len(summary['train']):,} train / {len(summary['test']):,} test records "
+              f"for {summary['indicator']} to: {summary['partition']}")
     
-    # Clean the data
-    print("\nCleaning data...")
-    df['Year'] = df['Year'].apply(clean_year)
-    df['Cases'] = df['Cases'].apply(extract_numeric_cases)
-    df['FIPS'] = df['FIPS'].apply(extract_fips_code)
+    # Saved last, so a failed append can simply be re-run
+    state.save(args.state)
+    print(f"Updated state: {args.state}")
+
+def main(args):
+    if args.append:
+        return append_main(args)
     
-    # Remove records with missing FIPS or Cases
-    df = df.dropna(subset=['FIPS', 'Cases'])
-    print(f"After removing missing FIPS/Cases: {len(df):,} records")
+    print("=" * 80)
+    print("Processing AtlasPlusTableData.csv for LSTM Training (ALL US COUNTIES, ALL INDICATORS)")
+    print("=" * 80)
     
-    # Add Disease column for consistency
-    df['Disease'] = 'Chlamydia'
-    df['Sex'] = 'Total'
+    print("\nLoading full AtlasPlus data for all US counties...")
+    print("(aggregated demographics only: all ages, both sexes, all races)")
+    df = load_atlasplus(args.input, engine=args.engine, chunksize=args.chunksize)
+    print(f"After filtering and removing missing FIPS/Cases: {len(df):,} records")
     
-    # Keep only necessary columns
-    df = df[['Year', 'State', 'FIPS', 'County', 'Disease', 'Sex', 'Cases']].copy()
+    df = prepare_records(df)
     
-    print(f"\nYear range: {df['Year'].min()} to {df['Year'].max()}")
+    print(f"\nIndicators: {', '.join(df['Disease'].cat.categories)}")
+    print(f"Year range: {df['Year'].min()} to {df['Year'].max()}")
     print(f"States: {df['State'].nunique()}")
     print(f"Counties: {df['FIPS'].nunique()}")
     print(f"Total records: {len(df):,}")
@@ -111,45 +279,38 @@ def main():
     
     # Define outbreak labels
     print("\nDefining outbreak labels...")
-    final_df = define_outbreak_labels(final_df, method='statistical', threshold=1.0)
+    final_df = define_outbreak_labels(final_df, method='statistical', threshold=OUTBREAK_THRESHOLD)
     
     outbreak_rate = final_df['Outbreak'].mean()
     print(f"Outbreak rate: {outbreak_rate*100:.1f}%")
     print(f"Outbreaks: {final_df['Outbreak'].sum():,}")
     print(f"Non-outbreaks: {(final_df['Outbreak'] == 0).sum():,}")
     
-    print("\nCreating lag features (1, 2, 3 years...)")
-    final_df = final_df.sort_values(['FIPS', 'Year'])
-    
-    for lag in [1, 2, 3]:
-        final_df[f'Cases_lag_{lag}'] = final_df.groupby('FIPS')['Cases'].shift(lag)
+    # Running per-(indicator, county) statistics for later --append runs
+    state = CountyRunningStats.from_history(final_df, LAG_STEPS, OUTBREAK_THRESHOLD)
+    state.save(args.state)
+    print(f"Saved incremental state for {len(state):,} indicator/county series to: {args.state}")
     
-    # Drop rows with NaN lag features
-    final_df = final_df.dropna(subset=['Cases_lag_1', 'Cases_lag_2', 'Cases_lag_3'])
+    print("\nCreating lag features (1, 2, 3 years...)")
+    final_df = add_lag_features(final_df)
     print(f"After adding lag features: {len(final_df):,} records")
     print(f"Year range: {final_df['Year'].min()}-{final_df['Year'].max()}")
     
-    # NOW split into train/test by year
+    # NOW split into train/test by year, one partition per indicator
     # We need at least 3 consecutive years per county for sequences
     # Use 2003-2019 for training (17 years), 2020-2023 for testing (4 years)
-    train_df = final_df[final_df['Year'] <= 2019].copy()
-    test_df = final_df[final_df['Year'] >= 2020].copy()
-    
-    print(f"\nTrain set: {len(train_df):,} records ({train_df['Year'].min()}-{train_df['Year'].max()})")
-    print(f"  Counties: {train_df['FIPS'].nunique()}")
-    print(f"  Outbreak rate: {train_df['Outbreak'].mean()*100:.1f}%")
-    print(f"Test set: {len(test_df):,} records ({test_df['Year'].min()}-{test_df['Year'].max()})")
-    print(f"  Counties: {test_df['FIPS'].nunique()}")
-    print(f"  Outbreak rate: {test_df['Outbreak'].mean()*100:.1f}%")
-    
-    train_file = 'data/atlasplus_all_us_train.csv'
-    test_file = 'data/atlasplus_all_us_test.csv'
-    
-    train_df.to_csv(train_file, index=False)
-    test_df.to_csv(test_file, index=False)
-    
-    print(f"\nSaved training data to: {train_file}")
-    print(f"Saved test data to: {test_file}")
+    for summary in write_outputs(final_df):
+        train_df, test_df = summary['train'], summary['test']
+        print(f"\n{summary['indicator']} -> {summary['partition']}")
+        print(f"  Train set: {len(train_df):,} records ({train_df['Year'].min()}-{train_df['Year'].max()})")
+        print(f"    Counties: {train_df['FIPS'].nunique()}")
+        print(f"    Outbreak rate: {train_df['Outbreak'].mean()*100:.1f}%")
+        print(f"  Test set: {len(test_df):,} records ({test_df['Year'].min()}-{test_df['Year'].max()})")
+        print(f"    Counties: {test_df['FIPS'].nunique()}")
+        print(f"    Outbreak rate: {test_df['Outbreak'].mean()*100:.1f}%")
+    
+    print(f"\nSaved {LEGACY_INDICATOR} training data to: {TRAIN_FILE}")
+    print(f"Saved {LEGACY_INDICATOR} test data to: {TEST_FILE}")
     
     # Show feature columns
     feature_cols = [col for col in final_df.columns if col not in 
@@ -170,4 +331,4 @@ def main():
     print("=" * 80)
 
 if __name__ == '__main__':
-    main()
+    main(parse_args())
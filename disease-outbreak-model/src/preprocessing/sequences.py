@@ -0,0 +1,91 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Identifier / label columns that are never fed to the model
+NON_FEATURE_COLS = ['Year', 'State', 'FIPS', 'County', 'Disease', 'Sex',
+                    'Outbreak', 'NAME', 'state', 'county']
+
+
+def get_feature_cols(df):
+    return [col for col in df.columns if col not in NON_FEATURE_COLS]
+
+
+def create_sequences(data, seq_length, feature_cols=None):
+    # Sliding windows of seq_length consecutive years per county, labelled
+    # with the outbreak flag of the window's last year.
+    #
+    # The frame is sorted once and turned into a single feature matrix; every
+    # window is a strided view into it (sliding_window_view), and windows that
+    # would straddle two counties are dropped with a vectorized group-id
+    # comparison. The only copy is the final gather of the valid windows.
+    #
+    # Returns (sequences, labels, county_ids, years), all aligned on axis 0.
+    if feature_cols is None:
+        feature_cols = get_feature_cols(data)
+
+    data = data.sort_values(['FIPS', 'Year'], kind='stable')
+    features = data[feature_cols].to_numpy(dtype=np.float32)
+    outbreak_labels = data['Outbreak'].to_numpy()
+    fips = data['FIPS'].to_numpy()
+    year_values = data['Year'].to_numpy()
+
+    n_rows = len(data)
+    if n_rows < seq_length:
+        empty = np.empty((0, seq_length, len(feature_cols)), dtype=np.float32)
+        return empty, outbreak_labels[:0], fips[:0], year_values[:0]
+
+    # Group id per row: increments wherever the county changes
+    group_ids = np.zeros(n_rows, dtype=np.int64)
+    group_ids[1:] = np.cumsum(fips[1:] != fips[:-1])
+
+    # A window starting at row i is valid when its first and last rows
+    # belong to the same county (rows are contiguous per county)
+    starts = np.flatnonzero(group_ids[:n_rows - seq_length + 1] == group_ids[seq_length - 1:])
+    ends = starts + seq_length - 1
+
+    # (n_windows, n_features, seq_length) view -> (n_windows, seq_length, n_features)
+    windows = sliding_window_view(features, seq_length, axis=0).transpose(0, 2, 1)
+
+    return windows[starts], outbreak_labels[ends], fips[ends], year_values[ends]
+
+
+def create_county_sequences(data, feature_cols=None):
+    # One full-history sequence per county, zero-padded to the longest one,
+    # for training with pack_padded_sequence instead of overlapping windows.
+    # Every row of the frame appears exactly once.
+    #
+    # Returns (sequences (n_counties, max_len, n_features) float32,
+    #          labels (n_counties, max_len) float32,
+    #          years (n_counties, max_len) int64, -1 where padded,
+    #          lengths (n_counties,) int64, county_ids (n_counties,)).
+    if feature_cols is None:
+        feature_cols = get_feature_cols(data)
+
+    data = data.sort_values(['FIPS', 'Year'], kind='stable')
+    features = data[feature_cols].to_numpy(dtype=np.float32)
+    outbreak_labels = data['Outbreak'].to_numpy(dtype=np.float32)
+    fips = data['FIPS'].to_numpy()
+    year_values = data['Year'].to_numpy(dtype=np.int64)
+
+    n_rows = len(data)
+    if n_rows == 0:
+        return (np.empty((0, 0, len(feature_cols)), dtype=np.float32), np.empty((0, 0), dtype=np.float32),
+                np.empty((0, 0), dtype=np.int64), np.empty(0, dtype=np.int64), fips[:0])
+
+    # Rows are contiguous per county: scatter each row to (county, position)
+    is_start = np.ones(n_rows, dtype=bool)
+    is_start[1:] = fips[1:] != fips[:-1]
+    starts = np.flatnonzero(is_start)
+    county = np.cumsum(is_start) - 1
+    position = np.arange(n_rows) - starts[county]
+    lengths = np.diff(np.append(starts, n_rows))
+
+    n_counties, max_len = len(starts), int(lengths.max())
+    sequences = np.zeros((n_counties, max_len, len(feature_cols)), dtype=np.float32)
+    labels = np.zeros((n_counties, max_len), dtype=np.float32)
+    years = np.full((n_counties, max_len), -1, dtype=np.int64)
+    sequences[county, position] = features
+    labels[county, position] = outbreak_labels
+    years[county, position] = year_values
+
+    return sequences, labels, years, lengths.astype(np.int64), fips[starts]
@@ -0,0 +1,123 @@
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import argparse
+import sys
+import time
+
+sys.path.append(str(Path(__file__).parent / 'src'))
+from models.streaming import StreamingOutbreakPredictor
+from preprocessing.sequences import create_county_sequences
+from preprocessing.process_atlasplus_for_lstm import (
+    LEGACY_INDICATOR, TRAIN_FILE, TEST_FILE, indicator_slug, partition_paths,
+)
+
+# Year-by-year outbreak probabilities without re-running county histories.
+#
+#   prime    runs every county's history through the LSTM once and saves
+#            the final (h, c) per county next to the model
+#   advance  takes one or more new years of observations, steps each county
+#            from its saved state one year at a time, writes the
+#            probabilities and saves the updated states
+#
+# The saved states are keyed on the artifact (weights, scaler, features), so
+# retraining or swapping the model never reuses states from the old one.
+# A county's state summarizes its whole history, which is what --packed
+# training optimizes; a windowed model only ever saw seq_length years at a
+# time, so its streamed scores drift from the ones evaluation reports.
+
+def read_observations(paths, feature_cols):
+    df = pd.concat([pd.read_csv(path, dtype={'FIPS': str}) for path in paths], ignore_index=True)
+    missing = [col for col in ['FIPS', 'Year', *feature_cols] if col not in df]
+    if missing:
+        raise SystemExit(f"Missing columns: {missing}")
+    return df.drop_duplicates(['FIPS', 'Year'], keep='last')
+
+def prime(predictor, args):
+    history = read_observations(args.history, predictor.feature_cols)
+    if args.through_year is not None:
+        history = history[history['Year'] <= args.through_year]
+
+    history[predictor.feature_cols] = predictor.scale(history[predictor.feature_cols])
+    sequences, _, years, lengths, counties = create_county_sequences(
+        history.assign(Outbreak=0), predictor.feature_cols
+    )
+    last_years = years[np.arange(len(lengths)), lengths - 1]
+
+    start = time.perf_counter()
+    predictor.prime(counties, sequences, lengths, last_years)
+    print(f"Primed {len(counties):,} counties ({int(years[years >= 0].min())}-{int(last_years.max())}, "
+          f"{int(lengths.sum()):,} county-years) in {time.perf_counter() - start:.2f}s")
+
+def advance(predictor, args):
+    observations = read_observations(args.observations, predictor.feature_cols)
+    scaled = predictor.scale(observations[predictor.feature_cols])
+
+    # One call per year: a county is stepped once per call, oldest year first
+    results = []
+    start = time.perf_counter()
+    for year in sorted(observations['Year'].unique()):
+        rows = np.flatnonzero(observations['Year'].to_numpy() == year)
+        fips = observations['FIPS'].to_numpy()[rows]
+        new = np.array([f not in predictor.store for f in fips])
+        probs = predictor.advance(fips, scaled[rows], np.full(len(rows), year))
+        results.append(pd.DataFrame({'FIPS': fips, 'Year': year, 'outbreak_probability': probs,
+                                     'new_county': new}))
+        print(f"  {year}: {len(rows):,} counties ({new.sum()} without a stored state)")
+    print(f"Advanced in {time.perf_counter() - start:.2f}s")
+
+    results = pd.concat(results, ignore_index=True)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(args.output, index=False, float_format='%.6g')
+    print(f"Predictions saved to: {args.output}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Streaming outbreak predictions from saved county LSTM states')
+    parser.add_argument('--indicator', help='use one indicator partition and its model; '
+                                            'default is the original Chlamydia files')
+    parser.add_argument('--model', help='model artifact (default: models/best_us_lstm_classifier[_<indicator>].pt)')
+    parser.add_argument('--states', help='county state file (default: the model path with _states.npz)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    primer = sub.add_parser('prime', help='run full county histories and save their states')
+    primer.add_argument('--history', nargs='+', help='history CSVs (default: the train and test files)')
+    primer.add_argument('--through-year', type=int, help='ignore history after this year')
+
+    stepper = sub.add_parser('advance', help='step saved states through new years of observations')
+    stepper.add_argument('observations', nargs='+', help='CSVs with FIPS, Year and the model features')
+    stepper.add_argument('--output', default='predictions/streaming_predictions.csv')
+    return parser.parse_args()
+
+def main(args):
+    if args.indicator:
+        default_files = list(partition_paths(args.indicator))
+        suffix = f'_{indicator_slug(args.indicator)}'
+    else:
+        default_files = [TRAIN_FILE, TEST_FILE]
+        suffix = ''
+    model_path = Path(args.model or f'models/best_us_lstm_classifier{suffix}.pt')
+    state_path = Path(args.states or model_path.with_name(f'{model_path.stem}_states.npz'))
+
+    print("=" * 80)
+    print(f"Streaming US {args.indicator or LEGACY_INDICATOR} Outbreak Predictions")
+    print("=" * 80)
+
+    if args.command == 'prime':
+        # Priming replaces every state, so nothing is read from state_path
+        predictor = StreamingOutbreakPredictor.from_artifact(model_path)
+        args.history = args.history or default_files
+        prime(predictor, args)
+    else:
+        predictor = StreamingOutbreakPredictor.from_artifact(model_path, state_path)
+        if len(predictor.store) == 0:
+            print(f"No states for this model in {state_path}; every county starts from scratch "
+                  f"(run `prime` first)")
+        else:
+            print(f"Loaded {len(predictor.store):,} county states from {state_path}")
+        advance(predictor, args)
+
+    predictor.store.save(state_path)
+    print(f"County states saved to: {state_path} (model version {predictor.store.model_version})")
+
+if __name__ == '__main__':
+    main(parse_args())
@@ -0,0 +1,242 @@
+
+import pandas as pd
+import numpy as np
+import torch
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+from pathlib import Path
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(str(Path(__file__).parent / 'src'))
+from models.Disease_Predictor import OutbreakLSTMClassifier
+from preprocessing.dataset_cache import DatasetCache, DEFAULT_CACHE_DIR
+from preprocessing.process_atlasplus_for_lstm import TRAIN_FILE
+from train_us_lstm_classifier import (
+    OutbreakDataset, TensorBatchLoader, load_training_arrays, train_model,
+)
+
+# Each entry is either a list of choices or a {"low", "high", "log"} range.
+# --space takes a JSON file in the same format.
+SEARCH_SPACE = {
+    'hidden_dim': [32, 64, 128],
+    'num_layers': [1, 2, 3],
+    'dropout': [0.1, 0.2, 0.3, 0.5],
+    'learning_rate': {'low': 1e-4, 'high': 3e-3, 'log': True},
+    'batch_size': [64, 256, 512],
+}
+
+SEQ_LENGTH = 3
+VAL_SPLIT_YEAR = 2016
+# Trials are ranked by their best validation AUC, so that epoch is saved
+CHECKPOINT_METRIC = 'val_auc'
+
+def sample_params(space, rng):
+    
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, dict):
+            low, high = spec['low'], spec['high']
+            if spec.get('log'):
+                value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                value = float(rng.uniform(low, high))
+            params[name] = int(round(value)) if spec.get('int') else value
+        else:
+            params[name] = spec[rng.integers(len(spec))]
+            if isinstance(params[name], np.generic):
+                params[name] = params[name].item()
+    return params
+
+class MedianPruner:
+    # Stops a trial when its best validation AUC so far is below the median
+    # of the other trials' best AUC at the same epoch. Histories live in a
+    # Manager dict so every worker process sees every trial's progress.
+    
+    def __init__(self, history, warmup_epochs=5, min_trials=3):
+        self.history = history
+        self.warmup_epochs = warmup_epochs
+        self.min_trials = min_trials
+    
+    def report(self, trial_id, epoch, best_auc):
+        # Records the trial's best AUC after `epoch`; returns True to prune
+        curve = list(self.history.get(trial_id, []))
+        curve.append(best_auc)
+        self.history[trial_id] = curve
+        
+        if epoch + 1 < self.warmup_epochs:
+            return False
+        others = [
+            other[epoch] for other_id, other in self.history.items()
+            if other_id != trial_id and len(other) > epoch
+        ]
+        if len(others) < self.min_trials:
+            return False
+        return best_auc < float(np.median(others))
+
+# Per-process state, set by the pool initializer
+_PRUNER = None
+_DATA = None
+
+def _init_worker(threads, history, warmup_epochs, min_trials):
+    
+    global _PRUNER
+    # Each worker gets its own slice of the cores instead of every trial
+    # spinning up one intra-op thread per core
+    torch.set_num_threads(threads)
+    _PRUNER = MedianPruner(history, warmup_epochs, min_trials)
+
+def _load_data(train_file, cache_dir):
+    
+    # Memory-mapped from the dataset cache the parent populated, so every
+    # worker shares the same page-cache copy of the arrays
+    global _DATA
+    if _DATA is None:
+        cache = DatasetCache(cache_dir)
+        _DATA, _, _ = load_training_arrays(train_file, SEQ_LENGTH, VAL_SPLIT_YEAR, cache)
+    return _DATA
+
+def run_trial(trial_id, params, settings):
+    
+    started = time.perf_counter()
+    data = _load_data(settings['train_file'], settings['cache_dir'])
+    torch.manual_seed(settings['seed'] + trial_id)
+    
+    train_dataset = OutbreakDataset(data['train_seq'], data['train_labels'])
+    val_dataset = OutbreakDataset(data['val_seq'], data['val_labels'])
+    train_loader = TensorBatchLoader(train_dataset, params['batch_size'], shuffle=True)
+    val_loader = TensorBatchLoader(val_dataset, params['batch_size'])
+    
+    model = OutbreakLSTMClassifier(
+        input_dim=data['train_seq'].shape[2],
+        hidden_dim=params['hidden_dim'],
+        num_layers=params['num_layers'],
+        dropout=params['dropout']
+    )
+    train_labels = data['train_labels']
+    pos_weight = (train_labels == 0).sum() / (train_labels == 1).sum()
+    
+    progress = {'best_auc': 0.0, 'best_epoch': -1, 'best_val_loss': float('inf'), 'epochs': 0, 'pruned': False}
+    
+    def on_epoch(epoch, train_loss, val_loss, val_auc):
+        progress['epochs'] = epoch + 1
+        progress['best_val_loss'] = min(progress['best_val_loss'], val_loss)
+        if val_auc > progress['best_auc']:
+            progress['best_auc'], progress['best_epoch'] = val_auc, epoch + 1
+        stop = _PRUNER.report(trial_id, epoch, progress['best_auc'])
+        # A stop on the last epoch cuts nothing short
+        progress['pruned'] = stop and epoch + 1 < settings['epochs']
+        return stop
+    
+    # Saved at the best-AUC epoch, so the checkpoint is the model the
+    # leaderboard ranks (best_val_auc / best_epoch)
+    checkpoint_path = Path(settings['output_dir']) / f'trial_{trial_id:03d}.pth'
+    train_model(
+        model, train_loader, val_loader, settings['epochs'], params['learning_rate'],
+        torch.device('cpu'), pos_weight, str(checkpoint_path),
+        log_every=settings['epochs'] + 1, epoch_callback=on_epoch, checkpoint_metric=CHECKPOINT_METRIC
+    )
+    
+    return {
+        'trial': trial_id,
+        **params,
+        'best_val_auc': round(progress['best_auc'], 4),
+        'best_epoch': progress['best_epoch'],
+        'best_val_loss': round(progress['best_val_loss'], 4),
+        'epochs_run': progress['epochs'],
+        'pruned': progress['pruned'],
+        'seconds': round(time.perf_counter() - started, 1),
+        'checkpoint': str(checkpoint_path),
+    }
+
+def write_leaderboard(records, path):
+    
+    leaderboard = pd.DataFrame(records).sort_values('best_val_auc', ascending=False)
+    leaderboard.to_csv(path, index=False)
+    return leaderboard
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Parallel hyperparameter sweep for the US outbreak LSTM classifier')
+    parser.add_argument('--train-file', default=TRAIN_FILE)
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument('--space', help='JSON search space (default: SEARCH_SPACE in this file)')
+    parser.add_argument('--trials', type=int, default=24)
+    parser.add_argument('--epochs', type=int, default=30, help='max epochs per trial')
+    parser.add_argument('--jobs', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help='trials run in parallel')
+    parser.add_argument('--threads-per-job', type=int,
+                        help='torch threads per trial (default: cores / jobs)')
+    parser.add_argument('--warmup-epochs', type=int, default=5, help='epochs before a trial can be pruned')
+    parser.add_argument('--min-trials', type=int, default=3,
+                        help='trials that must have reached an epoch before pruning against them')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', default='sweeps')
+    return parser.parse_args()
+
+def main(args):
+    print("=" * 80)
+    print("Hyperparameter Sweep: US Outbreak LSTM Classifier")
+    print("=" * 80)
+    
+    space = json.loads(Path(args.space).read_text()) if args.space else SEARCH_SPACE
+    rng = np.random.default_rng(args.seed)
+    trials = [sample_params(space, rng) for _ in range(args.trials)]
+    
+    threads = args.threads_per_job or max(1, (os.cpu_count() or 1) // args.jobs)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    leaderboard_path = output_dir / 'leaderboard.csv'
+    
+    # Build (or validate) the cached arrays once, before any worker starts
+    print("\nPreparing shared training data...")
+    _, meta, cache_hit = load_training_arrays(args.train_file, SEQ_LENGTH, VAL_SPLIT_YEAR, DatasetCache(args.cache_dir))
+    print(f"Training records: {meta['all']['records']:,} ({'cached' if cache_hit else 'built and cached'})")
+    
+    print(f"\nSearch space: {json.dumps(space)}")
+    print(f"Trials: {args.trials}, max epochs: {args.epochs}, jobs: {args.jobs} x {threads} threads")
+    print(f"Median pruning after {args.warmup_epochs} epochs (needs {args.min_trials} trials to compare)")
+    
+    settings = {
+        'train_file': str(args.train_file), 'cache_dir': str(args.cache_dir),
+        'epochs': args.epochs, 'seed': args.seed, 'output_dir': str(output_dir),
+    }
+    
+    ctx = mp.get_context('spawn')
+    records = []
+    started = time.perf_counter()
+    with ctx.Manager() as manager:
+        history = manager.dict()
+        with ProcessPoolExecutor(
+            max_workers=args.jobs, mp_context=ctx, initializer=_init_worker,
+            initargs=(threads, history, args.warmup_epochs, args.min_trials),
+        ) as pool:
+            futures = {pool.submit(run_trial, i, params, settings): i for i, params in enumerate(trials)}
+            for future in as_completed(futures):
+                record = future.result()
+                records.append(record)
+                write_leaderboard(records, leaderboard_path)
+                status = f"pruned at epoch {record['epochs_run']}" if record['pruned'] else f"{record['epochs_run']} epochs"
+                print(f"  Trial {record['trial']:>3}: AUC={record['best_val_auc']:.4f} ({status}, {record['seconds']:.0f}s) "
+                      f"{ {k: record[k] for k in trials[record['trial']]} }")
+    
+    leaderboard = write_leaderboard(records, leaderboard_path)
+    best = leaderboard.iloc[0]
+    pruned = int(leaderboard['pruned'].sum())
+    
+    print("\n" + "=" * 80)
+    print(f"Sweep complete in {time.perf_counter() - started:.0f}s ({pruned}/{len(leaderboard)} trials pruned)")
+    print("=" * 80)
+    print(leaderboard.head(10).drop(columns=['checkpoint']).to_string(index=False))
+    print(f"\nLeaderboard saved to: {leaderboard_path}")
+    print(f"Best checkpoint: {best['checkpoint']} (epoch {best['best_epoch']}, AUC={best['best_val_auc']:.4f})")
+    print("\nReproduce the best trial with:")
+    print(f"  python train_us_lstm_classifier.py --tensor-batches --lr-scaling none "
+          f"--hidden-dim {best['hidden_dim']} --num-layers {best['num_layers']} --dropout {best['dropout']} "
+          f"--lr {best['learning_rate']:.6g} --batch-size {best['batch_size']} --epochs {args.epochs} "
+          f"--seed {args.seed + int(best['trial'])} --checkpoint-metric {CHECKPOINT_METRIC}")
+
+if __name__ == '__main__':
+    main(parse_args())
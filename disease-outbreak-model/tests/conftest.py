@@ -0,0 +1,12 @@
+"""
+Shared test setup for the model code: src/ on the path, as the training and
+evaluation scripts put it.
+
+Run from disease-outbreak-model/:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,124 @@
+"""Streaming county states: prime + advance against the full-history forward."""
+
+import numpy as np
+import pytest
+import torch
+
+from models.Disease_Predictor import OutbreakLSTMClassifier
+from models.artifact import save_artifact
+from models.streaming import CountyStateStore, StreamingOutbreakPredictor, artifact_version
+
+INPUT_DIM = 4
+FEATURES = ["Cases", "Cases_lag_1", "Cases_lag_2", "Cases_lag_3"]
+CONFIG = {"input_dim": INPUT_DIM, "hidden_dim": 8, "num_layers": 2, "dropout": 0.3,
+          "seq_length": 3, "training": "packed"}
+
+
+def make_model(seed: int = 0) -> OutbreakLSTMClassifier:
+    torch.manual_seed(seed)
+    model = OutbreakLSTMClassifier(**{k: CONFIG[k] for k in ("input_dim", "hidden_dim", "num_layers", "dropout")})
+    return model.eval()
+
+
+def make_histories(lengths, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    sequences = np.zeros((len(lengths), max(lengths), INPUT_DIM), dtype=np.float32)
+    for i, length in enumerate(lengths):
+        sequences[i, :length] = rng.normal(size=(length, INPUT_DIM))
+    return sequences, np.asarray(lengths)
+
+
+def full_history_probs(model, sequences, lengths):
+    with torch.no_grad():
+        logits = model.forward_sequence(torch.from_numpy(sequences), torch.as_tensor(lengths))
+    return torch.sigmoid(logits).numpy()
+
+
+def make_predictor(model):
+    store = CountyStateStore(CONFIG["num_layers"], CONFIG["hidden_dim"], "test")
+    return StreamingOutbreakPredictor(model, store)
+
+
+def write_artifact(path, model, scaler_mean=None):
+    mean = np.zeros(INPUT_DIM) if scaler_mean is None else scaler_mean
+    return save_artifact(path, model, feature_cols=FEATURES, scaler_mean=mean,
+                         scaler_scale=np.ones(INPUT_DIM), config=CONFIG, disease="Chlamydia")
+
+
+def test_prime_then_advance_matches_forward_sequence():
+    model = make_model()
+    fips = ["01001", "01003", "01005"]
+    sequences, lengths = make_histories([6, 4, 5])
+    expected = full_history_probs(model, sequences, lengths)
+
+    # Prime on the first two years, then stream every later year one call at
+    # a time; counties whose history ended sit those calls out
+    predictor = make_predictor(model)
+    predictor.prime(fips, sequences[:, :2], np.full(3, 2), np.full(3, 2001))
+    for t in range(2, lengths.max()):
+        active = np.flatnonzero(lengths > t)
+        probs = predictor.advance([fips[i] for i in active], sequences[active, t], np.full(len(active), 2000 + t))
+        np.testing.assert_allclose(probs, expected[active, t], rtol=1e-5, atol=1e-6)
+
+
+def test_advance_from_empty_store_matches_forward_sequence():
+    model = make_model()
+    sequences, lengths = make_histories([3, 3])
+    expected = full_history_probs(model, sequences, lengths)
+
+    predictor = make_predictor(model)
+    for t in range(3):
+        probs = predictor.advance(["01001", "01003"], sequences[:, t], [2000 + t] * 2)
+    np.testing.assert_allclose(probs, expected[:, 2], rtol=1e-5, atol=1e-6)
+
+
+def test_advance_rejects_duplicate_and_stale_years_without_touching_the_store():
+    predictor = make_predictor(make_model())
+    sequences, lengths = make_histories([3])
+    predictor.prime(["01001"], sequences, lengths, [2002])
+    h_before = predictor.store.h.copy()
+
+    with pytest.raises(ValueError, match="more than once"):
+        predictor.advance(["01003", "01003"], np.zeros((2, INPUT_DIM)), [2003, 2004])
+    with pytest.raises(ValueError, match="not newer"):
+        predictor.advance(["01005", "01001"], np.zeros((2, INPUT_DIM)), [2003, 2002])
+
+    assert len(predictor.store) == 1
+    np.testing.assert_array_equal(predictor.store.h, h_before)
+
+
+def test_artifact_version_tracks_weights_and_scaler(tmp_path):
+    from models.artifact import load_artifact
+
+    def version(path):
+        return artifact_version(load_artifact(path, mmap=False)[0])
+
+    base = version(write_artifact(tmp_path / "a.pt", make_model(0)))
+    assert version(write_artifact(tmp_path / "b.pt", make_model(0))) == base
+    assert version(write_artifact(tmp_path / "c.pt", make_model(1))) != base
+    assert version(write_artifact(tmp_path / "d.pt", make_model(0), np.ones(INPUT_DIM))) != base
+
+
+def test_saved_states_are_reused_only_by_the_same_artifact(tmp_path):
+    model_path = write_artifact(tmp_path / "model.pt", make_model())
+    state_path = tmp_path / "states.npz"
+    sequences, lengths = make_histories([4, 2])
+
+    predictor = StreamingOutbreakPredictor.from_artifact(model_path)
+    predictor.prime(["01001", "01003"], sequences, lengths, [2003, 2001])
+    predictor.store.save(state_path)
+
+    reloaded = StreamingOutbreakPredictor.from_artifact(model_path, state_path)
+    assert len(reloaded.store) == 2
+    np.testing.assert_array_equal(reloaded.store.h[:2], predictor.store.h[:2])
+    assert reloaded.store.last_year[:2].tolist() == [2003, 2001]
+
+    # Retrained weights: the old states are discarded
+    write_artifact(model_path, make_model(seed=1))
+    assert len(StreamingOutbreakPredictor.from_artifact(model_path, state_path).store) == 0
+
+
+def test_scale_applies_the_artifact_scaler(tmp_path):
+    model_path = write_artifact(tmp_path / "model.pt", make_model(), np.full(INPUT_DIM, 2.0))
+    predictor = StreamingOutbreakPredictor.from_artifact(model_path)
+    np.testing.assert_allclose(predictor.scale(np.full((1, INPUT_DIM), 5.0)), np.full((1, INPUT_DIM), 3.0))
@@ -8,129 +8,276 @@ from sklearn.metrics import classification_report, roc_auc_score, confusion_matr
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
+import argparse
+import contextlib
+import json
+import math
 import sys
+import time
 
 sys.path.append(str(Path(__file__).parent / 'src'))
 from models.Disease_Predictor import OutbreakLSTMClassifier
-
-def create_sequences(data, seq_length):
-    sequences = []
-    labels = []
-    county_ids = []
-    
-    for fips, group in data.groupby('FIPS'):
-        group = group.sort_values('Year')
-        
-        if len(group) < seq_length:
-            continue
-        
-        feature_cols = [col for col in group.columns if col not in 
-                       ['Year', 'State', 'FIPS', 'County', 'Disease', 'Sex', 
-                        'Outbreak', 'NAME', 'state', 'county']]
-        
-        features = group[feature_cols].values
-        outbreak_labels = group['Outbreak'].values
-        
-        for i in range(len(group) - seq_length + 1):
-            seq = features[i:i + seq_length]
-            label = outbreak_labels[i + seq_length - 1]
-            
-            sequences.append(seq)
-            labels.append(label)
-            county_ids.append(fips)
-    
-    return np.array(sequences), np.array(labels), np.array(county_ids)
+from models.artifact import save_artifact
+from preprocessing.sequences import create_sequences, create_county_sequences, get_feature_cols
+from preprocessing.dataset_cache import DatasetCache, DEFAULT_CACHE_DIR
+from preprocessing.process_atlasplus_for_lstm import (
+    LAG_STEPS, OUTBREAK_THRESHOLD, LEGACY_INDICATOR, TRAIN_FILE, indicator_slug, partition_paths,
+)
 
 class OutbreakDataset(Dataset):
     def __init__(self, sequences, labels):
-        self.sequences = torch.FloatTensor(sequences)
-        self.labels = torch.FloatTensor(labels)
+        # as_tensor shares memory with float32 (e.g. memory-mapped) arrays
+        self.sequences = torch.as_tensor(sequences, dtype=torch.float32)
+        self.labels = torch.as_tensor(labels, dtype=torch.float32)
     
     def __len__(self):
         return len(self.sequences)
     
     def __getitem__(self, idx):
         return self.sequences[idx], self.labels[idx]
+    
+    @property
+    def tensors(self):
+        return self.sequences, self.labels
 
-def train_model(model, train_loader, val_loader, num_epochs, learning_rate, device, pos_weight):
+class CountySequenceDataset(Dataset):
+    # One padded full-history sequence per county (see --packed). mask marks
+    # the timesteps that are supervised; everything else is ignored.
+    def __init__(self, sequences, labels, lengths, mask):
+        self.sequences = torch.as_tensor(sequences, dtype=torch.float32)
+        self.labels = torch.as_tensor(labels, dtype=torch.float32)
+        self.lengths = torch.as_tensor(lengths, dtype=torch.int64)
+        self.mask = torch.as_tensor(mask, dtype=torch.bool)
+    
+    def __len__(self):
+        return len(self.sequences)
+    
+    def __getitem__(self, idx):
+        return self.sequences[idx], self.labels[idx], self.lengths[idx], self.mask[idx]
+    
+    @property
+    def tensors(self):
+        return self.sequences, self.labels, self.lengths, self.mask
+
+class TensorBatchLoader:
+    # Drop-in for DataLoader over an OutbreakDataset / CountySequenceDataset
+    # that slices whole batches out of the backing tensors (one index_select
+    # per batch) instead of calling __getitem__ per sample and collating.
+    
+    def __init__(self, dataset, batch_size, shuffle=False, generator=None):
+        self.tensors = dataset.tensors
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.generator = generator
+    
+    def __len__(self):
+        return math.ceil(len(self.tensors[0]) / self.batch_size)
+    
+    def __iter__(self):
+        n = len(self.tensors[0])
+        if self.shuffle:
+            order = torch.randperm(n, generator=self.generator)
+            for start in range(0, n, self.batch_size):
+                idx = order[start:start + self.batch_size]
+                yield tuple(t.index_select(0, idx) for t in self.tensors)
+        else:
+            for start in range(0, n, self.batch_size):
+                yield tuple(t[start:start + self.batch_size] for t in self.tensors)
+
+def window_outputs(net, batch, device):
+    # (logits, labels) for a batch of fixed-length windows
+    sequences, labels = batch
+    return net(sequences.to(device)).squeeze(-1), labels.to(device)
+
+def packed_outputs(net, batch, device):
+    # (logits, labels) for the supervised timesteps of a batch of padded
+    # county histories
+    sequences, labels, lengths, mask = batch
+    logits = net.forward_sequence(sequences.to(device), lengths)
+    mask = mask.to(device)
+    return logits[mask], labels.to(device)[mask]
+
+def scaled_learning_rate(base_lr, batch_size, base_batch_size=64, rule='sqrt'):
+    # Larger batches take fewer optimizer steps per epoch; scale the LR up
+    # to compensate (linear: Goyal et al.; sqrt: gentler, better for Adam)
+    ratio = batch_size / base_batch_size
+    if rule == 'linear':
+        return base_lr * ratio
+    if rule == 'sqrt':
+        return base_lr * math.sqrt(ratio)
+    return base_lr
+
+def compile_model(model, example):
+    # torch.compile where this build/platform supports it; falls back to
+    # eager if compilation fails on a warm-up batch. The compiled module
+    # shares parameters with model, so model.state_dict() stays the one to
+    # save.
+    if not hasattr(torch, 'compile'):
+        print("torch.compile not available; training eagerly")
+        return model
+    try:
+        compiled = torch.compile(model, dynamic=True)
+        with torch.no_grad():
+            compiled(example)
+        return compiled
+    except Exception as e:
+        print(f"torch.compile failed ({type(e).__name__}: {e}); training eagerly")
+        return model
+
+def profile_trace_handler(output_dir, name):
+    # on_trace_ready for torch.profiler: a Chrome trace (chrome://tracing or
+    # ui.perfetto.dev) plus the per-op summary table as text
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    def handler(prof):
+        trace_path = output_dir / f'{name}_trace.json'
+        table_path = output_dir / f'{name}_ops.txt'
+        prof.export_chrome_trace(str(trace_path))
+        sort_by = 'self_cuda_time_total' if torch.cuda.is_available() else 'self_cpu_time_total'
+        table_path.write_text(prof.key_averages().table(sort_by=sort_by, row_limit=40) + '\n')
+        print(f"Profiler trace saved to: {trace_path}")
+        print(f"Profiler op summary saved to: {table_path}")
+    return handler
+
+def train_model(model, train_loader, val_loader, num_epochs, learning_rate, device, pos_weight,
+                checkpoint_path='models/best_us_lstm_classifier.pth', amp_dtype=None, forward=None,
+                log_every=5, batch_outputs=window_outputs, epoch_callback=None, profiler=None,
+                epoch_stats=None, checkpoint_metric='val_auc'):
+    # amp_dtype: e.g. torch.bfloat16 to autocast forward passes (CPU or
+    # CUDA); loss is always computed in fp32. forward: optional compiled
+    # wrapper of model used for the forward passes. batch_outputs turns a
+    # loader batch into (logits, labels): window_outputs or packed_outputs.
+    # epoch_callback(epoch, train_loss, val_loss, val_auc) runs after every
+    # epoch; returning True stops training early (e.g. a pruned sweep trial).
+    # profiler: an active torch.profiler.profile, stepped once per training
+    # step; the data / forward / backward / optimizer / sync phases are only
+    # labelled (record_function) while one is given. epoch_stats: optional
+    # list that gets one dict of timings and metrics per epoch.
+    # checkpoint_metric: 'val_auc' (highest) or 'val_loss' (lowest) picks the
+    # epoch whose weights are saved to checkpoint_path. AUC is the default:
+    # the validation years have a much higher outbreak rate than the
+    # training years, so the weighted loss plateaus while AUC still moves.
+    forward = model if forward is None else forward
+    no_label = contextlib.nullcontext()
+    if profiler is None:
+        section = lambda name: no_label
+    else:
+        section = torch.profiler.record_function
     criterion = nn.BCEWithLogitsLoss(pos_weight=torch.tensor([pos_weight]).to(device))
     optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
     scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='min', factor=0.5, patience=5)
     
+    def autocast():
+        if amp_dtype is None:
+            return contextlib.nullcontext()
+        return torch.autocast(device_type=device.type, dtype=amp_dtype)
+    
     train_losses = []
     val_losses = []
+    throughput = []
     best_val_loss = float('inf')
+    best_val_auc = float('-inf')
     
     for epoch in range(num_epochs):
         model.train()
-        train_loss = 0
-        for sequences, labels in train_loader:
-            sequences, labels = sequences.to(device), labels.to(device)
+        epoch_start = time.perf_counter()
+        n_samples = 0
+        # Summed on-device and read once per epoch: a per-step .item()
+        # forces a sync and stalls the next step
+        train_loss = torch.zeros((), device=device)
+        batches = iter(train_loader)
+        while True:
+            with section('data_loading'):
+                batch = next(batches, None)
+            if batch is None:
+                break
+            optimizer.zero_grad(set_to_none=True)
+            with section('forward'), autocast():
+                outputs, labels = batch_outputs(forward, batch, device)
+            with section('backward'):
+                loss = criterion(outputs.float(), labels)
+                loss.backward()
+            with section('optimizer_step'):
+                optimizer.step()
             
-            optimizer.zero_grad()
-            outputs = model(sequences).squeeze()
-            loss = criterion(outputs, labels)
-            loss.backward()
-            optimizer.step()
-            
-            train_loss += loss.item()
+            train_loss += loss.detach()
+            n_samples += len(labels)
+            if profiler is not None:
+                profiler.step()
         
-        train_loss /= len(train_loader)
+        with section('loss_sync'):
+            train_loss = train_loss.item() / len(train_loader)
+        train_seconds = time.perf_counter() - epoch_start
         train_losses.append(train_loss)
+        throughput.append(n_samples / train_seconds)
         
         model.eval()
-        val_loss = 0
+        val_loss = torch.zeros((), device=device)
         all_preds = []
         all_labels = []
         
-        with torch.no_grad():
-            for sequences, labels in val_loader:
-                sequences, labels = sequences.to(device), labels.to(device)
+        with torch.no_grad(), section('validation'):
+            for batch in val_loader:
+                with autocast():
+                    outputs, labels = batch_outputs(forward, batch, device)
+                outputs = outputs.float()
+                val_loss += criterion(outputs, labels)
                 
-                outputs = model(sequences).squeeze()
-                loss = criterion(outputs, labels)
-                val_loss += loss.item()
-                
-                probs = torch.sigmoid(outputs).cpu().numpy()
-                all_preds.extend(probs)
-                all_labels.extend(labels.cpu().numpy())
+                all_preds.append(torch.sigmoid(outputs))
+                all_labels.append(labels)
         
-        val_loss /= len(val_loader)
+        val_loss = val_loss.item() / len(val_loader)
         val_losses.append(val_loss)
         
         try:
-            val_auc = roc_auc_score(all_labels, all_preds)
+            val_auc = roc_auc_score(torch.cat(all_labels).cpu().numpy(), torch.cat(all_preds).cpu().numpy())
         except:
             val_auc = 0.0
         
         scheduler.step(val_loss)
+        epoch_seconds = time.perf_counter() - epoch_start
+        
+        if epoch_stats is not None:
+            epoch_stats.append({
+                'epoch': epoch + 1, 'wall_seconds': epoch_seconds, 'train_seconds': train_seconds,
+                'samples_per_second': throughput[-1], 'train_loss': train_loss,
+                'val_loss': val_loss, 'val_auc': val_auc,
+            })
         
-        if (epoch + 1) % 5 == 0:
-            print(f'Epoch [{epoch+1}/{num_epochs}], Train Loss: {train_loss:.4f}, Val Loss: {val_loss:.4f}, Val AUC: {val_auc:.4f}')
+        if (epoch + 1) % log_every == 0:
+            print(f'Epoch [{epoch+1}/{num_epochs}], Train Loss: {train_loss:.4f}, Val Loss: {val_loss:.4f}, '
+                  f'Val AUC: {val_auc:.4f}, {throughput[-1]:,.0f} samples/s, {epoch_seconds:.2f}s')
         
-        if val_loss < best_val_loss:
-            best_val_loss = val_loss
-            torch.save(model.state_dict(), 'models/best_us_lstm_classifier.pth')
+        if checkpoint_metric == 'val_auc':
+            improved = val_auc > best_val_auc
+        else:
+            improved = val_loss < best_val_loss
+        best_val_loss = min(best_val_loss, val_loss)
+        best_val_auc = max(best_val_auc, val_auc)
+        if improved:
+            torch.save(model.state_dict(), checkpoint_path)
+        
+        if epoch_callback is not None and epoch_callback(epoch, train_loss, val_loss, val_auc):
+            break
     
-    return train_losses, val_losses
+    return train_losses, val_losses, throughput
 
-def evaluate_model(model, test_loader, device):
+def evaluate_model(model, test_loader, device, batch_outputs=window_outputs):
     model.eval()
     all_preds = []
     all_probs = []
     all_labels = []
     
     with torch.no_grad():
-        for sequences, labels in test_loader:
-            sequences = sequences.to(device)
-            
-            outputs = model(sequences).squeeze()
+        for batch in test_loader:
+            outputs, labels = batch_outputs(model, batch, device)
             probs = torch.sigmoid(outputs).cpu().numpy()
             preds = (probs > 0.5).astype(int)
             
             all_preds.extend(preds)
             all_probs.extend(probs)
-            all_labels.extend(labels.numpy())
+            all_labels.extend(labels.cpu().numpy())
     
     auc = roc_auc_score(all_labels, all_probs)
     cm = confusion_matrix(all_labels, all_preds)
@@ -138,61 +285,258 @@ def evaluate_model(model, test_loader, device):
     
     return auc, cm, report, all_probs, all_labels
 
-def main():
-    print("=" * 80)
-    print("Training LSTM Classifier on Full US Chlamydia Dataset")
-    print("=" * 80)
-    
-    print("\nLoading training data...")
-    train_df = pd.read_csv('data/atlasplus_all_us_train.csv')
-    print(f"Training records: {len(train_df):,}")
-    print(f"Counties: {train_df['FIPS'].nunique()}")
-    print(f"Year range: {train_df['Year'].min()}-{train_df['Year'].max()}")
-    print(f"Outbreak rate: {train_df['Outbreak'].mean()*100:.1f}%")
-    
-    print("\nNormalizing features...")
-    feature_cols = [col for col in train_df.columns if col not in 
-                   ['Year', 'State', 'FIPS', 'County', 'Disease', 'Sex', 'Outbreak']]
-    
-    scaler = StandardScaler()
-    train_df[feature_cols] = scaler.fit_transform(train_df[feature_cols])
+def split_summaries(train_df, val_split_year):
+    # Record counts, year range and outbreak rate of the file and its splits
+    def summary(df):
+        return {'records': len(df), 'years': [int(df['Year'].min()), int(df['Year'].max())],
+                'outbreak_rate': float(df['Outbreak'].mean())}
+    
+    return {
+        'all': dict(summary(train_df), counties=int(train_df['FIPS'].nunique())),
+        'train': summary(train_df[train_df['Year'] <= val_split_year]),
+        'val': summary(train_df[train_df['Year'] > val_split_year]),
+    }
+
+def fit_train_scaler(train_df, feature_cols, val_split_year):
+    # Both training modes fit the scaler on the training years only, so the
+    # validation years never leak into the normalization
+    return StandardScaler().fit(train_df.loc[train_df['Year'] <= val_split_year, feature_cols])
+
+def build_training_arrays(train_file, seq_length, val_split_year):
+    train_df = pd.read_csv(train_file)
+    feature_cols = get_feature_cols(train_df)
+    
+    scaler = fit_train_scaler(train_df, feature_cols, val_split_year)
+    train_df[feature_cols] = scaler.transform(train_df[feature_cols])
+    
+    train_years = train_df[train_df['Year'] <= val_split_year]
+    val_years = train_df[train_df['Year'] > val_split_year]
+    
+    train_seq, train_labels, train_counties, _ = create_sequences(train_years, seq_length, feature_cols)
+    val_seq, val_labels, val_counties, _ = create_sequences(val_years, seq_length, feature_cols)
+    
+    arrays = {
+        'train_seq': train_seq, 'train_labels': train_labels, 'train_counties': train_counties,
+        'val_seq': val_seq, 'val_labels': val_labels, 'val_counties': val_counties,
+        'scaler_mean': scaler.mean_, 'scaler_scale': scaler.scale_,
+    }
+    meta = dict(split_summaries(train_df, val_split_year), feature_cols=feature_cols)
+    return arrays, meta
+
+def load_training_arrays(train_file, seq_length, val_split_year, cache):
+    # Normalized sequence windows + scaler params, memory-mapped from the
+    # dataset cache when the CSV and these parameters were seen before
+    params = {
+        'stage': 'train',
+        'seq_length': seq_length,
+        'val_split_year': val_split_year,
+        'lags': LAG_STEPS,
+        'outbreak_threshold': OUTBREAK_THRESHOLD,
+    }
+    return cache.get_or_build(
+        [train_file], params,
+        lambda: build_training_arrays(train_file, seq_length, val_split_year),
+    )
+
+def build_packed_training_arrays(train_file, val_split_year):
+    # Full-history variant of build_training_arrays: one padded sequence per
+    # county over all training-file years. Training uses each county's
+    # prefix up to val_split_year (its train length); validation runs the
+    # whole history and scores only the years after the split, so neither
+    # ever sees a later year than the one it predicts.
+    train_df = pd.read_csv(train_file)
+    feature_cols = get_feature_cols(train_df)
+    
+    scaler = fit_train_scaler(train_df, feature_cols, val_split_year)
+    train_df[feature_cols] = scaler.transform(train_df[feature_cols])
+    
+    sequences, labels, years, lengths, counties = create_county_sequences(train_df, feature_cols)
+    train_lengths = ((years >= 0) & (years <= val_split_year)).sum(axis=1)
+    
+    arrays = {
+        'county_seq': sequences, 'county_labels': labels, 'county_years': years,
+        'lengths': lengths, 'train_lengths': train_lengths, 'counties': counties.astype(str),
+        'scaler_mean': scaler.mean_, 'scaler_scale': scaler.scale_,
+    }
+    meta = dict(split_summaries(train_df, val_split_year), feature_cols=feature_cols,
+                max_len=int(lengths.max()))
+    return arrays, meta
+
+def load_packed_training_arrays(train_file, val_split_year, cache):
+    params = {
+        'stage': 'train-packed',
+        'val_split_year': val_split_year,
+        'lags': LAG_STEPS,
+        'outbreak_threshold': OUTBREAK_THRESHOLD,
+    }
+    return cache.get_or_build(
+        [train_file], params,
+        lambda: build_packed_training_arrays(train_file, val_split_year),
+    )
+
+def packed_datasets(data, seq_length, val_split_year):
+    # Supervise the same timesteps as the windowed setup (those with at least
+    # seq_length - 1 years of history) - but with the full history as context
+    years, lengths, train_lengths = data['county_years'], data['lengths'], data['train_lengths']
+    position = np.arange(years.shape[1])
+    supervised = position[None, :] >= seq_length - 1
+    
+    train_mask = supervised & (position[None, :] < train_lengths[:, None])
+    train_rows = np.flatnonzero(train_mask.any(axis=1))
+    train_len = int(train_lengths.max())
+    train_dataset = CountySequenceDataset(
+        data['county_seq'][train_rows, :train_len], data['county_labels'][train_rows, :train_len],
+        train_lengths[train_rows], train_mask[train_rows, :train_len],
+    )
     
-    train_years = train_df[train_df['Year'] <= 2016].copy()
-    val_years = train_df[train_df['Year'] > 2016].copy()
+    val_mask = supervised & (years > val_split_year)
+    val_rows = np.flatnonzero(val_mask.any(axis=1))
+    val_dataset = CountySequenceDataset(
+        data['county_seq'][val_rows], data['county_labels'][val_rows], lengths[val_rows], val_mask[val_rows],
+    )
+    return train_dataset, val_dataset
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Train the US outbreak LSTM classifier')
+    parser.add_argument('--indicator',
+                        help='train on one indicator partition (e.g. Gonorrhea) written by '
+                             'process_atlasplus_for_lstm; default is the original Chlamydia files')
+    parser.add_argument('--train-file', help='override the training CSV')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                        help='where preprocessed arrays are cached between runs')
+    parser.add_argument('--no-cache', action='store_true', help='always rebuild sequences')
+    parser.add_argument('--seed', type=int,
+                        help='seed torch before building the model (weights, dropout, shuffling)')
+    
+    hparams = parser.add_argument_group('model / optimizer')
+    hparams.add_argument('--hidden-dim', type=int, default=64)
+    hparams.add_argument('--num-layers', type=int, default=2)
+    hparams.add_argument('--dropout', type=float, default=0.3)
+    hparams.add_argument('--lr', type=float, default=0.001, help='base learning rate at batch size 64')
+    
+    speed = parser.add_argument_group('training speed')
+    speed.add_argument('--fast', action='store_true',
+                       help='high-throughput preset: --batch-size 512 --bf16 --compile --tensor-batches')
+    speed.add_argument('--batch-size', type=int, help='training batch size (default 64, 512 with --fast)')
+    speed.add_argument('--lr-scaling', choices=['none', 'linear', 'sqrt'], default='sqrt',
+                       help='how the base LR (--lr, at batch 64) scales with --batch-size')
+    speed.add_argument('--bf16', action='store_true', help='bfloat16 autocast for forward passes')
+    speed.add_argument('--compile', action='store_true', help='torch.compile the model where supported')
+    speed.add_argument('--tensor-batches', action='store_true',
+                       help='slice batches straight from tensors instead of a per-sample DataLoader')
+    speed.add_argument('--threads', type=int, help='intra-op CPU threads (torch.set_num_threads)')
+    speed.add_argument('--packed', action='store_true',
+                       help='train on one packed full-history sequence per county instead of '
+                            'overlapping seq_length windows (batch size counts counties)')
+    speed.add_argument('--epochs', type=int, default=50)
+    speed.add_argument('--checkpoint-metric', choices=['val_auc', 'val_loss'], default='val_auc',
+                       help='validation metric that picks the saved epoch')
+    speed.add_argument('--log-every', type=int, default=5, help='print metrics every N epochs')
+    
+    profiling = parser.add_argument_group('profiling')
+    profiling.add_argument('--profile', action='store_true',
+                           help='run torch.profiler over a window of training steps and write a '
+                                'Chrome trace, a per-op table and per-epoch timings')
+    profiling.add_argument('--profile-dir', default='profiles')
+    profiling.add_argument('--profile-wait', type=int, default=5, help='steps skipped before profiling')
+    profiling.add_argument('--profile-warmup', type=int, default=2,
+                           help='steps traced but discarded (profiler warm-up)')
+    profiling.add_argument('--profile-steps', type=int, default=10, help='steps recorded')
+    
+    args = parser.parse_args()
+    if args.fast:
+        args.bf16 = args.compile = args.tensor_batches = True
+        args.batch_size = args.batch_size or 512
+    args.batch_size = args.batch_size or 64
+    return args
+
+def main(args):
+    if args.indicator:
+        train_file = args.train_file or partition_paths(args.indicator)[0]
+        suffix = f'_{indicator_slug(args.indicator)}'
+    else:
+        train_file = args.train_file or TRAIN_FILE
+        suffix = ''
+    checkpoint_path = f'models/best_us_lstm_classifier{suffix}.pth'
+    artifact_path = f'models/best_us_lstm_classifier{suffix}.pt'
     
-    print(f"\nTrain split: {len(train_years):,} records ({train_years['Year'].min()}-{train_years['Year'].max()})")
-    print(f"  Outbreak rate: {train_years['Outbreak'].mean()*100:.1f}%")
-    print(f"Val split: {len(val_years):,} records ({val_years['Year'].min()}-{val_years['Year'].max()})")
-    print(f"  Outbreak rate: {val_years['Outbreak'].mean()*100:.1f}%")
+    print("=" * 80)
+    print(f"Training LSTM Classifier on Full US {args.indicator or LEGACY_INDICATOR} Dataset")
+    print("=" * 80)
     
     seq_length = 3
-    print(f"\nCreating sequences (sequence length = {seq_length})...")
+    val_split_year = 2016
     
-    train_seq, train_labels, train_counties = create_sequences(train_years, seq_length)
-    val_seq, val_labels, val_counties = create_sequences(val_years, seq_length)
-    
-    print(f"Training sequences: {len(train_seq):,}")
-    print(f"  Unique counties: {len(np.unique(train_counties))}")
-    print(f"  Outbreak sequences: {train_labels.sum():.0f} ({train_labels.mean()*100:.1f}%)")
-    print(f"Validation sequences: {len(val_seq):,}")
-    print(f"  Unique counties: {len(np.unique(val_counties))}")
-    print(f"  Outbreak sequences: {val_labels.sum():.0f} ({val_labels.mean()*100:.1f}%)")
-    
-    train_dataset = OutbreakDataset(train_seq, train_labels)
-    val_dataset = OutbreakDataset(val_seq, val_labels)
+    print("\nLoading training data...")
+    cache = DatasetCache(args.cache_dir, enabled=not args.no_cache)
+    start = time.perf_counter()
+    if args.packed:
+        data, meta, cache_hit = load_packed_training_arrays(train_file, val_split_year, cache)
+    else:
+        data, meta, cache_hit = load_training_arrays(train_file, seq_length, val_split_year, cache)
+    source = "memory-mapped from cache" if cache_hit else "built and cached"
+    print(f"Prepared sequences in {time.perf_counter() - start:.2f}s ({source})")
+    
+    summary = meta['all']
+    print(f"Training records: {summary['records']:,}")
+    print(f"Counties: {summary['counties']}")
+    print(f"Year range: {summary['years'][0]}-{summary['years'][1]}")
+    print(f"Outbreak rate: {summary['outbreak_rate']*100:.1f}%")
+    
+    for name, label in (('train', 'Train'), ('val', 'Val')):
+        split = meta[name]
+        print(f"\n{label} split: {split['records']:,} records ({split['years'][0]}-{split['years'][1]})")
+        print(f"  Outbreak rate: {split['outbreak_rate']*100:.1f}%")
+    
+    if args.packed:
+        train_dataset, val_dataset = packed_datasets(data, seq_length, val_split_year)
+        train_seq = data['county_seq']
+        train_labels = train_dataset.labels[train_dataset.mask].numpy()
+        val_labels = val_dataset.labels[val_dataset.mask].numpy()
+        batch_outputs = packed_outputs
+        
+        print(f"\nPacked county sequences (up to {meta['max_len']} years each):")
+        print(f"Training counties: {len(train_dataset):,} ({len(train_labels):,} supervised years)")
+        print(f"  Outbreak years: {train_labels.sum():.0f} ({train_labels.mean()*100:.1f}%)")
+        print(f"Validation counties: {len(val_dataset):,} ({len(val_labels):,} supervised years)")
+        print(f"  Outbreak years: {val_labels.sum():.0f} ({val_labels.mean()*100:.1f}%)")
+        print(f"Sequence tensor: {train_seq.nbytes / 2**20:.1f} MiB")
+    else:
+        print(f"\nSequences (sequence length = {seq_length}):")
+        train_seq, train_labels, train_counties = data['train_seq'], data['train_labels'], data['train_counties']
+        val_seq, val_labels, val_counties = data['val_seq'], data['val_labels'], data['val_counties']
+        batch_outputs = window_outputs
+        
+        print(f"Training sequences: {len(train_seq):,}")
+        print(f"  Unique counties: {len(np.unique(train_counties))}")
+        print(f"  Outbreak sequences: {train_labels.sum():.0f} ({train_labels.mean()*100:.1f}%)")
+        print(f"Validation sequences: {len(val_seq):,}")
+        print(f"  Unique counties: {len(np.unique(val_counties))}")
+        print(f"  Outbreak sequences: {val_labels.sum():.0f} ({val_labels.mean()*100:.1f}%)")
+        
+        train_dataset = OutbreakDataset(train_seq, train_labels)
+        val_dataset = OutbreakDataset(val_seq, val_labels)
     
-    batch_size = 64
-    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False)
+    batch_size = args.batch_size
+    if args.tensor_batches:
+        train_loader = TensorBatchLoader(train_dataset, batch_size, shuffle=True)
+        val_loader = TensorBatchLoader(val_dataset, batch_size)
+    else:
+        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
+        val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False)
     
     input_dim = train_seq.shape[2]
-    hidden_dim = 64
-    num_layers = 2
-    dropout = 0.3
+    hidden_dim = args.hidden_dim
+    num_layers = args.num_layers
+    dropout = args.dropout
     
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    print(f"\nUsing device: {device}")
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    print(f"\nUsing device: {device} ({torch.get_num_threads()} CPU threads)")
     
+    if args.seed is not None:
+        torch.manual_seed(args.seed)
     model = OutbreakLSTMClassifier(
         input_dim=input_dim,
         hidden_dim=hidden_dim,
@@ -210,14 +554,56 @@ def main():
     pos_weight = (train_labels == 0).sum() / (train_labels == 1).sum()
     print(f"\nClass weight (pos_weight): {pos_weight:.2f}")
     
-    print("\nTraining model...")
-    num_epochs = 50
-    learning_rate = 0.001
+    num_epochs = args.epochs
+    # With --packed a batch is counties, so scale by supervised years per batch
+    effective_batch = batch_size * len(train_labels) / len(train_dataset) if args.packed else batch_size
+    learning_rate = scaled_learning_rate(args.lr, effective_batch, rule=args.lr_scaling)
+    amp_dtype = torch.bfloat16 if args.bf16 else None
+    forward = None
+    if args.compile and args.packed:
+        print("torch.compile is not used with --packed (packed sequences break the graph)")
+    elif args.compile:
+        forward = compile_model(model, torch.as_tensor(train_seq[:batch_size]).to(device))
+    
+    print(f"\nBatch size: {batch_size}, learning rate: {learning_rate:.5f} ({args.lr_scaling} scaling)")
+    print(f"bf16 autocast: {'on' if amp_dtype else 'off'}, compiled: {'yes' if forward is not None and forward is not model else 'no'}, "
+          f"batching: {'tensor slices' if args.tensor_batches else 'DataLoader'}")
+    
+    profiler = None
+    if args.profile:
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if device.type == 'cuda':
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        profiler = torch.profiler.profile(
+            activities=activities,
+            schedule=torch.profiler.schedule(wait=args.profile_wait, warmup=args.profile_warmup,
+                                             active=args.profile_steps, repeat=1),
+            on_trace_ready=profile_trace_handler(args.profile_dir, f'train{suffix}'),
+            record_shapes=True,
+            profile_memory=True,
+        )
+        print(f"Profiling training steps {args.profile_wait + args.profile_warmup + 1}-"
+              f"{args.profile_wait + args.profile_warmup + args.profile_steps} into {args.profile_dir}/")
     
-    train_losses, val_losses = train_model(
-        model, train_loader, val_loader, 
-        num_epochs, learning_rate, device, pos_weight
-    )
+    print("\nTraining model...")
+    epoch_stats = []
+    with profiler if profiler is not None else contextlib.nullcontext():
+        train_losses, val_losses, throughput = train_model(
+            model, train_loader, val_loader, 
+            num_epochs, learning_rate, device, pos_weight, checkpoint_path,
+            amp_dtype=amp_dtype, forward=forward, log_every=args.log_every, batch_outputs=batch_outputs,
+            profiler=profiler, epoch_stats=epoch_stats, checkpoint_metric=args.checkpoint_metric
+        )
+    # First epoch includes compilation/warm-up
+    steady = throughput[1:] or throughput
+    print(f"Mean throughput: {np.mean(steady):,.0f} samples/s")
+    print(f"Mean epoch time: {np.mean([e['wall_seconds'] for e in epoch_stats]):.2f}s")
+    
+    if args.profile:
+        epochs_path = Path(args.profile_dir) / f'train{suffix}_epochs.json'
+        epochs_path.parent.mkdir(parents=True, exist_ok=True)
+        epochs_path.write_text(json.dumps(epoch_stats, indent=2))
+        print(f"Per-epoch timings saved to: {epochs_path}")
     
     plt.figure(figsize=(10, 5))
     plt.plot(train_losses, label='Train Loss')
@@ -226,25 +612,48 @@ def main():
     plt.ylabel('Loss')
     plt.title('Training and Validation Loss')
     plt.legend()
-    plt.savefig('figures/us_lstm_training_curves.png', dpi=300, bbox_inches='tight')
+    plt.savefig(f'figures/us_lstm_training_curves{suffix}.png', dpi=300, bbox_inches='tight')
     plt.close()
     
     print("\n" + "=" * 80)
     print("Training complete!")
     print("=" * 80)
     
+    # The epoch train_model checkpointed (first one at the best value)
+    scores = [e[args.checkpoint_metric] for e in epoch_stats]
+    best = int(np.argmax(scores) if args.checkpoint_metric == 'val_auc' else np.argmin(scores))
+    best_stats = epoch_stats[best]
+    print(f"\nBest epoch by {args.checkpoint_metric}: {best_stats['epoch']} "
+          f"(val AUC {best_stats['val_auc']:.4f}, val loss {best_stats['val_loss']:.4f})")
+    
     print("\nFinal validation set evaluation:")
-    model.load_state_dict(torch.load('models/best_us_lstm_classifier.pth'))
-    val_auc, val_cm, val_report, _, _ = evaluate_model(model, val_loader, device)
+    model.load_state_dict(torch.load(checkpoint_path))
+    val_auc, val_cm, val_report, _, _ = evaluate_model(model, val_loader, device, batch_outputs)
     
     print(f"\nValidation AUC: {val_auc:.4f}")
     print("\nClassification Report:")
     print(val_report)
     print("\nConfusion Matrix:")
     print(val_cm)
+    
+    # Self-contained artifact for evaluation and serving: best weights,
+    # architecture, feature order and scaler parameters in one file
+    save_artifact(
+        artifact_path, model,
+        feature_cols=meta['feature_cols'],
+        scaler_mean=data['scaler_mean'], scaler_scale=data['scaler_scale'],
+        config={'input_dim': input_dim, 'hidden_dim': hidden_dim, 'num_layers': num_layers,
+                'dropout': dropout, 'seq_length': seq_length,
+                'training': 'packed' if args.packed else 'windowed',
+                'checkpoint_metric': args.checkpoint_metric},
+        disease=args.indicator or LEGACY_INDICATOR,
+        epoch=best_stats['epoch'],
+        metrics={'val_auc': val_auc, 'val_loss': best_stats['val_loss']},
+    )
+    print(f"\nModel artifact saved to: {artifact_path}")
 
 if __name__ == '__main__':
     Path('models').mkdir(exist_ok=True)
     Path('figures').mkdir(exist_ok=True)
     
-    main()
+    main(parse_args())
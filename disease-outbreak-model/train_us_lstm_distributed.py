@@ -0,0 +1,245 @@
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader
+from torch.utils.data.distributed import DistributedSampler
+from sklearn.metrics import roc_auc_score
+from pathlib import Path
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(str(Path(__file__).parent / 'src'))
+from models.Disease_Predictor import OutbreakLSTMClassifier
+from models.artifact import save_artifact
+from preprocessing.dataset_cache import DatasetCache, DEFAULT_CACHE_DIR
+from preprocessing.process_atlasplus_for_lstm import LEGACY_INDICATOR, TRAIN_FILE, indicator_slug, partition_paths
+from train_us_lstm_classifier import OutbreakDataset, load_training_arrays, scaled_learning_rate
+
+# Launch with torchrun, e.g. on one node with 8 processes:
+#   torchrun --standalone --nproc_per_node 8 train_us_lstm_distributed.py
+# or across nodes:
+#   torchrun --nnodes 2 --nproc_per_node 8 --rdzv-backend c10d \
+#            --rdzv-endpoint host0:29500 train_us_lstm_distributed.py
+# Run directly (python train_us_lstm_distributed.py) it trains as a single
+# process group of one.
+
+def setup_distributed():
+    
+    if 'RANK' not in os.environ:
+        os.environ.update(RANK='0', WORLD_SIZE='1', LOCAL_RANK='0', LOCAL_WORLD_SIZE='1',
+                          MASTER_ADDR='127.0.0.1', MASTER_PORT='29500')
+    dist.init_process_group(backend='gloo')
+    return dist.get_rank(), dist.get_world_size(), int(os.environ.get('LOCAL_RANK', 0))
+
+def log(*args, **kwargs):
+    
+    if dist.get_rank() == 0:
+        print(*args, **kwargs, flush=True)
+
+def shard(dataset, rank, world_size):
+    
+    # Contiguous, non-overlapping validation shard per rank. Unlike
+    # DistributedSampler it never pads with duplicates, so the all-reduced
+    # metrics cover every validation window exactly once.
+    bounds = np.linspace(0, len(dataset), world_size + 1).astype(int)
+    return OutbreakDataset(dataset.sequences[bounds[rank]:bounds[rank + 1]],
+                           dataset.labels[bounds[rank]:bounds[rank + 1]])
+
+def evaluate_distributed(model, val_loader, criterion):
+    
+    # Every rank scores its shard; losses are all-reduced and predictions
+    # gathered so all ranks see identical val_loss / val_auc and take the
+    # same scheduler and best-model decisions
+    model.eval()
+    loss_sum = torch.zeros(2, dtype=torch.float64)
+    probs, labels = [], []
+    with torch.no_grad():
+        for sequences, batch_labels in val_loader:
+            outputs = model(sequences).squeeze(-1)
+            loss_sum[0] += criterion(outputs, batch_labels).item() * len(batch_labels)
+            loss_sum[1] += len(batch_labels)
+            probs.append(torch.sigmoid(outputs))
+            labels.append(batch_labels)
+    dist.all_reduce(loss_sum)
+    
+    local = (torch.cat(probs).numpy() if probs else np.empty(0), torch.cat(labels).numpy() if labels else np.empty(0))
+    gathered = [None] * dist.get_world_size()
+    dist.all_gather_object(gathered, local)
+    all_probs = np.concatenate([g[0] for g in gathered])
+    all_labels = np.concatenate([g[1] for g in gathered])
+    try:
+        val_auc = roc_auc_score(all_labels, all_probs)
+    except ValueError:
+        val_auc = 0.0
+    return (loss_sum[0] / loss_sum[1]).item(), val_auc
+
+def train_distributed(model, train_loader, val_loader, num_epochs, learning_rate, pos_weight,
+                      checkpoint_path, log_every=5):
+    
+    rank, world_size = dist.get_rank(), dist.get_world_size()
+    criterion = nn.BCEWithLogitsLoss(pos_weight=torch.tensor([pos_weight]))
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='min', factor=0.5, patience=5)
+    
+    history = []
+    best_val_loss = float('inf')
+    
+    for epoch in range(num_epochs):
+        model.train()
+        train_loader.sampler.set_epoch(epoch)
+        epoch_start = time.perf_counter()
+        
+        train_loss = torch.zeros(2, dtype=torch.float64)
+        for sequences, labels in train_loader:
+            optimizer.zero_grad(set_to_none=True)
+            loss = criterion(model(sequences).squeeze(-1), labels)
+            # DDP all-reduces (averages) gradients across ranks here
+            loss.backward()
+            optimizer.step()
+            train_loss[0] += loss.detach()
+            train_loss[1] += 1
+        
+        train_seconds = time.perf_counter() - epoch_start
+        samples = torch.tensor([len(train_loader.sampler)], dtype=torch.float64)
+        dist.all_reduce(train_loss)
+        dist.all_reduce(samples)
+        train_loss = (train_loss[0] / train_loss[1]).item()
+        
+        val_loss, val_auc = evaluate_distributed(model.module, val_loader, criterion)
+        scheduler.step(val_loss)
+        
+        throughput = samples.item() / train_seconds
+        history.append({'epoch': epoch + 1, 'train_loss': train_loss, 'val_loss': val_loss,
+                        'val_auc': val_auc, 'samples_per_second': throughput})
+        
+        if (epoch + 1) % log_every == 0:
+            log(f'Epoch [{epoch+1}/{num_epochs}], Train Loss: {train_loss:.4f}, Val Loss: {val_loss:.4f}, '
+                f'Val AUC: {val_auc:.4f}, {throughput:,.0f} samples/s ({world_size} processes)')
+        
+        # val_loss is identical on every rank, so all ranks agree on the best
+        # epoch; only rank 0 writes it
+        if val_loss < best_val_loss:
+            best_val_loss = val_loss
+            if rank == 0:
+                torch.save(model.module.state_dict(), checkpoint_path)
+    
+    dist.barrier()
+    return history, best_val_loss
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Data-parallel (DDP, gloo) training of the US outbreak LSTM classifier')
+    parser.add_argument('--indicator', help='train on one indicator partition instead of the Chlamydia files')
+    parser.add_argument('--train-file', help='override the training CSV')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument('--checkpoint', help='default: models/best_us_lstm_classifier[_<indicator>].pth')
+    parser.add_argument('--batch-size', type=int, default=512, help='global batch size, split across processes')
+    parser.add_argument('--lr', type=float, default=0.001, help='base learning rate at batch size 64')
+    parser.add_argument('--lr-scaling', choices=['none', 'linear', 'sqrt'], default='sqrt')
+    parser.add_argument('--hidden-dim', type=int, default=64)
+    parser.add_argument('--num-layers', type=int, default=2)
+    parser.add_argument('--dropout', type=float, default=0.3)
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--threads', type=int,
+                        help='torch threads per process (default: cores / processes on this node)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--log-every', type=int, default=5)
+    parser.add_argument('--metrics-out', help='rank 0 writes per-epoch metrics here as JSON')
+    return parser.parse_args()
+
+def main(args):
+    rank, world_size, local_rank = setup_distributed()
+    local_world_size = int(os.environ.get('LOCAL_WORLD_SIZE', world_size))
+    threads = args.threads or max(1, (os.cpu_count() or 1) // local_world_size)
+    torch.set_num_threads(threads)
+    torch.manual_seed(args.seed)
+    
+    if args.indicator:
+        train_file = args.train_file or partition_paths(args.indicator)[0]
+        suffix = f'_{indicator_slug(args.indicator)}'
+    else:
+        train_file = args.train_file or TRAIN_FILE
+        suffix = ''
+    checkpoint_path = args.checkpoint or f'models/best_us_lstm_classifier{suffix}.pth'
+    artifact_path = str(Path(checkpoint_path).with_suffix('.pt'))
+    
+    log("=" * 80)
+    log(f"Distributed LSTM Training: {world_size} processes x {threads} threads (gloo)")
+    log("=" * 80)
+    
+    # One process per node builds the cache entry; the others then map it
+    cache = DatasetCache(args.cache_dir)
+    if local_rank == 0:
+        load_training_arrays(train_file, 3, 2016, cache)
+    dist.barrier()
+    data, meta, _ = load_training_arrays(train_file, 3, 2016, cache)
+    
+    train_dataset = OutbreakDataset(data['train_seq'], data['train_labels'])
+    val_dataset = shard(OutbreakDataset(data['val_seq'], data['val_labels']), rank, world_size)
+    log(f"\nTraining sequences: {len(train_dataset):,}, validation sequences: {len(data['val_seq']):,}")
+    
+    per_rank_batch = max(1, args.batch_size // world_size)
+    sampler = DistributedSampler(train_dataset, num_replicas=world_size, rank=rank, shuffle=True, seed=args.seed)
+    train_loader = DataLoader(train_dataset, batch_size=per_rank_batch, sampler=sampler)
+    val_loader = DataLoader(val_dataset, batch_size=per_rank_batch, shuffle=False)
+    
+    model = OutbreakLSTMClassifier(
+        input_dim=data['train_seq'].shape[2],
+        hidden_dim=args.hidden_dim,
+        num_layers=args.num_layers,
+        dropout=args.dropout
+    )
+    model = DistributedDataParallel(model)
+    
+    train_labels = data['train_labels']
+    pos_weight = (train_labels == 0).sum() / (train_labels == 1).sum()
+    global_batch = per_rank_batch * world_size
+    learning_rate = scaled_learning_rate(args.lr, global_batch, rule=args.lr_scaling)
+    log(f"Global batch: {global_batch} ({per_rank_batch} per process), learning rate: {learning_rate:.5f}")
+    
+    if rank == 0:
+        Path(checkpoint_path).parent.mkdir(parents=True, exist_ok=True)
+    
+    log("\nTraining model...")
+    history, best_val_loss = train_distributed(
+        model, train_loader, val_loader, args.epochs, learning_rate, pos_weight,
+        checkpoint_path, log_every=args.log_every
+    )
+    
+    steady = [h['samples_per_second'] for h in history[1:]] or [history[0]['samples_per_second']]
+    log(f"\nBest validation loss: {best_val_loss:.4f}")
+    log(f"Mean throughput: {np.mean(steady):,.0f} samples/s")
+    log(f"Best model saved to: {checkpoint_path}")
+    
+    if rank == 0:
+        best_epoch = min(history, key=lambda h: h['val_loss'])
+        module = model.module
+        module.load_state_dict(torch.load(checkpoint_path, weights_only=True))
+        save_artifact(
+            artifact_path, module,
+            feature_cols=meta['feature_cols'],
+            scaler_mean=data['scaler_mean'], scaler_scale=data['scaler_scale'],
+            config={'input_dim': data['train_seq'].shape[2], 'hidden_dim': args.hidden_dim,
+                    'num_layers': args.num_layers, 'dropout': args.dropout,
+                    'seq_length': 3, 'training': 'windowed'},
+            disease=args.indicator or LEGACY_INDICATOR,
+            epoch=best_epoch['epoch'],
+            metrics={'val_auc': best_epoch['val_auc'], 'val_loss': best_epoch['val_loss']},
+        )
+        log(f"Model artifact saved to: {artifact_path}")
+    
+    if rank == 0 and args.metrics_out:
+        Path(args.metrics_out).write_text(json.dumps({
+            'world_size': world_size, 'threads_per_process': threads,
+            'global_batch': global_batch, 'history': history,
+        }, indent=2))
+    
+    dist.destroy_process_group()
+
+if __name__ == '__main__':
+    main(parse_args())